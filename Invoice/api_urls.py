@@ -19,6 +19,8 @@ from .views import (
     RegisterView,
     ProfileView,
     WorkEntryListCreateView,
+    WorkEntryBulkCreateView,
+    SlotFillView,
     DashboardView,
     PriceListCreateView,
     PriceDetailView,
@@ -32,6 +34,8 @@ urlpatterns = [
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('work-entries/', WorkEntryListCreateView.as_view(), name='work_entry_api'),
+    path('work-entries/bulk/', WorkEntryBulkCreateView.as_view(), name='work_entry_bulk_api'),
+    path('slots/fill/', SlotFillView.as_view(), name='slot_fill_api'),
     path('dashboard/', DashboardView.as_view(), name='dashboard_api'),
     path('prices/', PriceListCreateView.as_view(), name='price_list_create_api'),
     path('prices/<int:id>/', PriceDetailView.as_view(), name='price_detail_api'),
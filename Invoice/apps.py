@@ -17,4 +17,7 @@ from django.apps import AppConfig
 class InvoiceConfig(AppConfig):
 
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'Invoice'
\ No newline at end of file
+    name = 'Invoice'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (connects the model signal handlers)
\ No newline at end of file
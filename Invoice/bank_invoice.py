@@ -14,12 +14,13 @@
 
 from decimal import Decimal
 from django.http import HttpResponse
-import openpyxl
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, Protection
-from django.conf import settings
-import os
+from django.db.models import Sum
 from num2words import num2words
+from .invoice_renderer import template_workbook
 from .models import WorkEntry, ClientProject
+from .rates import category_quantities, priced_totals, rate_cards
+from .revenue import DEFAULT_CURRENCY, format_totals, primary_currency
 
 def generate_bank_invoice(request, project_id=None):
     project_id = request.GET.get('project')
@@ -37,12 +38,11 @@ def generate_bank_invoice(request, project_id=None):
         entries = entries.filter(date__lte=end_date)
 
     # Calculate totals
-    total_units = sum(entry.quantity for entry in entries)
-    total_amount = sum(entry.quantity * entry.category.rate if entry.category else 0 for entry in entries)
+    total_units = entries.aggregate(total=Sum('quantity'))['total'] or 0
+    totals = priced_totals(category_quantities(entries), rate_cards([project_id]))
 
-    # Load template
-    template_path = os.path.join(settings.STATICFILES_DIRS[0], 'template', 'InvoiceTemplate.xlsx')
-    wb = openpyxl.load_workbook(template_path)
+    # Start from a copy of the cached template
+    wb = template_workbook()
     ws = wb.active
 
     # Format date range for invoice number
@@ -63,11 +63,19 @@ def generate_bank_invoice(request, project_id=None):
     # Write totals
     ws['B13'] = "Total Units:"
     ws['C13'] = total_units
-    ws['D13'] = "Total Amount (USD):"
-    ws['E13'] = total_amount
+    if len(totals) > 1:
+        ws['D13'] = "Total Amount:"
+        ws['E13'] = format_totals(totals)
+    else:
+        currency = primary_currency(totals)
+        ws['D13'] = f"Total Amount ({currency}):"
+        ws['E13'] = totals.get(currency, Decimal('0.00'))
     
     # Convert amount to words
-    amount_words = num2words(total_amount, lang='en', to='currency', currency='USD').title()
+    amount_words = ' and '.join(
+        num2words(amount, lang='en', to='currency', currency=currency).title()
+        for currency, amount in sorted((totals or {DEFAULT_CURRENCY: Decimal('0.00')}).items())
+    )
     ws['B15'] = f"In Words: {amount_words}"
     ws.merge_cells('B15:E15')
     
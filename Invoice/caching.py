@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:         caching.py
+# Purpose:      Versioned, per-scope cache for dashboard and summary payloads.
+#
+# Author:       AnikRoy
+# GitHub:       https://github.com/aroyslipk
+#
+# Created:      2026-10-18
+# Copyright:    (c) AnikRoy 2025
+# Licence:      Proprietary
+# -----------------------------------------------------------------------------
+
+"""
+Cached payloads keyed by (payload name, data versions, parameters).
+
+Each write to WorkEntry, Category, Invoice, ClientProject or User bumps the
+DataVersion counters of the scopes it touches (see signals.py). Readers look
+up the current versions of their scopes in one query and use them in the
+cache key, so a cached payload is never served after its data changed and
+no TTL has to be guessed. Old keys are simply never asked for again and age
+out of the backend.
+
+Versions live in the database rather than in the cache so every process
+agrees on them, which keeps this correct with per-process backends such as
+locmem as well as with the file cache.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ClientProject, DataVersion, User
+
+
+ALL_SCOPE = 'all'
+CATALOG_SCOPE = 'catalog'
+
+_STATS_PREFIX = 'invoice:stats'
+_MISSING = object()
+
+
+def admin_scope(user_id):
+    return f'admin:{user_id}'
+
+
+def project_scope(project_id):
+    return f'project:{project_id}'
+
+
+def user_scope(user_id):
+    return f'user:{user_id}'
+
+
+def rate_card_scope(project_id):
+    return f'rates:{project_id}'
+
+
+def role_scope(user):
+    """The scope holding everything `user` sees on the dashboard."""
+    if user.role == 'admin':
+        return admin_scope(user.pk)
+    if user.role == 'user':
+        return user_scope(user.pk)
+    return ALL_SCOPE
+
+
+def _cache():
+    return caches[getattr(settings, 'DASHBOARD_CACHE_ALIAS', 'default')]
+
+
+# ---------------------------------------------------------------------------
+# Versions
+# ---------------------------------------------------------------------------
+
+def bump_versions(scopes):
+    """Increment the counters of `scopes`, creating missing ones first."""
+    scopes = sorted({scope for scope in scopes if scope})
+    if not scopes:
+        return
+    DataVersion.objects.bulk_create(
+        [DataVersion(scope=scope) for scope in scopes],
+        ignore_conflicts=True,
+    )
+    DataVersion.objects.filter(scope__in=scopes).update(
+        version=F('version') + 1,
+        updated_at=timezone.now(),
+    )
+
+
+def bump_all_versions():
+    """Invalidate every cached payload, e.g. after a bulk rebuild.
+
+    Bumps the scopes already known as well as the ones every current
+    project, user and admin would read, so a payload cached while one of
+    them was still missing (version 0) is not served again either.
+    """
+    scopes = {ALL_SCOPE, CATALOG_SCOPE}
+    for pk in ClientProject.objects.values_list('pk', flat=True):
+        scopes.update((project_scope(pk), rate_card_scope(pk)))
+    for pk, role in User.objects.values_list('pk', 'role'):
+        scopes.add(admin_scope(pk) if role == 'admin' else user_scope(pk))
+    scopes.update(DataVersion.objects.values_list('scope', flat=True))
+    bump_versions(scopes)
+
+
+def bump_for_projects(project_ids, user_ids=(), catalog=False):
+    """Bump everything a write to data of `project_ids` can have changed.
+
+    That is each project, the admin managing it, the super admin view, the
+    owners in `user_ids` and, for rate or name changes, the catalog and
+    the projects' rate cards.
+    """
+    project_ids = {pk for pk in project_ids if pk}
+    scopes = {ALL_SCOPE}
+    scopes.update(project_scope(pk) for pk in project_ids)
+    scopes.update(user_scope(pk) for pk in user_ids if pk)
+    if project_ids:
+        managers = ClientProject.objects.filter(pk__in=project_ids).values_list('managed_by_id', flat=True)
+        scopes.update(admin_scope(pk) for pk in managers if pk)
+    if catalog:
+        scopes.add(CATALOG_SCOPE)
+        scopes.update(rate_card_scope(pk) for pk in project_ids)
+    bump_versions(scopes)
+
+
+def current_versions(scopes):
+    """{scope: (version, updated_at)} for `scopes`, in one query."""
+    rows = DataVersion.objects.filter(scope__in=list(scopes)).values_list('scope', 'version', 'updated_at')
+    versions = {scope: (0, None) for scope in scopes}
+    versions.update({scope: (version, updated_at) for scope, version, updated_at in rows})
+    return versions
+
+
+def version_token(versions):
+    return ','.join(f'{scope}={versions[scope][0]}' for scope in sorted(versions))
+
+
+def last_modified(versions):
+    stamps = [updated_at for _, updated_at in versions.values() if updated_at]
+    return max(stamps) if stamps else None
+
+
+# ---------------------------------------------------------------------------
+# Payloads
+# ---------------------------------------------------------------------------
+
+def cache_key(name, versions, params):
+    raw = json.dumps([version_token(versions), params], sort_keys=True, default=str)
+    return f'invoice:{name}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def cached_payload(name, scopes, params, build, versions=None):
+    """Return the cached `name` payload for `params`, building it on a miss.
+
+    `scopes` are the DataVersion scopes the payload depends on; pass
+    `versions` when the caller already fetched them.
+    """
+    if versions is None:
+        versions = current_versions(scopes)
+    cache = _cache()
+    key = cache_key(name, versions, params)
+    payload = cache.get(key, _MISSING)
+    if payload is not _MISSING:
+        _count(name, 'hits')
+        return payload
+    _count(name, 'misses')
+    payload = build()
+    cache.set(key, payload, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 24 * 60 * 60))
+    return payload
+
+
+def _count(name, outcome):
+    cache = _cache()
+    key = f'{_STATS_PREFIX}:{name}:{outcome}'
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr(); start counting again.
+        cache.set(key, 1, None)
+    names = cache.get(f'{_STATS_PREFIX}:names', set())
+    if name not in names:
+        cache.set(f'{_STATS_PREFIX}:names', names | {name}, None)
+
+
+def cache_stats():
+    """{payload name: {'hits': n, 'misses': n}} as recorded by this cache."""
+    cache = _cache()
+    stats = {}
+    for name in sorted(cache.get(f'{_STATS_PREFIX}:names', set())):
+        stats[name] = {
+            outcome: cache.get(f'{_STATS_PREFIX}:{name}:{outcome}', 0)
+            for outcome in ('hits', 'misses')
+        }
+    return stats
+
+
+def reset_cache_stats():
+    cache = _cache()
+    for name in cache.get(f'{_STATS_PREFIX}:names', set()):
+        cache.delete_many([f'{_STATS_PREFIX}:{name}:hits', f'{_STATS_PREFIX}:{name}:misses'])
+    cache.delete(f'{_STATS_PREFIX}:names')
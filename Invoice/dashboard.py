@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:         dashboard.py
+# Purpose:      Filters and aggregate queries behind the admin dashboard.
+#
+# Author:       AnikRoy
+# GitHub:       https://github.com/aroyslipk
+#
+# Created:      2026-10-18
+# Copyright:    (c) AnikRoy 2025
+# Licence:      Proprietary
+# -----------------------------------------------------------------------------
+
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, IntegerField, Q, Subquery, Sum, Value
+from django.db.models.functions import ExtractWeekDay
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import ClientProject, Invoice, User, WorkEntry
+from .rollups import scoped_rollups
+
+
+WEEKDAY_NAMES = {1: 'Sunday', 2: 'Monday', 3: 'Tuesday', 4: 'Wednesday', 5: 'Thursday', 6: 'Friday', 7: 'Saturday'}
+
+
+class DashboardFilters(namedtuple('DashboardFilters', ['project_id', 'user_id', 'start_date', 'end_date'])):
+    """The project/user/date filters shared by the dashboard views.
+
+    `start_date` and `end_date` are the raw query-string values; `start_day`
+    and `end_day` are the parsed dates (None when missing or invalid).
+    """
+
+    @classmethod
+    def from_query(cls, params):
+        return cls(
+            project_id=params.get('project') or None,
+            user_id=params.get('user') or None,
+            start_date=params.get('start_date') or None,
+            end_date=params.get('end_date') or None,
+        )
+
+    @property
+    def start_day(self):
+        return _parse_day(self.start_date)
+
+    @property
+    def end_day(self):
+        return _parse_day(self.end_date)
+
+
+def _parse_day(value):
+    if not value:
+        return None
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min), timezone.get_default_timezone())
+
+
+def scoped_projects(user):
+    projects = ClientProject.objects.all()
+    if user.role == 'admin':
+        projects = projects.filter(managed_by=user)
+    return projects
+
+
+def scoped_team(user):
+    users = User.objects.filter(role='user')
+    if user.role == 'admin':
+        users = users.filter(created_by=user)
+    return users
+
+
+def scoped_entries(user, filters):
+    """WorkEntry rows visible to `user`, narrowed by `filters`.
+
+    Day filters are inclusive and expressed as a datetime range on `date`,
+    matching the rollups while staying usable by the (project, date) index.
+    """
+    entries = WorkEntry.objects.all()
+    if user.role == 'admin':
+        entries = entries.filter(project__managed_by=user)
+    if filters.project_id:
+        entries = entries.filter(project_id=filters.project_id)
+    if filters.user_id:
+        entries = entries.filter(user_id=filters.user_id)
+    if filters.start_day:
+        entries = entries.filter(date__gte=_day_start(filters.start_day))
+    if filters.end_day:
+        entries = entries.filter(date__lt=_day_start(filters.end_day + timedelta(days=1)))
+    return entries
+
+
+def filtered_rollups(user, filters):
+    return scoped_rollups(user, filters.project_id, filters.user_id, filters.start_day, filters.end_day)
+
+
+def _scalar(queryset, aggregate):
+    """A single aggregate over `queryset` as a scalar subquery expression."""
+    return Subquery(
+        queryset.order_by()
+        .annotate(_all=Value(1, output_field=IntegerField()))
+        .values('_all')
+        .annotate(value=aggregate)
+        .values('value')[:1]
+    )
+
+
+def dashboard_kpis(user, filters):
+    """Every scalar KPI of the dashboard, fetched in one round-trip.
+
+    The statement is anchored on the requesting user's row and each KPI is
+    a scalar subquery using conditional aggregates over the rollups, so the
+    database does all the work in a single query.
+    """
+    projects = scoped_projects(user)
+    rollups = filtered_rollups(user, filters)
+    today = timezone.localdate()
+
+    busiest_weekday = (
+        rollups.order_by()
+        .annotate(weekday=ExtractWeekDay('day'))
+        .values('weekday')
+        .annotate(count=Sum('entry_count'))
+        .order_by('-count')
+        .values('weekday')[:1]
+    )
+    top_user = (
+        rollups.order_by()
+        .values('user__username')
+        .annotate(quantity=Sum('total_quantity'))
+        .order_by('-quantity')
+        .values('user__username')[:1]
+    )
+
+    row = (
+        User.objects.filter(pk=user.pk)
+        .annotate(
+            kpi_total_projects=_scalar(projects, Count('id')),
+            kpi_total_team_members=_scalar(scoped_team(user), Count('id')),
+            kpi_total_entries=_scalar(rollups, Sum('entry_count')),
+            kpi_current_month_entries=_scalar(
+                rollups,
+                Sum('entry_count', filter=Q(day__year=today.year, day__month=today.month)),
+            ),
+            kpi_busiest_weekday=Subquery(busiest_weekday),
+            kpi_most_productive_user=Subquery(top_user),
+            kpi_total_invoiced_amount=_scalar(
+                Invoice.objects.filter(project__in=projects.values('id')),
+                Sum('total_amount'),
+            ),
+        )
+        .values(
+            'kpi_total_projects',
+            'kpi_total_team_members',
+            'kpi_total_entries',
+            'kpi_current_month_entries',
+            'kpi_busiest_weekday',
+            'kpi_most_productive_user',
+            'kpi_total_invoiced_amount',
+        )
+        .get()
+    )
+    kpis = {key[len('kpi_'):]: value for key, value in row.items()}
+    kpis['total_entries'] = kpis['total_entries'] or 0
+    kpis['current_month_entries'] = kpis['current_month_entries'] or 0
+    kpis['busiest_day'] = WEEKDAY_NAMES.get(kpis.pop('busiest_weekday'), 'N/A')
+    kpis['most_productive_user'] = kpis['most_productive_user'] or 'N/A'
+    kpis['total_invoiced_amount'] = kpis['total_invoiced_amount'] or 0.00
+    return kpis
+
+
+def dashboard_charts(user, filters):
+    """Data for the dashboard's category pie and monthly bar charts."""
+    rollups = filtered_rollups(user, filters)
+
+    category_data = rollups.values('category__name').annotate(count=Sum('entry_count')).order_by('-count')
+    monthly_data = (
+        rollups.values('day__year', 'day__month')
+        .annotate(count=Sum('entry_count'))
+        .order_by('day__year', 'day__month')
+    )
+    return {
+        'pie': {
+            'labels': [item['category__name'] or 'Uncategorized' for item in category_data],
+            'data': [item['count'] for item in category_data],
+        },
+        'bar': {
+            'labels': [f"{item['day__year']}-{item['day__month']:02d}" for item in monthly_data],
+            'data': [item['count'] for item in monthly_data],
+        },
+    }
+
@@ -15,6 +15,7 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from .models import User, WorkEntry, ClientProject, Category
+from .slots import MAX_SLOTS_PER_ALLOCATION
 
 class CategoryForm(forms.ModelForm):
 
@@ -90,6 +91,7 @@ class AdminSlotForm(forms.Form):
 
     slot_count = forms.IntegerField(
         min_value=1,
+        max_value=MAX_SLOTS_PER_ALLOCATION,
         label="",
         initial=1,
         widget=forms.NumberInput(attrs={'class': 'form-control form-control-sm', 'placeholder': '# of Slots'})
@@ -101,4 +103,20 @@ class UserRoleUpdateForm(forms.ModelForm):
         fields = ['role']
         widgets = {
             'role': forms.Select(attrs={'class': 'form-control'})
-        }
\ No newline at end of file
+        }
+class CreateSlotsForm(AdminSlotForm):
+    project = forms.ModelChoiceField(
+        queryset=ClientProject.objects.none(),
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+    field_order = ['project', 'slot_count']
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['slot_count'].label = "Number of slots"
+        if user is not None:
+            projects = ClientProject.objects.all()
+            if user.role != 'super_admin':
+                projects = projects.filter(managed_by=user)
+            self.fields['project'].queryset = projects.order_by('name')
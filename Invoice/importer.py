@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:         importer.py
+# Purpose:      Streaming XLSX/CSV import of work entries.
+#
+# Author:       AnikRoy
+# GitHub:       https://github.com/aroyslipk
+#
+# Created:      2026-10-18
+# Copyright:    (c) AnikRoy 2025
+# Licence:      Proprietary
+# -----------------------------------------------------------------------------
+
+"""
+Work log import.
+
+Files are read as a stream: XLSX through openpyxl's read_only mode, CSV
+through csv.reader, keyed by the header row. Rows are validated with the same rules as a manual
+submission (see submission.clean_row) and inserted with bulk_create in
+fixed-size chunks. Memory stays bounded by the chunk size and the size of
+the admin's catalogue, not by the file. Each chunk commits on its own, so
+rows already reported as imported stay imported if a later chunk fails.
+A file that cannot be read (not an XLSX workbook, not UTF-8 text) raises
+UnreadableFile; when that happens part-way through, the import stops there
+and the report carries the error.
+
+Expected columns (header row, case-insensitive): date, user (email or
+username), project, category, folder_name, quantity.
+"""
+
+import csv
+import io
+import time
+import zipfile
+from pathlib import Path
+
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+from .models import Category, User, WorkEntry
+from .submission import clean_row, is_blank_row, insert_entries
+
+
+CHUNK_SIZE = 2000
+MAX_REPORTED_REJECTS = 1000
+
+COLUMNS = ('date', 'user', 'project', 'category', 'folder_name', 'quantity')
+
+
+class UnreadableFile(ValueError):
+    """The uploaded file is not the spreadsheet or text it claims to be."""
+
+
+class ImportReport:
+    """Running totals of an import, with a capped sample of rejected rows."""
+
+    def __init__(self):
+        self.processed = 0
+        self.imported = 0
+        self.rejected = 0
+        self.rejects = []
+        self.error = None
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+
+    def reject(self, row_number, errors):
+        self.rejected += 1
+        if len(self.rejects) < MAX_REPORTED_REJECTS:
+            self.rejects.append({'row': row_number, 'errors': errors})
+
+    def finish(self):
+        self.elapsed = time.monotonic() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'processed': self.processed,
+            'imported': self.imported,
+            'rejected': self.rejected,
+            'rejects': self.rejects,
+            'error': self.error,
+            'elapsed': round(self.elapsed, 2),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+class Catalogue:
+    """Name lookups for the projects, categories and users an admin owns.
+
+    Loaded once per import; every row is then resolved from memory.
+    """
+
+    def __init__(self, admin):
+        categories = Category.objects.select_related('project')
+        users = User.objects.all()
+        if admin.role != 'super_admin':
+            categories = categories.filter(project__managed_by=admin)
+            users = users.filter(created_by=admin)
+
+        self.categories = {}
+        self.categories_by_pk = {}
+        for category in categories:
+            key = (category.project.name.strip().lower(), category.name.strip().lower())
+            self.categories[key] = category
+            self.categories_by_pk[category.pk] = category
+
+        self.users = {}
+        for user_id, email, username in users.values_list('id', 'email', 'username'):
+            self.users[email.strip().lower()] = user_id
+            self.users.setdefault(username.strip().lower(), user_id)
+
+    def category(self, project_name, category_name):
+        return self.categories.get((str(project_name or '').strip().lower(), str(category_name or '').strip().lower()))
+
+    def user_id(self, name):
+        return self.users.get(str(name or '').strip().lower())
+
+
+def _header(values):
+    return [str(value or '').strip().lower().replace(' ', '_') for value in values]
+
+
+def iter_xlsx_rows(source):
+    """Yield (row number, {column: value}) from the first sheet of an XLSX file.
+
+    The workbook is opened before the first row is asked for, so a file
+    that is not a workbook raises UnreadableFile here.
+    """
+    try:
+        workbook = load_workbook(source, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError) as exc:
+        raise UnreadableFile('This file is not a readable .xlsx workbook.') from exc
+    return _xlsx_rows(workbook)
+
+
+def _xlsx_rows(workbook):
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = _header(next(rows, ()))
+        for number, values in enumerate(rows, start=2):
+            yield number, dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def iter_csv_rows(source):
+    """Yield (row number, {column: value}) from a CSV file or binary stream.
+
+    Text that is not UTF-8 raises UnreadableFile where it is reached.
+    """
+    if isinstance(source, (str, Path)):
+        stream = open(source, newline='', encoding='utf-8-sig')
+    else:
+        stream = io.TextIOWrapper(source, newline='', encoding='utf-8-sig')
+    number = 1
+    try:
+        reader = csv.reader(stream)
+        header = _header(next(reader, ()))
+        for number, values in enumerate(reader, start=2):
+            yield number, dict(zip(header, values))
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise UnreadableFile(f'Could not read the file after row {number}; save it as a UTF-8 CSV.') from exc
+    finally:
+        if isinstance(source, (str, Path)):
+            stream.close()
+        else:
+            stream.detach()
+
+
+def iter_rows(source, filename):
+    if str(filename).lower().endswith(('.xlsx', '.xlsm')):
+        return iter_xlsx_rows(source)
+    if str(filename).lower().endswith('.csv'):
+        return iter_csv_rows(source)
+    raise ValueError('Upload an .xlsx or .csv file.')
+
+
+def import_work_entries(admin, rows, chunk_size=CHUNK_SIZE, on_reject=None, on_chunk=None):
+    """Validate and insert `rows` ((row number, dict) pairs) for `admin`.
+
+    `on_reject(row_number, errors)` sees every rejected row, not only the
+    reported sample; `on_chunk(report)` runs after each inserted chunk.
+    """
+    catalogue = Catalogue(admin)
+    report = ImportReport()
+    chunk = []
+
+    def flush():
+        if chunk:
+            insert_entries(chunk, batch_size=chunk_size)
+            report.imported += len(chunk)
+            chunk.clear()
+            if on_chunk:
+                on_chunk(report)
+
+    try:
+        for number, row in rows:
+            if is_blank_row(row):
+                continue
+            report.processed += 1
+
+            errors = {}
+            category = catalogue.category(row.get('project'), row.get('category'))
+            if category is None:
+                errors['category'] = 'Unknown project/category combination.'
+            user_id = catalogue.user_id(row.get('user'))
+            if user_id is None:
+                errors['user'] = 'Unknown user.'
+            fields, row_errors = clean_row(
+                dict(row, category=category.pk if category else None),
+                catalogue.categories_by_pk,
+            )
+            row_errors.pop('category', None)
+            errors.update(row_errors)
+
+            if errors:
+                report.reject(number, errors)
+                if on_reject:
+                    on_reject(number, errors)
+                continue
+
+            chunk.append(WorkEntry(user_id=user_id, project_id=category.project_id, **fields))
+            if len(chunk) >= chunk_size:
+                flush()
+    except UnreadableFile as exc:
+        # Rows read before the unreadable part are still imported.
+        report.error = str(exc)
+
+    flush()
+    report.finish()
+    return report
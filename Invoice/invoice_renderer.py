@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:         invoice_renderer.py
+# Purpose:      Streams invoice workbooks laid out like InvoiceTemplate.xlsx.
+#
+# Author:       AnikRoy
+# GitHub:       https://github.com/aroyslipk
+#
+# Created:      2026-10-18
+# Copyright:    (c) AnikRoy 2025
+# Licence:      Proprietary
+# -----------------------------------------------------------------------------
+
+"""
+Invoice workbook rendering.
+
+The template is parsed once per process into an InvoiceTemplate, and again
+only when the file changes on disk. It keeps the header rows above the
+first line row, the footer rows from the "Total" row down, merged ranges,
+images, column widths, row heights and page setup. Every distinct cell
+style becomes a named style. Rendering writes a new write_only workbook
+top to bottom: the header, then one row per invoice line as it arrives,
+then the footer, shifted below the lines. Nothing is ever inserted or
+moved, so a 100k-line invoice costs time proportional to its rows, and
+memory stays flat because write_only rows go straight to disk.
+"""
+
+import os
+import pickle
+import threading
+from collections import namedtuple
+from copy import copy, deepcopy
+
+from django.conf import settings
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Border, NamedStyle, Side
+from openpyxl.worksheet.cell_range import CellRange
+
+
+TEMPLATE_PATH = os.path.join(settings.BASE_DIR, 'static', 'template', 'InvoiceTemplate.xlsx')
+
+FIRST_LINE_ROW = 14
+UNIT_PRICE_HEADER = (FIRST_LINE_ROW - 1, 6)
+TOTAL_QUANTITY_COLUMN = 5
+TOTAL_AMOUNT_COLUMN = 7
+IN_WORDS_COLUMN = 2
+
+LINE_STYLE = 'Invoice Line'
+_THIN = Side(style='thin')
+
+SheetLine = namedtuple('SheetLine', ['folder_name', 'category', 'day', 'quantity', 'unit_price', 'amount'])
+
+# One template cell: its column, value and the name of its style (or None).
+TemplateCell = namedtuple('TemplateCell', ['column', 'value', 'style'])
+TemplateRow = namedtuple('TemplateRow', ['height', 'cells'])
+
+_templates = {}
+_template_lock = threading.Lock()
+
+
+class InvoiceTemplate:
+    """The parts of InvoiceTemplate.xlsx that surround the invoice lines.
+
+    Built once from the template file and only read afterwards (see
+    invoice_template()); footer row numbers are kept as offsets from the
+    first footer row, so the footer can follow any number of lines.
+    """
+
+    def __init__(self, path=TEMPLATE_PATH):
+        workbook = load_workbook(path)
+        try:
+            sheet = workbook.active
+            self.title = sheet.title
+            self.footer_start = _footer_start(sheet)
+            self.styles = {}
+            # Line cells look like the template's first line row, boxed in.
+            line = sheet.cell(row=FIRST_LINE_ROW, column=2)
+            self.line_style = (copy(line.font), copy(line.fill), copy(line.alignment), line.number_format, copy(line.protection))
+            self.header = tuple(self._row(sheet, row) for row in range(1, FIRST_LINE_ROW))
+            self.footer = tuple(self._row(sheet, row) for row in range(self.footer_start, sheet.max_row + 1))
+            self.column_widths = {
+                letter: dimension.width
+                for letter, dimension in sheet.column_dimensions.items() if dimension.width
+            }
+            self.header_merges = []
+            self.footer_merges = []
+            for merged in sheet.merged_cells.ranges:
+                if merged.min_row >= self.footer_start:
+                    self.footer_merges.append((
+                        merged.min_col, merged.min_row - self.footer_start,
+                        merged.max_col, merged.max_row - self.footer_start,
+                    ))
+                else:
+                    self.header_merges.append(merged.coord)
+            self.header_images, self.footer_images = [], []
+            for image in sheet._images:
+                anchor_row = getattr(getattr(image.anchor, '_from', None), 'row', 0)
+                # Anchor rows are 0-based; footer images keep their offset.
+                if anchor_row + 1 >= self.footer_start:
+                    self.footer_images.append((image, anchor_row + 1 - self.footer_start))
+                else:
+                    self.header_images.append(image)
+            self.page_margins = copy(sheet.page_margins)
+            self.page_setup = {
+                name: getattr(sheet.page_setup, name)
+                for name in ('orientation', 'paperSize', 'scale', 'fitToWidth', 'fitToHeight')
+            }
+            self.print_options = copy(sheet.print_options)
+            self.sheet_format = copy(sheet.sheet_format)
+            self.show_grid_lines = sheet.sheet_view.showGridLines
+        finally:
+            workbook.close()
+
+    def _row(self, sheet, row):
+        cells = []
+        for cell in sheet[row]:
+            if cell.value is None and not cell.has_style:
+                continue
+            # Unstyled cells still use the template's default font, which a
+            # new workbook does not share; give them a style of their own.
+            cells.append(TemplateCell(cell.column, cell.value, self._style_name(cell)))
+        return TemplateRow(sheet.row_dimensions[row].height if row in sheet.row_dimensions else None, tuple(cells))
+
+    def _style_name(self, cell):
+        key = (copy(cell.font), copy(cell.fill), copy(cell.border), copy(cell.alignment), cell.number_format, copy(cell.protection))
+        if key not in self.styles:
+            self.styles[key] = f'Invoice {len(self.styles) + 1}'
+        return self.styles[key]
+
+    def named_styles(self):
+        """Fresh NamedStyle objects for a new workbook, line style included."""
+        styles = [
+            NamedStyle(
+                name=name, font=font, fill=fill, border=border,
+                alignment=alignment, number_format=number_format, protection=protection,
+            )
+            for (font, fill, border, alignment, number_format, protection), name in self.styles.items()
+        ]
+        font, fill, alignment, number_format, protection = self.line_style
+        styles.append(NamedStyle(
+            name=LINE_STYLE, font=font, fill=fill, alignment=alignment, number_format=number_format,
+            protection=protection, border=Border(left=_THIN, right=_THIN, top=_THIN, bottom=_THIN),
+        ))
+        return styles
+
+
+def invoice_template(path=TEMPLATE_PATH):
+    """The parsed template, shared by every render in this process.
+
+    The file is parsed again only when its modification time or size
+    changes, so editing the template needs no restart.
+    """
+    return _cached(path, 'template', InvoiceTemplate)
+
+
+def template_workbook(path=TEMPLATE_PATH):
+    """A private, fully editable copy of the template workbook.
+
+    For writers that fill the template in place (e.g. the bank invoice).
+    The parsed workbook is cached pickled: unpickling a private copy is
+    about ten times cheaper than parsing the file again, and unlike
+    deepcopy it keeps openpyxl's shared style tables intact.
+    """
+    return pickle.loads(_cached(path, 'workbook', _pickled_workbook))
+
+
+def _cached(path, kind, parse):
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    key = (os.fspath(path), kind)
+    with _template_lock:
+        cached = _templates.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    parsed = parse(path)
+    with _template_lock:
+        _templates[key] = (stamp, parsed)
+    return parsed
+
+
+def _pickled_workbook(path):
+    return pickle.dumps(load_workbook(path), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _footer_start(sheet):
+    for row in range(FIRST_LINE_ROW, sheet.max_row + 1):
+        value = sheet.cell(row=row, column=2).value
+        if isinstance(value, str) and 'Total' in value:
+            return row
+    return sheet.max_row + 1
+
+
+def render_invoice(output, lines, total_quantity, total_label, in_words, unit_price_header=None, template=None):
+    """Write an invoice workbook to `output` (a path or binary file).
+
+    `lines` is any iterable of SheetLine and is consumed once, so a
+    queryset iterator keeps memory flat. Returns the number of lines.
+    """
+    template = template or invoice_template()
+    workbook = Workbook(write_only=True)
+    for style in template.named_styles():
+        workbook.add_named_style(style)
+    sheet = workbook.create_sheet(template.title)
+
+    for letter, width in template.column_widths.items():
+        sheet.column_dimensions[letter].width = width
+    sheet.page_margins = copy(template.page_margins)
+    for name, value in template.page_setup.items():
+        setattr(sheet.page_setup, name, value)
+    sheet.print_options = copy(template.print_options)
+    sheet.sheet_format = copy(template.sheet_format)
+    sheet.sheet_view.showGridLines = template.show_grid_lines
+    for coord in template.header_merges:
+        sheet.merged_cells.add(coord)
+    for image in template.header_images:
+        sheet.add_image(copy(image))
+
+    overrides = {UNIT_PRICE_HEADER: unit_price_header} if unit_price_header else {}
+    for number, row in enumerate(template.header, start=1):
+        _append_template_row(sheet, number, row, overrides)
+
+    # Resolved once: assigning a style by name scans every named style.
+    line_style = _prepared_style(sheet, LINE_STYLE)
+    count = 0
+    for line in lines:
+        sheet.append([None] + [_line_cell(sheet, value, line_style) for value in line])
+        count += 1
+
+    footer_start = FIRST_LINE_ROW + count
+    for min_col, min_offset, max_col, max_offset in template.footer_merges:
+        sheet.merged_cells.add(CellRange(
+            min_col=min_col, min_row=footer_start + min_offset, max_col=max_col, max_row=footer_start + max_offset,
+        ))
+    for image, offset in template.footer_images:
+        sheet.add_image(_shifted_image(image, footer_start + offset - 1 - image.anchor._from.row))
+    for number, row in enumerate(template.footer, start=footer_start):
+        label = next((cell.value for cell in row.cells if cell.column == 2 and isinstance(cell.value, str)), '')
+        overrides = {}
+        if 'Total' in label:
+            overrides = {(number, TOTAL_QUANTITY_COLUMN): total_quantity, (number, TOTAL_AMOUNT_COLUMN): total_label}
+        elif 'In Words' in label:
+            overrides = {(number, IN_WORDS_COLUMN): in_words}
+        _append_template_row(sheet, number, row, overrides)
+
+    workbook.save(output)
+    return count
+
+
+def _append_template_row(sheet, number, row, overrides):
+    if row.height:
+        sheet.row_dimensions[number].height = row.height
+    values = {cell.column: cell for cell in row.cells}
+    columns = set(values) | {column for row_number, column in overrides if row_number == number}
+    cells = [None] * max(columns, default=0)
+    for column in columns:
+        template_cell = values.get(column)
+        value = overrides.get((number, column), template_cell.value if template_cell else None)
+        cell = WriteOnlyCell(sheet, value=value)
+        if template_cell and template_cell.style:
+            cell.style = template_cell.style
+        cells[column - 1] = cell
+    sheet.append(cells)
+
+
+def _shifted_image(image, rows):
+    image = copy(image)
+    image.anchor = deepcopy(image.anchor)
+    image.anchor._from.row += rows
+    if getattr(image.anchor, 'to', None) is not None:
+        image.anchor.to.row += rows
+    return image
+
+
+def _prepared_style(sheet, name):
+    cell = WriteOnlyCell(sheet)
+    cell.style = name
+    return cell._style
+
+
+def _line_cell(sheet, value, style):
+    cell = WriteOnlyCell(sheet, value=value)
+    cell._style = copy(style)
+    return cell
@@ -0,0 +1,435 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:         invoicing.py
+# Purpose:      Selects, prices and stores invoices built from work entries.
+#
+# Author:       AnikRoy
+# GitHub:       https://github.com/aroyslipk
+#
+# Created:      2026-10-18
+# Copyright:    (c) AnikRoy 2025
+# Licence:      Proprietary
+# -----------------------------------------------------------------------------
+
+"""
+Invoice building shared by the invoice views.
+
+An invoice is recorded before it is rendered: its lines are priced from
+the project rate cards and written to InvoiceLine with bulk_create, and
+the totals are aggregated from those rows. The workbook is then streamed
+from the invoice's own lines into the write_only renderer and a temporary
+file stored on the Invoice, so the sheet always matches the recorded
+lines, re-rendering needs no WorkEntry query, and neither the entries nor
+the workbook are ever held in memory.
+
+Summarised invoices (`group_by` GROUP_BY_FOLDER or GROUP_BY_DAY) write one
+line per category and folder, or per category and day, summed by the
+database, so their size follows the number of groups rather than entries.
+Totals and the "In Words" footer are the same as for the detailed invoice.
+
+Every stored invoice carries a fingerprint of what it was built from: the
+filters, the count, highest id and latest modification of the entries in
+range, and the rate-card versions. Asking again for an invoice whose
+fingerprint is unchanged finds the stored file with one indexed lookup
+instead of rendering it again.
+
+Recording an invoice links the entries it bills through
+WorkEntry.billed_invoice, so an invoice of only the unbilled entries reads
+the partial index of unbilled rows instead of the project's history.
+"""
+
+import hashlib
+import json
+import tempfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .caching import current_versions, rate_card_scope, role_scope
+from .invoice_renderer import SheetLine, render_invoice
+from .models import Invoice, InvoiceLine, WorkEntry
+from .rates import priced_totals, rate_cards
+from .revenue import DEFAULT_CURRENCY, amount_in_words, format_totals, primary_currency
+
+
+ITERATOR_CHUNK_SIZE = 2000
+PROGRESS_EVERY = 5000
+LINE_BATCH_SIZE = 2000
+
+GROUP_BY_FOLDER = 'folder'
+GROUP_BY_DAY = 'day'
+GROUP_BY_CHOICES = (
+    (GROUP_BY_FOLDER, 'Category and folder'),
+    (GROUP_BY_DAY, 'Category and day'),
+)
+
+DAY_FORMAT = "%b %d, %Y"
+
+
+def invoice_entries(user, project_id=None, user_id=None, start_date=None, end_date=None, unbilled=False):
+    """The work entries `user` may invoice, narrowed by the invoice filters.
+
+    With `unbilled`, only entries no invoice has billed yet; that filter is
+    served by the partial workentry_unbilled index.
+    """
+    entries = WorkEntry.objects.all()
+    if unbilled:
+        entries = entries.filter(billed_invoice__isnull=True)
+    if user.role == 'admin':
+        entries = entries.filter(project__managed_by=user)
+    if project_id:
+        entries = entries.filter(project_id=project_id)
+    if user_id:
+        entries = entries.filter(user_id=user_id)
+    return entries_between(entries, start_date, end_date)
+
+
+def entries_between(entries, start_date=None, end_date=None):
+    """Narrow `entries` to the local days `start_date` to `end_date`, inclusive.
+
+    Days may be `date` objects or 'YYYY-MM-DD' strings. They become a
+    half-open range of aware datetimes on `date`, so the (project, date)
+    and workentry_unbilled indexes can serve it; a lookup on date__date
+    would wrap the column in a function.
+    """
+    if start_date:
+        entries = entries.filter(date__gte=_day_start(_as_day(start_date)))
+    if end_date:
+        entries = entries.filter(date__lt=_day_start(_as_day(end_date) + timedelta(days=1)))
+    return entries
+
+
+def _as_day(value):
+    if isinstance(value, date):
+        return value
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(f"Invalid date: {value!r}")
+    return day
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min), timezone.get_current_timezone())
+
+
+def invoice_totals(entries, rate_card):
+    """(total quantity, {currency: amount}) of `entries`, in one query."""
+    rows = entries.order_by().values('category_id').annotate(total=Sum('quantity'))
+    quantities = {row['category_id']: row['total'] or 0 for row in rows}
+    total_quantity = sum(quantities.values())
+    quantities.pop(None, None)
+    return total_quantity, priced_totals(quantities, rate_card)
+
+
+def invoice_preview(entries, group_by=None):
+    """What the invoice of `entries` would hold, from SQL aggregates only.
+
+    Returns a JSON-ready dict with the line count, total quantity, the
+    amount per currency and the total and "In Words" texts as the sheet
+    would show them; no workbook is built and nothing is stored.
+    """
+    project_ids = entries.order_by().values_list('project_id', flat=True).distinct()
+    total_quantity, totals = invoice_totals(entries, rate_cards(project_ids))
+    currency = primary_currency(totals)
+    return {
+        'lines': invoice_line_count(entries, group_by),
+        'total_quantity': total_quantity,
+        'currency': currency,
+        'totals': {code: str(amount) for code, amount in sorted(totals.items())},
+        'total_label': str(totals.get(currency, Decimal('0.00'))) if len(totals) <= 1 else format_totals(totals),
+        'in_words': amount_in_words(totals),
+    }
+
+
+def invoice_line_records(invoice, entries, rate_card, group_by=None):
+    """Yield the unsaved InvoiceLine rows of `invoice`, in sheet order.
+
+    One line per entry, oldest first, or one per (category, folder) or
+    (category, day) group with the quantities summed in SQL. Every line is
+    priced from `rate_card`.
+    """
+    if group_by:
+        rows = _grouped_rows(entries, group_by)
+    else:
+        rows = entries.order_by('date', 'id').values('id', 'folder_name', 'category_id', 'date', 'quantity')
+    for row in rows.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+        rate = rate_card.get(row['category_id'])
+        unit_rate = rate.rate if rate else Decimal('0.00')
+        quantity = row['quantity'] or 0
+        if group_by == GROUP_BY_DAY:
+            first_day = last_day = row['day']
+        elif group_by == GROUP_BY_FOLDER:
+            first_day, last_day = timezone.localdate(row['first_date']), timezone.localdate(row['last_date'])
+        else:
+            first_day = last_day = timezone.localdate(row['date'])
+        yield InvoiceLine(
+            invoice=invoice,
+            entry_id=row.get('id'),
+            category_id=row['category_id'] if rate else None,
+            category_name=rate.name if rate else "N/A",
+            folder_name=row.get('folder_name', ''),
+            first_day=first_day,
+            last_day=last_day,
+            entry_count=row.get('entries', 1),
+            quantity=quantity,
+            unit_rate=unit_rate,
+            currency=(rate.currency or DEFAULT_CURRENCY) if rate else '',
+            amount=quantity * unit_rate,
+        )
+
+
+def sheet_lines(invoice):
+    """Yield the SheetLines of a recorded invoice, read from its InvoiceLine rows only."""
+    rows = invoice.lines.order_by('id').values_list(
+        'folder_name', 'category_name', 'first_day', 'last_day', 'entry_count', 'quantity', 'unit_rate', 'amount',
+    )
+    for folder_name, category_name, first_day, last_day, entry_count, quantity, unit_rate, amount in rows.iterator(
+        chunk_size=ITERATOR_CHUNK_SIZE
+    ):
+        if invoice.group_by == GROUP_BY_DAY:
+            particulars = f"{entry_count} {'entry' if entry_count == 1 else 'entries'}"
+        else:
+            particulars = folder_name
+        yield SheetLine(particulars, category_name, _day_span(first_day, last_day), quantity, unit_rate, amount)
+
+
+def recorded_totals(invoice):
+    """(total quantity, {currency: amount}) of a recorded invoice, in one query."""
+    rows = invoice.lines.order_by().values('currency').annotate(quantity=Sum('quantity'), amount=Sum('amount'))
+    total_quantity, totals = 0, {}
+    for row in rows:
+        total_quantity += row['quantity'] or 0
+        if row['currency']:
+            totals[row['currency']] = (row['amount'] or Decimal('0.00')).quantize(Decimal('0.01'))
+    return total_quantity, totals
+
+
+def invoice_line_count(entries, group_by=None):
+    """How many lines the invoice of `entries` will have."""
+    if group_by:
+        return _grouped_rows(entries, group_by).count()
+    return entries.count()
+
+
+def _grouped_rows(entries, group_by):
+    entries = entries.order_by()
+    if group_by == GROUP_BY_FOLDER:
+        return (
+            entries.values('category_id', 'folder_name')
+            .annotate(quantity=Sum('quantity'), entries=Count('id'), first_date=Min('date'), last_date=Max('date'))
+            .order_by('first_date', 'folder_name', 'category_id')
+        )
+    if group_by == GROUP_BY_DAY:
+        return (
+            entries.annotate(day=TruncDate('date', tzinfo=timezone.get_current_timezone()))
+            .values('day', 'category_id')
+            .annotate(quantity=Sum('quantity'), entries=Count('id'))
+            .order_by('day', 'category_id')
+        )
+    raise ValueError(f'Unknown invoice grouping: {group_by!r}')
+
+
+def _day_span(first, last):
+    if first == last:
+        return first.strftime(DAY_FORMAT)
+    return f"{first.strftime(DAY_FORMAT)} - {last.strftime(DAY_FORMAT)}"
+
+
+def invoice_params(user_id=None, start_date=None, end_date=None, group_by=None, unbilled=False):
+    """The filters and options of an invoice request, as fingerprinted and queued."""
+    return {
+        'user_id': user_id or None,
+        'start_date': start_date or None,
+        'end_date': end_date or None,
+        'group_by': group_by or None,
+        'unbilled': bool(unbilled),
+    }
+
+
+def invoice_fingerprint(user, project, entries, params):
+    """Content address of the invoice of `entries`, as stored on Invoice.fingerprint.
+
+    Any insert, edit or delete in range moves the entry count, highest id
+    or latest updated_at, and any rate change moves a rate-card version,
+    so an unchanged fingerprint means an identical workbook. `params` are
+    the invoice filters and options.
+    """
+    entries = entries.order_by()
+    stamp = entries.aggregate(count=Count('id'), last_id=Max('id'), modified=Max('updated_at'))
+    project_ids = {project.pk} | set(entries.values_list('project_id', flat=True).distinct())
+    versions = current_versions([rate_card_scope(pk) for pk in project_ids])
+    raw = json.dumps(
+        [role_scope(user), project.pk, params, stamp, sorted((scope, version) for scope, (version, _) in versions.items())],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def stored_invoice(fingerprint):
+    """The newest invoice built with `fingerprint` whose file still exists, or None."""
+    invoice = Invoice.objects.filter(fingerprint=fingerprint).order_by('-generated_at', '-id').first()
+    if invoice is None or not invoice_file_exists(invoice):
+        return None
+    return invoice
+
+
+def invoice_file_exists(invoice):
+    """Whether the workbook of `invoice` is on storage; ephemeral disks lose files."""
+    return bool(invoice.invoice_file) and invoice.invoice_file.storage.exists(invoice.invoice_file.name)
+
+
+def invoice_filename(project, when=None):
+    when = when or timezone.now()
+    return f"Invoice_{project.name}_{when.year}_{when.month}.xlsx"
+
+
+def record_invoice(project, entries, group_by=None, **fields):
+    """Create an Invoice of `project` with the InvoiceLine rows of `entries`.
+
+    The entries nothing billed yet are marked as billed by this invoice,
+    lines are written with bulk_create in batches from the billed entries
+    (see bill_entries()) and the totals are taken from them, all in one
+    transaction. The workbook is not rendered
+    here (see render_recorded_invoice()); `fields` are further Invoice
+    fields such as start_date or fingerprint.
+    """
+    project_ids = {project.pk} | set(entries.order_by().values_list('project_id', flat=True).distinct())
+    rate_card = rate_cards(project_ids)
+    with transaction.atomic():
+        invoice = Invoice.objects.create(
+            project=project, project_name_snapshot=project.name, group_by=group_by or '', **fields
+        )
+        record_invoice_lines(invoice, bill_entries(invoice, entries), rate_card, group_by)
+        invoice.total_amount = recorded_total_amount(invoice)
+        invoice.save(update_fields=['total_amount'])
+    return invoice
+
+
+def bill_entries(invoice, entries):
+    """Link the still unbilled `entries` to `invoice` and return what it bills.
+
+    The returned queryset is those entries plus the ones in `entries` an
+    earlier invoice billed, which keep that invoice, so billing them again
+    shows up in double_billed_lines(). Write the invoice lines from it: an
+    entry committed after the UPDATE is unbilled and left out of both, so
+    nothing is ever marked billed without a line.
+    """
+    WorkEntry.objects.filter(
+        pk__in=entries.order_by().filter(billed_invoice__isnull=True).values('pk'),
+    ).update(billed_invoice=invoice)
+    return WorkEntry.objects.filter(
+        Q(billed_invoice=invoice) | Q(pk__in=entries.order_by().filter(billed_invoice__isnull=False).values('pk'))
+    )
+
+
+def double_billed_lines():
+    """Invoice lines billing an entry that a different invoice billed first.
+
+    Only per-entry lines name their entry; a summarised line (see
+    GROUP_BY_CHOICES) has none, so double billing through a summarised
+    invoice is not found here.
+    """
+    return (
+        InvoiceLine.objects.filter(entry__billed_invoice__isnull=False)
+        .exclude(invoice_id=F('entry__billed_invoice_id'))
+    )
+
+
+def recorded_total_amount(invoice):
+    """The figure stored on Invoice.total_amount for a recorded invoice.
+
+    It holds a single amount; with mixed currencies it records the main
+    one while the sheet itself lists every currency.
+    """
+    _, totals = recorded_totals(invoice)
+    return totals.get(primary_currency(totals), Decimal('0.00'))
+
+
+def record_invoice_lines(invoice, entries, rate_card, group_by=None):
+    """bulk_create the InvoiceLine rows of `invoice`; returns how many."""
+    batch, count = [], 0
+    for line in invoice_line_records(invoice, entries, rate_card, group_by):
+        batch.append(line)
+        if len(batch) >= LINE_BATCH_SIZE:
+            InvoiceLine.objects.bulk_create(batch)
+            count += len(batch)
+            batch = []
+    InvoiceLine.objects.bulk_create(batch)
+    return count + len(batch)
+
+
+def render_recorded_invoice(invoice, output, progress=None):
+    """Render the workbook of a recorded invoice to `output` (a path or binary file).
+
+    Reads only the invoice's own lines. Returns the number of lines;
+    `progress(lines_written)` is called every PROGRESS_EVERY lines and
+    once more when all lines are written.
+    """
+    total_quantity, totals = recorded_totals(invoice)
+    currency = primary_currency(totals)
+    return render_invoice(
+        output,
+        _reporting(sheet_lines(invoice), progress),
+        total_quantity=total_quantity,
+        total_label=invoice.total_amount if len(totals) <= 1 else format_totals(totals),
+        in_words=amount_in_words(totals),
+        unit_price_header=f"Per Unit Price ({currency})" if len(totals) <= 1 else None,
+    )
+
+
+def store_invoice_file(invoice, workbook_file, when=None, save=True):
+    """Attach a rendered workbook to `invoice` under its usual file name."""
+    name = invoice_filename(invoice.project, when) if invoice.project else f"Invoice_{invoice.pk}.xlsx"
+    invoice.invoice_file.save(name, File(workbook_file), save=save)
+
+
+def build_invoice(project, entries, start_date=None, end_date=None, progress=None, group_by=None, fingerprint=''):
+    """Record `entries` as an Invoice of `project`, then render and store its workbook.
+
+    `progress` is passed on to render_recorded_invoice(). If rendering
+    fails the recorded invoice is removed again.
+    """
+    invoice = record_invoice(
+        project, entries, group_by,
+        start_date=start_date or None, end_date=end_date or None, fingerprint=fingerprint,
+    )
+    try:
+        with tempfile.TemporaryFile() as workbook_file:
+            render_recorded_invoice(invoice, workbook_file, progress)
+            workbook_file.seek(0)
+            store_invoice_file(invoice, workbook_file)
+    except Exception:
+        invoice.delete()
+        raise
+    return invoice
+
+
+def restore_invoice_file(invoice):
+    """Render the workbook of a recorded invoice again and store it.
+
+    For invoices whose file was lost; the lines are the record, so the
+    new file bills exactly what the old one did.
+    """
+    with tempfile.TemporaryFile() as workbook_file:
+        render_recorded_invoice(invoice, workbook_file)
+        workbook_file.seek(0)
+        store_invoice_file(invoice, workbook_file, when=invoice.generated_at)
+
+
+def _reporting(lines, progress):
+    if progress is None:
+        yield from lines
+        return
+    written = 0
+    for written, line in enumerate(lines, start=1):
+        yield line
+        if written % PROGRESS_EVERY == 0:
+            progress(written)
+    progress(written)
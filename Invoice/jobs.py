@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:         jobs.py
+# Purpose:      Database-backed queue of invoice builds.
+#
+# Author:       AnikRoy
+# GitHub:       https://github.com/aroyslipk
+#
+# Created:      2026-10-18
+# Copyright:    (c) AnikRoy 2025
+# Licence:      Proprietary
+# -----------------------------------------------------------------------------
+
+"""
+Invoice job queue.
+
+Web requests call `enqueue_invoice` and return at once; the
+run_invoice_worker command runs `run_worker`, which claims queued jobs one
+at a time and builds them with invoicing.build_invoice, writing progress
+back to the job as lines are rendered. Any number of worker processes can
+share the queue: claims use SELECT ... FOR UPDATE SKIP LOCKED where the
+backend supports it and a conditional UPDATE on the status elsewhere, so a
+job is only ever taken by one worker. Deployments without a worker
+(settings.INVOICE_WORKER unset) build each job in its request instead,
+through `run_job_now`.
+
+Identical requests (same invoice fingerprint, see
+invoicing.invoice_fingerprint) coalesce onto one job: the request key of
+queued and running jobs is unique in the database, so a double-click, or
+two super admins exporting the same range, builds one workbook and both
+download the same file.
+"""
+
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .invoicing import (
+    build_invoice, invoice_entries, invoice_file_exists, invoice_fingerprint, invoice_line_count, invoice_params,
+)
+from .models import InvoiceJob
+
+
+POLL_INTERVAL = 2.0
+STALE_AFTER = timedelta(hours=1)
+CLAIM_CANDIDATES = 10
+ENQUEUE_ATTEMPTS = 3
+
+
+def enqueue_invoice(
+    requested_by, project, user_id=None, start_date=None, end_date=None, group_by=None, unbilled=False, fingerprint=None,
+):
+    """Queue an invoice of `project` for the given filters and return the job.
+
+    `group_by` asks for a summarised invoice (see invoicing.GROUP_BY_CHOICES)
+    and `unbilled` for one of the entries no invoice billed yet.
+    A request with the same fingerprint as a job that is still queued or
+    running, or that finished, gets that job back instead of a new build;
+    a job of it left running longer than STALE_AFTER is queued again first.
+    Pass `fingerprint` when the caller already computed it.
+    """
+    params = invoice_params(user_id, start_date, end_date, group_by, unbilled)
+    if fingerprint is None:
+        entries = invoice_entries(
+            requested_by, project_id=project.pk, user_id=user_id, start_date=start_date, end_date=end_date,
+            unbilled=unbilled,
+        )
+        fingerprint = invoice_fingerprint(requested_by, project, entries, params)
+    # A build of the same invoice that died with its request or worker
+    # would otherwise be joined forever; queue it again instead.
+    requeue_stale_jobs(request_key=fingerprint)
+    for _ in range(ENQUEUE_ATTEMPTS):
+        job = _reusable_job(fingerprint)
+        if job is not None:
+            return job
+        try:
+            with transaction.atomic():
+                return InvoiceJob.objects.create(
+                    requested_by=requested_by, project=project, params=params, request_key=fingerprint,
+                )
+        except IntegrityError:
+            # A concurrent identical request created its job first; join it.
+            continue
+    # The competing job kept finishing in between; give up on sharing.
+    return _reusable_job(fingerprint) or InvoiceJob.objects.create(requested_by=requested_by, project=project, params=params)
+
+
+def _reusable_job(key):
+    jobs = InvoiceJob.objects.filter(request_key=key).order_by('-created_at', '-id')
+    live = jobs.filter(status__in=[InvoiceJob.STATUS_QUEUED, InvoiceJob.STATUS_RUNNING]).first()
+    if live is not None:
+        return live
+    done = jobs.filter(status=InvoiceJob.STATUS_DONE, invoice__isnull=False).select_related('invoice').first()
+    # A finished job is only worth joining while its file is still stored.
+    if done is not None and invoice_file_exists(done.invoice):
+        return done
+    return None
+
+
+def job_entries(job):
+    return invoice_entries(
+        job.requested_by,
+        project_id=job.project_id,
+        user_id=job.params.get('user_id'),
+        start_date=job.params.get('start_date'),
+        end_date=job.params.get('end_date'),
+        unbilled=job.params.get('unbilled', False),
+    )
+
+
+def claim_next_job(worker):
+    """Mark the oldest queued job as running for `worker` and return it, or None."""
+    queued = InvoiceJob.objects.filter(status=InvoiceJob.STATUS_QUEUED).order_by('created_at', 'id')
+    now = timezone.now()
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = queued.select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            job.status, job.worker, job.started_at = InvoiceJob.STATUS_RUNNING, worker, now
+            job.save(update_fields=['status', 'worker', 'started_at'])
+            return job
+
+    for job_id in queued.values_list('id', flat=True)[:CLAIM_CANDIDATES]:
+        claimed = InvoiceJob.objects.filter(pk=job_id, status=InvoiceJob.STATUS_QUEUED).update(
+            status=InvoiceJob.STATUS_RUNNING, worker=worker, started_at=now,
+        )
+        if claimed:
+            return InvoiceJob.objects.get(pk=job_id)
+    return None
+
+
+def run_job_now(job, worker):
+    """Build a queued job in this process, for deployments without a worker.
+
+    The claim is the same conditional UPDATE a worker makes, so a job that
+    somebody else already took is left alone. Returns the job as it is now.
+    """
+    claimed = InvoiceJob.objects.filter(pk=job.pk, status=InvoiceJob.STATUS_QUEUED).update(
+        status=InvoiceJob.STATUS_RUNNING, worker=worker, started_at=timezone.now(),
+    )
+    job.refresh_from_db()
+    if claimed:
+        run_job(job)
+    return job
+
+
+def run_job(job):
+    """Build the invoice of a claimed job and record the outcome on it.
+
+    Any error, including one while counting the lines, fails the job
+    rather than the worker.
+    """
+    def progress(written):
+        InvoiceJob.objects.filter(pk=job.pk).update(lines_written=written)
+
+    try:
+        entries = job_entries(job)
+        group_by = job.params.get('group_by')
+        job.total_lines = invoice_line_count(entries, group_by)
+        # Taken again now, so the stored invoice matches the entries it shows.
+        fingerprint = invoice_fingerprint(job.requested_by, job.project, entries, job.params)
+        job.save(update_fields=['total_lines'])
+        invoice = build_invoice(
+            job.project, entries, job.params.get('start_date'), job.params.get('end_date'),
+            progress=progress, group_by=group_by, fingerprint=fingerprint,
+        )
+    except Exception:
+        job.status, job.error = InvoiceJob.STATUS_FAILED, traceback.format_exc()
+    else:
+        job.status, job.invoice, job.lines_written = InvoiceJob.STATUS_DONE, invoice, job.total_lines
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'invoice', 'lines_written', 'finished_at'])
+    return job
+
+
+def requeue_stale_jobs(older_than=STALE_AFTER, request_key=None):
+    """Put back jobs whose worker died mid-build. Returns how many.
+
+    With `request_key`, only the jobs of that request.
+    """
+    stale = InvoiceJob.objects.filter(status=InvoiceJob.STATUS_RUNNING, started_at__lt=timezone.now() - older_than)
+    if request_key is not None:
+        stale = stale.filter(request_key=request_key)
+    return stale.update(status=InvoiceJob.STATUS_QUEUED, worker='', started_at=None, lines_written=0)
+
+
+def run_worker(worker, once=False, poll_interval=POLL_INTERVAL, on_job=None):
+    """Process queued jobs until stopped, or until the queue is empty if `once`.
+
+    Whenever the queue is empty, jobs left running by a dead worker are put
+    back (see requeue_stale_jobs). `on_job(job)` is called after each
+    finished job. Returns the number of jobs processed.
+    """
+    processed = 0
+    while True:
+        job = claim_next_job(worker)
+        if job is None:
+            if requeue_stale_jobs():
+                continue
+            if once:
+                return processed
+            time.sleep(poll_interval)
+            continue
+        run_job(job)
+        processed += 1
+        if on_job:
+            on_job(job)
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from Invoice.models import ClientProject
+from Invoice.slots import allocate_slots
+
+
+class Command(BaseCommand):
+    help = 'Pre-provision empty work slots, e.g. at the start of a month'
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int, help='Number of slots to create per project')
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--project', type=int, action='append', help='Project id (repeatable)')
+        target.add_argument(
+            '--admin',
+            help='Email of an admin; slots are added to each of their active projects',
+        )
+
+    def handle(self, *args, **options):
+        if options['project']:
+            projects = ClientProject.objects.filter(pk__in=options['project'])
+            missing = set(options['project']) - set(projects.values_list('pk', flat=True))
+            if missing:
+                raise CommandError(f"Unknown project id(s): {', '.join(map(str, sorted(missing)))}")
+        else:
+            today = timezone.localdate()
+            projects = ClientProject.objects.filter(
+                Q(end_date__isnull=True) | Q(end_date__gte=today),
+                managed_by__email__iexact=options['admin'],
+            )
+
+        total = 0
+        for project in projects.order_by('name'):
+            try:
+                slot_ids = allocate_slots(project, options['count'])
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            total += len(slot_ids)
+            if slot_ids:
+                self.stdout.write(f"{project.name}: {len(slot_ids)} slots (ids {slot_ids[0]}-{slot_ids[-1]})")
+        self.stdout.write(self.style.SUCCESS(f"Allocated {total} slots"))
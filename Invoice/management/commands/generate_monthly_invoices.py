@@ -0,0 +1,103 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from Invoice.invoicing import GROUP_BY_CHOICES
+from Invoice.monthly import billable_projects, discard_unfinished_invoices, generate_monthly_invoices, monthly_totals
+from Invoice.revenue import format_totals
+
+
+class Command(BaseCommand):
+    help = 'Create the monthly invoice of every project with billable entries in a month'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month',
+            help='Month to invoice as YYYY-MM (default: the previous month)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of processes rendering workbooks (default: one per core)',
+        )
+        parser.add_argument(
+            '--group-by',
+            choices=[value for value, _ in GROUP_BY_CHOICES],
+            help='Write summarised invoices with one line per category and folder, or per category and day',
+        )
+        parser.add_argument(
+            '--unbilled',
+            action='store_true',
+            help='Bill every entry up to the end of the month that no invoice billed yet, instead of the month only',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Also invoice projects that already have an invoice for the month',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report the totals of each project without creating invoices',
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1.')
+        year, month = self._month(options['month'])
+
+        if not options['dry_run']:
+            discarded = discard_unfinished_invoices(year, month)
+            if discarded:
+                self.stdout.write(self.style.WARNING(f"Removed {discarded} invoices a previous run left without a file"))
+
+        projects = billable_projects(year, month, force=options['force'], unbilled=options['unbilled'])
+        if not projects:
+            self.stdout.write(f"No projects to invoice for {year}-{month:02d}")
+            return
+
+        if options['dry_run']:
+            lines = 0
+            for row in monthly_totals(projects, year, month, unbilled=options['unbilled']):
+                lines += row.lines
+                self.stdout.write(
+                    f"{row.project.name}: {row.lines} entries, {row.quantity} units, "
+                    f"{format_totals(row.totals) or '0.00'}"
+                )
+            self.stdout.write(self.style.SUCCESS(
+                f"Dry run: {len(projects)} projects, {lines} entries for {year}-{month:02d}; nothing was created"
+            ))
+            return
+
+        def built(project, build):
+            self.stdout.write(f"{project.name}: {build.lines} lines, {build.total_amount} in {build.seconds:.2f}s")
+
+        def failed(project, exc):
+            self.stderr.write(f"{project.name}: failed: {exc!r}")
+
+        started = time.monotonic()
+        invoices = generate_monthly_invoices(
+            projects, year, month, workers=options['workers'], group_by=options['group_by'], unbilled=options['unbilled'],
+            on_build=built, on_error=failed,
+        )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(invoices)} of {len(projects)} invoices for {year}-{month:02d} in {elapsed:.2f}s"
+        ))
+        if len(invoices) < len(projects):
+            raise CommandError(f"{len(projects) - len(invoices)} invoices failed; run the command again to retry them.")
+
+    def _month(self, value):
+        if not value:
+            today = timezone.localdate()
+            return (today.year, today.month - 1) if today.month > 1 else (today.year - 1, 12)
+        try:
+            year, month = (int(part) for part in value.split('-'))
+        except ValueError:
+            raise CommandError('--month must look like YYYY-MM.')
+        if not 1 <= month <= 12:
+            raise CommandError('--month must look like YYYY-MM.')
+        return year, month
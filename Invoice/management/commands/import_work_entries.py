@@ -0,0 +1,68 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Invoice.importer import CHUNK_SIZE, import_work_entries, iter_rows
+from Invoice.models import User
+
+
+class Command(BaseCommand):
+    help = 'Import work entries from an XLSX or CSV work log'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the .xlsx or .csv file')
+        parser.add_argument(
+            '--admin',
+            required=True,
+            help='Email of the admin whose projects, categories and team the rows refer to',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help=f'Number of entries inserted per transaction (default: {CHUNK_SIZE})',
+        )
+        parser.add_argument(
+            '--rejects',
+            help='Write every rejected row number and its errors to this CSV file',
+        )
+
+    def handle(self, *args, **options):
+        admin = User.objects.filter(email__iexact=options['admin'], role__in=['admin', 'super_admin']).first()
+        if admin is None:
+            raise CommandError(f"No admin with email {options['admin']}")
+
+        try:
+            rows = iter_rows(options['path'], options['path'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        rejects_file = open(options['rejects'], 'w', newline='') if options['rejects'] else None
+        try:
+            on_reject = None
+            if rejects_file:
+                writer = csv.writer(rejects_file)
+                writer.writerow(['row', 'errors'])
+                on_reject = lambda number, errors: writer.writerow(
+                    [number, '; '.join(f'{field}: {message}' for field, message in errors.items())]
+                )
+
+            def on_chunk(report):
+                self.stdout.write(f'  {report.imported} imported, {report.rejected} rejected...')
+
+            report = import_work_entries(
+                admin, rows, chunk_size=options['chunk_size'], on_reject=on_reject, on_chunk=on_chunk,
+            )
+        finally:
+            if rejects_file:
+                rejects_file.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report.imported} of {report.processed} rows in {report.elapsed:.2f}s "
+            f"({report.rows_per_second:.0f} rows/sec), {report.rejected} rejected"
+        ))
+        for reject in report.rejects[:20]:
+            details = '; '.join(f'{field}: {message}' for field, message in reject['errors'].items())
+            self.stdout.write(self.style.WARNING(f"  row {reject['row']}: {details}"))
+        if report.error:
+            raise CommandError(report.error)
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from Invoice.caching import bump_all_versions
+from Invoice.rollups import rebuild_rollups
+from Invoice.stats import rebuild_user_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily work entry rollups and the per-user stats used by the dashboard'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rollup rows inserted per query (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        created = rebuild_rollups(batch_size=options['batch_size'])
+        users = rebuild_user_stats()
+        bump_all_versions()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {created} daily rollup rows and stats for {users} users in {elapsed:.2f}s"
+        ))
@@ -0,0 +1,70 @@
+import multiprocessing
+import os
+import socket
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from Invoice.jobs import POLL_INTERVAL, requeue_stale_jobs, run_worker
+
+
+class Command(BaseCommand):
+    help = 'Build queued invoices; run as many of these as there are cores to spare'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of worker processes to start (default: 1)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when the queue is empty instead of polling for new jobs',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=POLL_INTERVAL,
+            help=f'Seconds to wait between polls of an empty queue (default: {POLL_INTERVAL})',
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1.')
+
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Re-queued {requeued} stale invoice jobs"))
+
+        if options['workers'] == 1:
+            self._work(options, f'{socket.gethostname()}:{os.getpid()}')
+            return
+
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise CommandError('--workers > 1 needs a platform that supports fork; start several commands instead.')
+        # Children must not share the parent's database connection.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=self._work, args=(options, f'{socket.gethostname()}:{os.getpid()}/{number}'))
+            for number in range(1, options['workers'] + 1)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+    def _work(self, options, name):
+        def report(job):
+            if job.status == job.STATUS_DONE:
+                self.stdout.write(self.style.SUCCESS(
+                    f"[{name}] job {job.pk}: {job.total_lines} lines in "
+                    f"{(job.finished_at - job.started_at).total_seconds():.2f}s"
+                ))
+            else:
+                self.stderr.write(f"[{name}] job {job.pk} failed:\n{job.error}")
+
+        processed = run_worker(name, once=options['once'], poll_interval=options['poll_interval'], on_job=report)
+        self.stdout.write(f"[{name}] processed {processed} invoice jobs")
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def populate_rollups(apps, schema_editor):
+    WorkEntry = apps.get_model('Invoice', 'WorkEntry')
+    WorkEntryDailyRollup = apps.get_model('Invoice', 'WorkEntryDailyRollup')
+    grouped = (
+        WorkEntry.objects.order_by()
+        .annotate(day=TruncDate('date', tzinfo=timezone.get_default_timezone()))
+        .values('project_id', 'user_id', 'category_id', 'day')
+        .annotate(entry_count=Count('id'), total_quantity=Sum('quantity'))
+    )
+    WorkEntryDailyRollup.objects.bulk_create(
+        (
+            WorkEntryDailyRollup(
+                project_id=row['project_id'],
+                user_id=row['user_id'],
+                category_id=row['category_id'],
+                day=row['day'],
+                entry_count=row['entry_count'],
+                total_quantity=row['total_quantity'] or 0,
+            )
+            for row in grouped.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Invoice', '0010_remove_user_managed_by_user_created_by'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkEntryDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('entry_count', models.IntegerField(default=0)),
+                ('total_quantity', models.BigIntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_rollups', to='Invoice.category')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='Invoice.clientproject')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'day'], name='Invoice_wor_project_85f63e_idx'), models.Index(fields=['day'], name='Invoice_wor_day_2c2e20_idx')],
+                'unique_together': {('project', 'user', 'category', 'day')},
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Invoice', '0011_workentrydailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workentry',
+            index=models.Index(fields=['project', 'date'], name='Invoice_wor_project_a55d9e_idx'),
+        ),
+    ]
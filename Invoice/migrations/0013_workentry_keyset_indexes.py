@@ -0,0 +1,21 @@
+# Generated by Django 5.2.1 on 2026-10-18 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Invoice', '0012_workentry_project_date_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workentry',
+            index=models.Index(fields=['user', 'date', 'id'], name='Invoice_wor_user_id_caf1e4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workentry',
+            index=models.Index(fields=['date', 'id'], name='Invoice_wor_date_17881a_idx'),
+        ),
+    ]
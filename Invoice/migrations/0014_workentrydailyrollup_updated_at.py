@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-18 15:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Invoice', '0013_workentry_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workentrydailyrollup',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
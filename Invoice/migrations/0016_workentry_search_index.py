@@ -0,0 +1,84 @@
+# Generated by Django 5.2.1 on 2026-10-18 15:40
+
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS "Invoice_workentry_search"
+    USING fts5(folder_name, category_name, tokenize='trigram')
+    """,
+    """
+    INSERT INTO "Invoice_workentry_search" (rowid, folder_name, category_name)
+    SELECT e."id", e."folder_name", COALESCE(c."name", '')
+    FROM "Invoice_workentry" e LEFT JOIN "Invoice_category" c ON c."id" = e."category_id"
+    """,
+    """
+    CREATE TRIGGER "Invoice_workentry_search_insert" AFTER INSERT ON "Invoice_workentry" BEGIN
+        INSERT INTO "Invoice_workentry_search" (rowid, folder_name, category_name)
+        VALUES (new."id", new."folder_name",
+                COALESCE((SELECT "name" FROM "Invoice_category" WHERE "id" = new."category_id"), ''));
+    END
+    """,
+    """
+    CREATE TRIGGER "Invoice_workentry_search_update" AFTER UPDATE OF "folder_name", "category_id" ON "Invoice_workentry" BEGIN
+        UPDATE "Invoice_workentry_search"
+        SET folder_name = new."folder_name",
+            category_name = COALESCE((SELECT "name" FROM "Invoice_category" WHERE "id" = new."category_id"), '')
+        WHERE rowid = new."id";
+    END
+    """,
+    """
+    CREATE TRIGGER "Invoice_workentry_search_delete" AFTER DELETE ON "Invoice_workentry" BEGIN
+        DELETE FROM "Invoice_workentry_search" WHERE rowid = old."id";
+    END
+    """,
+    """
+    CREATE TRIGGER "Invoice_category_search_rename" AFTER UPDATE OF "name" ON "Invoice_category" BEGIN
+        UPDATE "Invoice_workentry_search" SET category_name = new."name"
+        WHERE rowid IN (SELECT "id" FROM "Invoice_workentry" WHERE "category_id" = new."id");
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS "Invoice_category_search_rename"',
+    'DROP TRIGGER IF EXISTS "Invoice_workentry_search_delete"',
+    'DROP TRIGGER IF EXISTS "Invoice_workentry_search_update"',
+    'DROP TRIGGER IF EXISTS "Invoice_workentry_search_insert"',
+    'DROP TABLE IF EXISTS "Invoice_workentry_search"',
+]
+
+POSTGRESQL_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS "Invoice_workentry_folder_trgm" '
+    'ON "Invoice_workentry" USING gin ((UPPER("folder_name"::text)) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS "Invoice_category_name_trgm" '
+    'ON "Invoice_category" USING gin ((UPPER("name"::text)) gin_trgm_ops)',
+]
+
+POSTGRESQL_BACKWARD = [
+    'DROP INDEX IF EXISTS "Invoice_category_name_trgm"',
+    'DROP INDEX IF EXISTS "Invoice_workentry_folder_trgm"',
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Invoice', '0015_dataversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD}),
+            _run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRESQL_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.1 on 2026-10-18 15:08
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+
+def populate_user_stats(apps, schema_editor):
+    WorkEntryDailyRollup = apps.get_model('Invoice', 'WorkEntryDailyRollup')
+    UserWorkStats = apps.get_model('Invoice', 'UserWorkStats')
+    month = timezone.localdate().replace(day=1)
+    this_month = Q(day__gte=month, day__lt=(month + timedelta(days=32)).replace(day=1))
+    rows = (
+        WorkEntryDailyRollup.objects.filter(user__isnull=False)
+        .values('user_id', 'project_id')
+        .annotate(
+            entries=Sum('entry_count'),
+            quantity=Sum('total_quantity'),
+            month_entries=Sum('entry_count', filter=this_month),
+            month_quantity=Sum('total_quantity', filter=this_month),
+        )
+        .order_by('user_id')
+    )
+    stats = {}
+    for row in rows:
+        user_stats = stats.setdefault(row['user_id'], UserWorkStats(user_id=row['user_id'], month=month, project_counts={}))
+        user_stats.total_entries += row['entries'] or 0
+        user_stats.total_quantity += row['quantity'] or 0
+        user_stats.month_entries += row['month_entries'] or 0
+        user_stats.month_quantity += row['month_quantity'] or 0
+        if row['entries']:
+            user_stats.project_counts[str(row['project_id'])] = row['entries']
+    for user_stats in stats.values():
+        if user_stats.project_counts:
+            counts = user_stats.project_counts
+            user_stats.top_project_id = int(max(counts, key=lambda key: (counts[key], -int(key))))
+    UserWorkStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Invoice', '0016_workentry_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserWorkStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='work_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('month', models.DateField(help_text='First day of the month the month_* counters cover')),
+                ('month_entries', models.IntegerField(default=0)),
+                ('month_quantity', models.BigIntegerField(default=0)),
+                ('total_entries', models.IntegerField(default=0)),
+                ('total_quantity', models.BigIntegerField(default=0)),
+                ('project_counts', models.JSONField(default=dict, help_text='Entry count per project id')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('top_project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='Invoice.clientproject')),
+            ],
+        ),
+        migrations.RunPython(populate_user_stats, migrations.RunPython.noop),
+    ]
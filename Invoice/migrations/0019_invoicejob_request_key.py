@@ -0,0 +1,22 @@
+# Generated by Django 5.2.1 on 2026-10-18 15:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Invoice', '0018_invoicejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoicejob',
+            name='request_key',
+            field=models.CharField(blank=True, help_text='Scope, filters and data versions of the request; identical active requests share one job', max_length=64),
+        ),
+        migrations.AddConstraint(
+            model_name='invoicejob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['queued', 'running']), models.Q(('request_key', ''), _negated=True)), fields=('request_key',), name='invoice_job_single_flight'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:40
+
+from importlib import import_module
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+search_index = import_module('Invoice.migrations.0016_workentry_search_index')
+
+# SQLite rebuilds Invoice_workentry to add a column, which its search
+# triggers do not survive; they are dropped first and created again after.
+# The search table itself is keyed by entry id and stays valid.
+SQLITE_TRIGGERS = [statement for statement in search_index.SQLITE_FORWARD if 'CREATE TRIGGER' in statement]
+SQLITE_DROP_TRIGGERS = [statement for statement in search_index.SQLITE_BACKWARD if 'DROP TRIGGER' in statement]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Invoice', '0019_invoicejob_request_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, help_text='Hash of the filters, entry stamps and rate-card versions the file was built from', max_length=64),
+        ),
+        migrations.RunPython(
+            search_index._run({'sqlite': SQLITE_DROP_TRIGGERS}),
+            search_index._run({'sqlite': SQLITE_TRIGGERS}),
+        ),
+        migrations.AddField(
+            model_name='workentry',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(
+            search_index._run({'sqlite': SQLITE_TRIGGERS}),
+            search_index._run({'sqlite': SQLITE_DROP_TRIGGERS}),
+        ),
+        migrations.AlterField(
+            model_name='invoicejob',
+            name='request_key',
+            field=models.CharField(blank=True, help_text='Fingerprint of the requested invoice; identical active requests share one job', max_length=64),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.1 on 2026-10-18 15:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Invoice', '0020_invoice_fingerprint_workentry_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='group_by',
+            field=models.CharField(blank=True, help_text="How lines are summarised: 'folder', 'day' or empty for one line per entry", max_length=10),
+        ),
+        migrations.CreateModel(
+            name='InvoiceLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category_name', models.CharField(max_length=100)),
+                ('folder_name', models.CharField(blank=True, max_length=100)),
+                ('first_day', models.DateField()),
+                ('last_day', models.DateField()),
+                ('entry_count', models.PositiveIntegerField(default=1)),
+                ('quantity', models.BigIntegerField(default=0)),
+                ('unit_rate', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('currency', models.CharField(blank=True, help_text='Empty for entries without a category', max_length=3)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='Invoice.category')),
+                ('entry', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='invoice_lines', to='Invoice.workentry')),
+                ('invoice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='Invoice.invoice')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['category', 'first_day'], name='Invoice_inv_categor_6d1603_idx'), models.Index(fields=['currency', 'first_day'], name='Invoice_inv_currenc_b86f9c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 15:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Invoice', '0021_invoiceline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workentry',
+            name='billed_invoice',
+            field=models.ForeignKey(blank=True, help_text='The first invoice that billed this entry; cleared when that invoice is deleted', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='billed_entries', to='Invoice.invoice'),
+        ),
+        migrations.AddIndex(
+            model_name='workentry',
+            index=models.Index(condition=models.Q(('billed_invoice__isnull', True)), fields=['project', 'date'], name='workentry_unbilled'),
+        ),
+    ]
@@ -114,10 +114,100 @@ class WorkEntry(models.Model):
     quantity = models.PositiveIntegerField()
     date = models.DateTimeField(default=timezone.now)
     is_slot = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    billed_invoice = models.ForeignKey(
+        'Invoice',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='billed_entries',
+        help_text="The first invoice that billed this entry; cleared when that invoice is deleted",
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'date']),
+            models.Index(fields=['user', 'date', 'id']),
+            models.Index(fields=['date', 'id']),
+            models.Index(
+                fields=['project', 'date'],
+                condition=models.Q(billed_invoice__isnull=True),
+                name='workentry_unbilled',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.folder_name}"
-    
+
+class WorkEntryDailyRollup(models.Model):
+    """
+    Per-day totals of work entries, kept in step with WorkEntry writes
+    (see Invoice/rollups.py) so dashboard aggregates scan days, not entries.
+    """
+    project = models.ForeignKey(
+        'ClientProject',
+        on_delete=models.CASCADE,
+        related_name='daily_rollups'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='daily_rollups'
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='daily_rollups'
+    )
+    day = models.DateField()
+    entry_count = models.IntegerField(default=0)
+    total_quantity = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('project', 'user', 'category', 'day')
+        indexes = [
+            models.Index(fields=['project', 'day']),
+            models.Index(fields=['day']),
+        ]
+
+    def __str__(self):
+        return f"{self.project_id} - {self.day}: {self.entry_count} entries"
+
+class UserWorkStats(models.Model):
+    """
+    Running work totals of one user, written through on every WorkEntry
+    change (see Invoice/stats.py) so the unfiltered work summary is a
+    single primary-key lookup.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='work_stats'
+    )
+    month = models.DateField(help_text="First day of the month the month_* counters cover")
+    month_entries = models.IntegerField(default=0)
+    month_quantity = models.BigIntegerField(default=0)
+    total_entries = models.IntegerField(default=0)
+    total_quantity = models.BigIntegerField(default=0)
+    project_counts = models.JSONField(default=dict, help_text="Entry count per project id")
+    top_project = models.ForeignKey(
+        'ClientProject',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.total_entries} entries"
+
 class UserLoginHistory(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='login_history')
@@ -147,8 +237,115 @@ class Invoice(models.Model):
     start_date = models.DateField(null=True, blank=True)
     end_date = models.DateField(null=True, blank=True)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    fingerprint = models.CharField(
+        max_length=64, blank=True, db_index=True,
+        help_text="Hash of the filters, entry stamps and rate-card versions the file was built from",
+    )
+    group_by = models.CharField(
+        max_length=10, blank=True,
+        help_text="How lines are summarised: 'folder', 'day' or empty for one line per entry",
+    )
     invoice_file = models.FileField(upload_to='invoices/')
     generated_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"Invoice for {self.project_name_snapshot} ({self.generated_at.strftime('%b %Y')}) - Amount: ${self.total_amount}"
\ No newline at end of file
+        return f"Invoice for {self.project_name_snapshot} ({self.generated_at.strftime('%b %Y')}) - Amount: ${self.total_amount}"
+
+
+class InvoiceLine(models.Model):
+    """
+    One billed line of an invoice, priced when the invoice was generated.
+    The workbook is rendered from these rows, and reports over billed
+    history aggregate them instead of re-pricing WorkEntry at today's rates.
+    Summarised lines have no source entry and cover entry_count entries.
+    """
+    invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name='lines')
+    entry = models.ForeignKey(WorkEntry, on_delete=models.SET_NULL, null=True, blank=True, related_name='invoice_lines')
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    category_name = models.CharField(max_length=100)
+    folder_name = models.CharField(max_length=100, blank=True)
+    first_day = models.DateField()
+    last_day = models.DateField()
+    entry_count = models.PositiveIntegerField(default=1)
+    quantity = models.BigIntegerField(default=0)
+    unit_rate = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    currency = models.CharField(max_length=3, blank=True, help_text="Empty for entries without a category")
+    amount = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'first_day']),
+            models.Index(fields=['currency', 'first_day']),
+        ]
+
+    def __str__(self):
+        return f"{self.invoice_id}: {self.category_name} x {self.quantity}"
+
+class DataVersion(models.Model):
+    """
+    Write counter for one cache scope ('all', 'admin:<id>', 'project:<id>',
+    'user:<id>', 'catalog', 'rates:<id>'). Cached payloads embed the versions they were
+    built from, so bumping a counter retires every entry of its scope.
+    """
+    scope = models.CharField(max_length=64, unique=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.scope} v{self.version}"
+
+
+class InvoiceJob(models.Model):
+    """
+    A queued invoice build. Web requests only create the job; the
+    run_invoice_worker command claims it, builds the invoice and links it
+    here, updating the progress counters as lines are written.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='invoice_jobs')
+    project = models.ForeignKey(ClientProject, on_delete=models.CASCADE, related_name='invoice_jobs')
+    params = models.JSONField(default=dict, help_text="Invoice filters: user_id, start_date, end_date")
+    request_key = models.CharField(
+        max_length=64, blank=True,
+        help_text="Fingerprint of the requested invoice; identical active requests share one job",
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    total_lines = models.PositiveIntegerField(default=0)
+    lines_written = models.PositiveIntegerField(default=0)
+    invoice = models.ForeignKey(Invoice, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'created_at'])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['request_key'],
+                condition=models.Q(status__in=['queued', 'running']) & ~models.Q(request_key=''),
+                name='invoice_job_single_flight',
+            ),
+        ]
+
+    @property
+    def progress(self):
+        if self.status == self.STATUS_DONE:
+            return 100
+        if not self.total_lines:
+            return 0
+        return min(99, self.lines_written * 100 // self.total_lines)
+
+    def __str__(self):
+        return f"Invoice job {self.pk} ({self.status})"
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:         monthly.py
+# Purpose:      Month-end invoicing of every project with billable entries.
+#
+# Author:       AnikRoy
+# GitHub:       https://github.com/aroyslipk
+#
+# Created:      2026-10-18
+# Copyright:    (c) AnikRoy 2025
+# Licence:      Proprietary
+# -----------------------------------------------------------------------------
+
+"""
+Month-end batch invoicing.
+
+The month's Invoice rows are created with one bulk_create and their lines
+recorded in the same transaction. Rendering a workbook is CPU-bound
+Python, so the workbooks are then built from those lines in a pool of
+forked processes, each writing one invoice to a scratch file; the
+children only read from the database. The parent stores the finished
+files with one bulk_update. An invoice whose build or storing fails is
+reported and removed, so the next run picks its project up again; one
+left without a file by a crashed run is removed by the next run (see
+discard_unfinished_invoices).
+"""
+
+import calendar
+import multiprocessing
+import os
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+
+from django.db import connections, transaction
+
+from .invoicing import (
+    bill_entries, entries_between, invoice_totals, record_invoice_lines, recorded_total_amount, render_recorded_invoice, store_invoice_file,
+)
+from .models import ClientProject, Invoice, WorkEntry
+from .rates import rate_cards
+from .signals import invoices_changed
+
+
+# One rendered workbook: its project, where it is, what it bills and how long it took.
+MonthlyBuild = namedtuple('MonthlyBuild', ['project_id', 'path', 'total_amount', 'lines', 'seconds'])
+MonthlyTotals = namedtuple('MonthlyTotals', ['project', 'lines', 'quantity', 'totals'])
+
+
+def month_range(year, month):
+    """(first day, last day) of a calendar month."""
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def month_entries(project_id, start_date, end_date, unbilled=False):
+    """Every work entry of a project dated within the range, whoever logged it.
+
+    With `unbilled`, instead every entry up to `end_date` that no invoice
+    billed yet, so late entries of earlier months are billed too; this
+    reads the partial index of unbilled rows.
+    """
+    if unbilled:
+        return entries_between(WorkEntry.objects.filter(project_id=project_id, billed_invoice__isnull=True), end_date=end_date)
+    return entries_between(WorkEntry.objects.filter(project_id=project_id), start_date, end_date)
+
+
+def billable_projects(year, month, force=False, unbilled=False):
+    """Projects with categorised entries to bill for the month, by name.
+
+    Projects that already have a stored invoice for the month are left
+    out unless `force`; `unbilled` is as for month_entries().
+    """
+    start_date, end_date = month_range(year, month)
+    entries = WorkEntry.objects.filter(category__isnull=False)
+    if unbilled:
+        entries = entries_between(entries.filter(billed_invoice__isnull=True), end_date=end_date)
+    else:
+        entries = entries_between(entries, start_date, end_date)
+    projects = ClientProject.objects.filter(pk__in=entries.values('project_id'))
+    if not force:
+        invoiced = Invoice.objects.filter(year=year, month=month).exclude(invoice_file='')
+        projects = projects.exclude(pk__in=invoiced.values('project_id'))
+    return list(projects.order_by('name'))
+
+
+def discard_unfinished_invoices(year, month):
+    """Delete the month's invoices that were recorded but never stored.
+
+    A run that died between recording and storing leaves them behind; the
+    entries they billed become unbilled again. Returns how many were deleted.
+    """
+    unfinished = Invoice.objects.filter(year=year, month=month, invoice_file='')
+    project_ids = set(unfinished.values_list('project_id', flat=True))
+    deleted = unfinished.delete()[1].get(Invoice._meta.label, 0)
+    if deleted:
+        invoices_changed(project_ids)
+    return deleted
+
+
+def monthly_totals(projects, year, month, unbilled=False):
+    """Yield MonthlyTotals per project, computed in SQL without rendering."""
+    start_date, end_date = month_range(year, month)
+    card = rate_cards(project.pk for project in projects)
+    for project in projects:
+        entries = month_entries(project.pk, start_date, end_date, unbilled)
+        quantity, totals = invoice_totals(entries, card)
+        yield MonthlyTotals(project, entries.count(), quantity, totals)
+
+
+def render_monthly_workbook(invoice_id, directory):
+    """Render a recorded invoice into `directory`.
+
+    Runs in a pool process, so it takes and returns only plain values.
+    """
+    started = time.monotonic()
+    invoice = Invoice.objects.get(pk=invoice_id)
+    path = os.path.join(directory, f'{invoice_id}.xlsx')
+    lines = render_recorded_invoice(invoice, path)
+    return MonthlyBuild(invoice.project_id, path, invoice.total_amount, lines, time.monotonic() - started)
+
+
+def generate_monthly_invoices(
+    projects, year, month, workers=None, group_by=None, unbilled=False, on_build=None, on_error=None,
+):
+    """Record, render and store the month's invoice of every project in `projects`.
+
+    Workbooks are rendered by `workers` forked processes (one per core by
+    default; with 1, or without fork, they are rendered in this process).
+    `on_build(project, build)` is called as each workbook is ready and
+    `on_error(project, exc)` when one fails; that invoice is removed and
+    the others are kept. `group_by` makes them summarised invoices (see
+    invoicing.GROUP_BY_CHOICES); `unbilled` is as for month_entries().
+    Returns the stored invoices.
+    """
+    invoices = record_monthly_invoices(projects, year, month, group_by, unbilled)
+    by_id = {invoice.pk: invoice for invoice in invoices}
+    projects = {project.pk: project for project in projects}
+    stored, failed = [], []
+    with tempfile.TemporaryDirectory() as directory:
+        for invoice_id, outcome in _render_all(list(by_id), directory, workers or os.cpu_count() or 1):
+            invoice = by_id[invoice_id]
+            if isinstance(outcome, Exception):
+                failed.append(invoice_id)
+                if on_error:
+                    on_error(projects[invoice.project_id], outcome)
+                continue
+            try:
+                with open(outcome.path, 'rb') as workbook_file:
+                    store_invoice_file(invoice, workbook_file, when=invoice.start_date, save=False)
+            except Exception as e:
+                failed.append(invoice_id)
+                if on_error:
+                    on_error(projects[invoice.project_id], e)
+                continue
+            stored.append(invoice)
+            if on_build:
+                on_build(projects[invoice.project_id], outcome)
+
+    Invoice.objects.bulk_update(stored, ['invoice_file'])
+    if failed:
+        Invoice.objects.filter(pk__in=failed).delete()
+    return stored
+
+
+def record_monthly_invoices(projects, year, month, group_by=None, unbilled=False):
+    """Create the month's Invoice rows with one bulk_create, with their lines.
+
+    The entries they bill are marked as billed by them. The invoices have
+    no file yet; see generate_monthly_invoices().
+    """
+    start_date, end_date = month_range(year, month)
+    card = rate_cards(project.pk for project in projects)
+    with transaction.atomic():
+        invoices = Invoice.objects.bulk_create([
+            Invoice(
+                project=project,
+                project_name_snapshot=project.name,
+                group_by=group_by or '',
+                month=month,
+                year=year,
+                start_date=start_date,
+                end_date=end_date,
+            )
+            for project in projects
+        ])
+        for invoice in invoices:
+            entries = month_entries(invoice.project_id, start_date, end_date, unbilled)
+            record_invoice_lines(invoice, bill_entries(invoice, entries), card, group_by)
+            invoice.total_amount = recorded_total_amount(invoice)
+        Invoice.objects.bulk_update(invoices, ['total_amount'])
+        invoices_changed({invoice.project_id for invoice in invoices})
+    return invoices
+
+
+def _render_all(invoice_ids, directory, workers):
+    """Yield (invoice id, MonthlyBuild or the exception raised), as they finish."""
+    if workers == 1 or len(invoice_ids) <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        for invoice_id in invoice_ids:
+            try:
+                yield invoice_id, render_monthly_workbook(invoice_id, directory)
+            except Exception as e:
+                yield invoice_id, e
+        return
+
+    # Forked children must open their own database connections.
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    with ProcessPoolExecutor(max_workers=min(workers, len(invoice_ids)), mp_context=context) as pool:
+        futures = {pool.submit(render_monthly_workbook, invoice_id, directory): invoice_id for invoice_id in invoice_ids}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                yield futures[future], e
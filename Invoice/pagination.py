@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:         pagination.py
+# Purpose:      Keyset (cursor) pagination for work entry listings.
+#
+# Author:       AnikRoy
+# GitHub:       https://github.com/aroyslipk
+#
+# Created:      2026-10-18
+# Copyright:    (c) AnikRoy 2025
+# Licence:      Proprietary
+# -----------------------------------------------------------------------------
+
+"""
+Keyset pagination over WorkEntry ordered newest first on (date, id).
+
+Instead of OFFSET and a COUNT(*), each page remembers the (date, id) of its
+first and last rows in opaque cursor tokens, and the next query seeks
+straight past them. Every page costs the same however deep the reader goes.
+"""
+
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+CURSOR_PARAM = 'cursor'
+PAGING_PARAM = 'paging'
+CURSOR_MODE = 'cursor'
+
+
+def cursor_mode_requested(params):
+    """Cursor mode is opt-in: `?paging=cursor`, or any request carrying a cursor."""
+    return params.get(PAGING_PARAM) == CURSOR_MODE or bool(params.get(CURSOR_PARAM))
+
+
+def encode_cursor(entry, before=False):
+    payload = {'d': entry.date.isoformat(), 'i': entry.pk}
+    if before:
+        payload['b'] = 1
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return (date, id, before) for a cursor token, or None if it is invalid."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        position = parse_datetime(payload['d'])
+        entry_id = int(payload['i'])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        return None
+    if position is None:
+        return None
+    return position, entry_id, bool(payload.get('b'))
+
+
+class KeysetPage:
+    """One page of entries plus the cursors of its neighbours."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def paginate_by_cursor(queryset, token, per_page):
+    """Fetch the page of `queryset` that the cursor `token` points at.
+
+    Runs a single LIMIT query of `per_page + 1` rows; the extra row only
+    tells whether another page exists in the direction of travel.
+    """
+    cursor = decode_cursor(token)
+    if cursor is None:
+        rows = list(queryset.order_by('-date', '-id')[:per_page + 1])
+        has_more, has_fewer = len(rows) > per_page, False
+        rows = rows[:per_page]
+    else:
+        position, entry_id, before = cursor
+        if before:
+            rows = list(
+                queryset.filter(Q(date__gt=position) | Q(date=position, id__gt=entry_id))
+                .order_by('date', 'id')[:per_page + 1]
+            )
+            has_fewer, has_more = len(rows) > per_page, True
+            rows = rows[:per_page][::-1]
+        else:
+            rows = list(
+                queryset.filter(Q(date__lt=position) | Q(date=position, id__lt=entry_id))
+                .order_by('-date', '-id')[:per_page + 1]
+            )
+            has_more, has_fewer = len(rows) > per_page, True
+            rows = rows[:per_page]
+
+    if not rows:
+        return KeysetPage([])
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(rows[-1]) if has_more else None,
+        previous_cursor=encode_cursor(rows[0], before=True) if has_fewer else None,
+    )
+
+
+def cursor_querystring(params, token):
+    """The current query string with `cursor` set to `token`, filters kept."""
+    query = params.copy()
+    query.pop('page', None)
+    query[PAGING_PARAM] = CURSOR_MODE
+    query[CURSOR_PARAM] = token
+    return query.urlencode()
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:         rates.py
+# Purpose:      Bulk rate-card edits and CSV rate-card upserts for a project.
+#
+# Author:       AnikRoy
+# GitHub:       https://github.com/aroyslipk
+#
+# Created:      2026-10-18
+# Copyright:    (c) AnikRoy 2025
+# Licence:      Proprietary
+# -----------------------------------------------------------------------------
+
+"""
+Rate-card maintenance.
+
+A project's rate card is its set of categories with their rate and
+currency. Edits fetch every target with one in_bulk query, validate all of
+them, and write them with one bulk_update, or not at all. A rate-card file
+is applied with INSERT ... ON CONFLICT (project, name) DO UPDATE, one
+statement per batch rather than a lookup and a save per category. Both
+paths skip model signals, so the cache versions are bumped through
+signals.categories_changed.
+
+Expected columns for uploads (header row, case-insensitive): name, rate and
+optionally currency.
+
+Readers that price entries (invoices, user reports) resolve category ids
+through `rate_cards()`, an in-process cache of each project's rate card
+keyed by the project's 'rates:<id>' DataVersion. Any category write bumps
+that version, so a stale card is never used; checking it costs one small
+query for all requested projects instead of a join on every entry.
+"""
+
+import threading
+from collections import defaultdict, namedtuple
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Sum
+
+from .caching import current_versions, rate_card_scope
+from .models import Category, WorkEntry
+from .revenue import DEFAULT_CURRENCY
+from .signals import categories_changed
+
+
+MAX_RATE_CARD_ROWS = 5000
+UPDATE_BATCH_SIZE = 500
+
+RATE_COLUMNS = ('name', 'rate', 'currency')
+
+_RATE_FIELD = Category._meta.get_field('rate')
+_NAME_MAX_LENGTH = Category._meta.get_field('name').max_length
+_CURRENCIES = {code for code, _ in Category.CURRENCY_CHOICES}
+
+
+Rate = namedtuple('Rate', ['name', 'rate', 'currency'])
+
+_rate_cards = {}
+_rate_cards_lock = threading.Lock()
+
+
+class RateCardResult:
+    """Outcome of a rate-card change: counts written or per-row errors."""
+
+    def __init__(self, created=0, updated=0, errors=None):
+        self.created = created
+        self.updated = updated
+        self.errors = errors or []
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+def parse_rate(value):
+    """A rate as a Decimal with the model's precision; ValueError if invalid."""
+    try:
+        rate = Decimal(str(value).strip())
+    except (InvalidOperation, TypeError):
+        raise ValueError(f'Invalid rate: {value!r}')
+    if not rate.is_finite() or rate < 0:
+        raise ValueError(f'Invalid rate: {value!r}')
+    try:
+        rate = rate.quantize(Decimal(1).scaleb(-_RATE_FIELD.decimal_places))
+    except InvalidOperation:
+        rate = None
+    if rate is None or len(rate.as_tuple().digits) > _RATE_FIELD.max_digits:
+        raise ValueError(f'Rate too large: {value!r}')
+    return rate
+
+
+def update_rates(project, rates):
+    """Set the rates of `project`'s categories from {category id: rate}.
+
+    Unknown ids and invalid rates are reported and nothing is written.
+    """
+    categories = Category.objects.filter(project=project).in_bulk(list(rates))
+    changed, errors = [], []
+    for category_id, value in rates.items():
+        category = categories.get(category_id)
+        if category is None:
+            errors.append({'row': category_id, 'errors': {'category': 'Not a category of this project.'}})
+            continue
+        try:
+            rate = parse_rate(value)
+        except ValueError as e:
+            errors.append({'row': category_id, 'errors': {'rate': str(e)}})
+            continue
+        if rate != category.rate:
+            category.rate = rate
+            changed.append(category)
+
+    if errors:
+        return RateCardResult(errors=errors)
+    if changed:
+        with transaction.atomic():
+            Category.objects.bulk_update(changed, ['rate'], batch_size=UPDATE_BATCH_SIZE)
+            categories_changed([project.pk])
+    return RateCardResult(updated=len(changed))
+
+
+def check_entry_prices(project, prices):
+    """Check {work entry id: price} edits against the entries' category rates.
+
+    Entries carry no price of their own; each bills at its category's rate,
+    and changing that rate re-prices every entry of the category, so it is
+    only done on the rate card (see update_rates). A posted price that
+    differs from its category's rate is rejected and nothing is written.
+    """
+    entries = (
+        WorkEntry.objects.filter(project=project, category__isnull=False)
+        .select_related('category')
+        .in_bulk(list(prices))
+    )
+    errors = []
+    for entry_id, value in prices.items():
+        entry = entries.get(entry_id)
+        if entry is None:
+            errors.append({'row': entry_id, 'errors': {'entry': 'Not a priced entry of this project.'}})
+            continue
+        try:
+            rate = parse_rate(value)
+        except ValueError as e:
+            errors.append({'row': entry_id, 'errors': {'rate': str(e)}})
+            continue
+        if rate != entry.category.rate:
+            errors.append({'row': entry_id, 'errors': {
+                'rate': f"Billed at the '{entry.category.name}' rate of {entry.category.rate}; change it on the rate card.",
+            }})
+    return RateCardResult(errors=errors)
+
+
+def import_rate_card(project, rows, managed_by):
+    """Create or update `project`'s categories from (row number, dict) rows.
+
+    Names match existing categories case-insensitively; new categories are
+    managed by `managed_by`. Either every row is written or none is.
+    """
+    existing = {
+        name.lower(): (name, currency)
+        for name, currency in Category.objects.filter(project=project).values_list('name', 'currency')
+    }
+    categories, seen, errors = [], set(), []
+    for number, row in rows:
+        if not any(str(value).strip() for value in row.values() if value is not None):
+            continue
+        if len(categories) + len(errors) >= MAX_RATE_CARD_ROWS:
+            errors.append({'row': number, 'errors': {'rows': f'Upload at most {MAX_RATE_CARD_ROWS} categories at a time.'}})
+            break
+
+        row_errors = {}
+        name = str(row.get('name') or '').strip()
+        if not name:
+            row_errors['name'] = 'This field is required.'
+        elif len(name) > _NAME_MAX_LENGTH:
+            row_errors['name'] = f'Ensure this value has at most {_NAME_MAX_LENGTH} characters.'
+        elif name.lower() in seen:
+            row_errors['name'] = 'Listed more than once.'
+        try:
+            rate = parse_rate(row.get('rate'))
+        except ValueError as e:
+            row_errors['rate'] = str(e)
+        stored_name, stored_currency = existing.get(name.lower(), (name, 'USD'))
+        currency = str(row.get('currency') or '').strip().upper() or stored_currency
+        if currency not in _CURRENCIES:
+            row_errors['currency'] = f"Use one of {', '.join(sorted(_CURRENCIES))}."
+
+        if row_errors:
+            errors.append({'row': number, 'errors': row_errors})
+            continue
+        seen.add(name.lower())
+        categories.append(Category(
+            project=project, name=stored_name, rate=rate, currency=currency, managed_by=managed_by,
+        ))
+
+    if errors:
+        return RateCardResult(errors=errors)
+    if categories:
+        with transaction.atomic():
+            Category.objects.bulk_create(
+                categories,
+                update_conflicts=True,
+                unique_fields=['project', 'name'],
+                update_fields=['rate', 'currency'],
+            )
+            categories_changed([project.pk])
+    updated = sum(1 for category in categories if category.name.lower() in existing)
+    return RateCardResult(created=len(categories) - updated, updated=updated)
+
+
+def rate_cards(project_ids):
+    """{category id: Rate} covering the rate cards of `project_ids`.
+
+    Cards whose version is unchanged come from this process's cache; the
+    others are loaded together in one query.
+    """
+    project_ids = {pk for pk in project_ids if pk}
+    if not project_ids:
+        return {}
+    versions = current_versions([rate_card_scope(pk) for pk in project_ids])
+    card, stale = {}, {}
+    with _rate_cards_lock:
+        for pk in project_ids:
+            version = versions[rate_card_scope(pk)]
+            cached = _rate_cards.get(pk)
+            if cached is not None and cached[0] == version:
+                card.update(cached[1])
+            else:
+                stale[pk] = version
+
+    if stale:
+        loaded = defaultdict(dict)
+        rows = Category.objects.filter(project_id__in=list(stale)).values_list('id', 'project_id', 'name', 'rate', 'currency')
+        for category_id, project_id, name, rate, currency in rows:
+            loaded[project_id][category_id] = Rate(name, rate, currency)
+        with _rate_cards_lock:
+            for pk, version in stale.items():
+                _rate_cards[pk] = (version, loaded[pk])
+                card.update(loaded[pk])
+    return card
+
+
+def clear_rate_cards():
+    with _rate_cards_lock:
+        _rate_cards.clear()
+
+
+def category_quantities(entries):
+    """{category id: total quantity} of a WorkEntry queryset, without joins."""
+    rows = entries.order_by().filter(category__isnull=False).values('category_id').annotate(total=Sum('quantity'))
+    return {row['category_id']: row['total'] or 0 for row in rows}
+
+
+def priced_totals(quantities, card):
+    """{currency: Decimal} for {category id: quantity} priced from `card`."""
+    totals = defaultdict(Decimal)
+    for category_id, quantity in quantities.items():
+        rate = card.get(category_id)
+        if rate is not None:
+            totals[rate.currency or DEFAULT_CURRENCY] += quantity * rate.rate
+    return {currency: amount.quantize(Decimal('0.01')) for currency, amount in totals.items()}
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:         revenue.py
+# Purpose:      SQL-side revenue totals (quantity x category rate) per currency.
+#
+# Author:       AnikRoy
+# GitHub:       https://github.com/aroyslipk
+#
+# Created:      2026-10-18
+# Copyright:    (c) AnikRoy 2025
+# Licence:      Proprietary
+# -----------------------------------------------------------------------------
+
+"""
+Revenue service shared by the dashboard and the invoice generators.
+
+Amounts are computed in the database as Sum(quantity * category__rate) and
+kept apart per Category.currency, so USD and EUR work never end up in the
+same number. Entries without a category carry no rate and are left out.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import DecimalField, F, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+from num2words import num2words
+
+
+CURRENCY_WORDS = {
+    'USD': 'US Dollars',
+    'EUR': 'Euros',
+    'AUD': 'Australian Dollars',
+    'INR': 'Rupees',
+    'GBP': 'Pounds',
+    'JPY': 'Yen',
+}
+
+DEFAULT_CURRENCY = 'USD'
+
+_AMOUNT = Sum(
+    F('quantity') * F('category__rate'),
+    output_field=DecimalField(max_digits=20, decimal_places=2),
+)
+
+
+def monthly_revenue_by_currency(entries):
+    """Amounts of a WorkEntry queryset as {(year, month): {currency: Decimal}}."""
+    tz = timezone.get_default_timezone()
+    rows = (
+        entries.order_by()
+        .filter(category__isnull=False)
+        .annotate(year=ExtractYear('date', tzinfo=tz), month=ExtractMonth('date', tzinfo=tz))
+        .values('year', 'month', 'category__currency')
+        .annotate(amount=_AMOUNT)
+    )
+    revenue = defaultdict(dict)
+    for row in rows:
+        revenue[(row['year'], row['month'])][row['category__currency']] = _money(row['amount'])
+    return dict(revenue)
+
+
+def _money(value):
+    return Decimal(value or 0).quantize(Decimal('0.01'))
+
+
+def primary_currency(totals):
+    """The currency carrying the largest amount, used to label an invoice."""
+    if not totals:
+        return DEFAULT_CURRENCY
+    return max(totals, key=lambda currency: totals[currency])
+
+
+def format_totals(totals):
+    """'USD 10.00 + EUR 4.50' style label for mixed-currency totals."""
+    return ' + '.join(f"{currency} {amount:,.2f}" for currency, amount in sorted(totals.items()))
+
+
+def amount_in_words(totals):
+    """The 'In Words' footer line of an invoice for the given totals."""
+    if not totals:
+        totals = {DEFAULT_CURRENCY: Decimal('0.00')}
+    parts = [
+        f"{num2words(amount, lang='en').title()} {CURRENCY_WORDS.get(currency.upper(), CURRENCY_WORDS[DEFAULT_CURRENCY])}"
+        for currency, amount in sorted(totals.items())
+    ]
+    return f"In Words: {' And '.join(parts)} Only"
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:         rollups.py
+# Purpose:      Maintains the per-day WorkEntry rollups used by the dashboard.
+#
+# Author:       AnikRoy
+# GitHub:       https://github.com/aroyslipk
+#
+# Created:      2026-10-18
+# Copyright:    (c) AnikRoy 2025
+# Licence:      Proprietary
+# -----------------------------------------------------------------------------
+
+"""
+Daily rollups of work entries.
+
+Every WorkEntry contributes one to `entry_count` and its quantity to
+`total_quantity` of the rollup row for its (project, user, category, day).
+Writes go through `apply_entry_change` (wired to the model signals in
+signals.py), `apply_entries_added` for bulk inserts or `apply_entry_changes`
+for bulk updates, both of which bypass signals.
+Readers always Sum() over rows, so an occasional duplicate row for a key with
+a NULL user or category never skews the totals.
+"""
+
+from collections import defaultdict, namedtuple
+from datetime import date, datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import WorkEntry, WorkEntryDailyRollup
+
+
+EntryState = namedtuple('EntryState', ['project_id', 'user_id', 'category_id', 'day', 'quantity'])
+
+
+def entry_day(value):
+    """Calendar day of an entry's `date` in the project's default timezone."""
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value, timezone.get_default_timezone())
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return parse_date(str(value)[:10])
+
+
+def entry_state(entry):
+    """Snapshot of the fields of a WorkEntry that feed the rollups."""
+    return EntryState(
+        project_id=entry.project_id,
+        user_id=entry.user_id,
+        category_id=entry.category_id,
+        day=entry_day(entry.date),
+        quantity=entry.quantity or 0,
+    )
+
+
+def apply_entry_change(old, new):
+    """Move one entry's contribution from the `old` state to the `new` one.
+
+    Either side may be None for a create or a delete.
+    """
+    apply_entry_changes([(old, new)])
+
+
+def apply_entry_changes(changes):
+    """Apply a batch of (old, new) state pairs, e.g. from bulk_update."""
+    deltas = defaultdict(lambda: [0, 0])
+    for old, new in changes:
+        if old is not None:
+            key = old[:4]
+            deltas[key][0] -= 1
+            deltas[key][1] -= old.quantity
+        if new is not None:
+            key = new[:4]
+            deltas[key][0] += 1
+            deltas[key][1] += new.quantity
+    _apply_deltas(deltas)
+
+
+def apply_entries_added(entries):
+    """Add a batch of freshly inserted entries (e.g. from bulk_create)."""
+    deltas = defaultdict(lambda: [0, 0])
+    for entry in entries:
+        state = entry_state(entry)
+        deltas[state[:4]][0] += 1
+        deltas[state[:4]][1] += state.quantity
+    _apply_deltas(deltas)
+
+
+def _apply_deltas(deltas):
+    deltas = {key: delta for key, delta in deltas.items() if delta[0] or delta[1]}
+    if not deltas:
+        return
+    with transaction.atomic():
+        existing = _existing_rows(deltas)
+        missing = []
+        for key, (count, quantity) in deltas.items():
+            row_id = existing.get(key)
+            if row_id is not None:
+                _bump(row_id, count, quantity)
+            elif count > 0:
+                missing.append(key)
+            if count < 0:
+                WorkEntryDailyRollup.objects.filter(entry_count__lte=0, **_key_fields(key)).delete()
+        if missing:
+            _create_missing(missing, deltas)
+
+
+def _key_fields(key):
+    project_id, user_id, category_id, day = key
+    return dict(project_id=project_id, user_id=user_id, category_id=category_id, day=day)
+
+
+def _existing_rows(keys):
+    """{key: rollup id} for the keys that already have a row, in one query."""
+    rows = WorkEntryDailyRollup.objects.filter(
+        project_id__in={key[0] for key in keys},
+        day__in={key[3] for key in keys},
+    ).values_list('id', 'project_id', 'user_id', 'category_id', 'day')
+    existing = {}
+    for row_id, *key in rows:
+        key = tuple(key)
+        if key in keys:
+            existing.setdefault(key, row_id)
+    return existing
+
+
+def _bump(row_id, count, quantity):
+    WorkEntryDailyRollup.objects.filter(id=row_id).update(
+        entry_count=F('entry_count') + count,
+        total_quantity=F('total_quantity') + quantity,
+        updated_at=timezone.now(),
+    )
+
+
+def _create_missing(keys, deltas):
+    rows = [
+        WorkEntryDailyRollup(entry_count=deltas[key][0], total_quantity=deltas[key][1], **_key_fields(key))
+        for key in keys
+    ]
+    try:
+        with transaction.atomic():
+            WorkEntryDailyRollup.objects.bulk_create(rows)
+    except IntegrityError:
+        # Another writer created some of the rows first; add onto theirs.
+        for key in keys:
+            _create_or_bump(key, *deltas[key])
+
+
+def _create_or_bump(key, count, quantity):
+    try:
+        with transaction.atomic():
+            WorkEntryDailyRollup.objects.create(entry_count=count, total_quantity=quantity, **_key_fields(key))
+    except IntegrityError:
+        row_id = WorkEntryDailyRollup.objects.filter(**_key_fields(key)).values_list('id', flat=True).first()
+        _bump(row_id, count, quantity)
+
+
+def rebuild_rollups(batch_size=1000):
+    """Recompute every rollup row from WorkEntry. Returns the row count.
+
+    UserWorkStats and the cache versions are derived from the rollups;
+    run stats.rebuild_user_stats() and caching.bump_all_versions() after
+    this, as the rebuild_rollups command does.
+    """
+    grouped = (
+        WorkEntry.objects.order_by()
+        .annotate(day=TruncDate('date', tzinfo=timezone.get_default_timezone()))
+        .values('project_id', 'user_id', 'category_id', 'day')
+        .annotate(entry_count=Count('id'), total_quantity=Sum('quantity'))
+    )
+    created = 0
+    with transaction.atomic():
+        WorkEntryDailyRollup.objects.all().delete()
+        batch = []
+        for row in grouped.iterator(chunk_size=batch_size):
+            batch.append(WorkEntryDailyRollup(
+                project_id=row['project_id'],
+                user_id=row['user_id'],
+                category_id=row['category_id'],
+                day=row['day'],
+                entry_count=row['entry_count'],
+                total_quantity=row['total_quantity'] or 0,
+            ))
+            if len(batch) >= batch_size:
+                WorkEntryDailyRollup.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            WorkEntryDailyRollup.objects.bulk_create(batch)
+            created += len(batch)
+    return created
+
+
+def scoped_rollups(user, project_id=None, user_id=None, start_date=None, end_date=None):
+    """Rollup rows visible to `user` on the dashboard, narrowed by its filters.
+
+    Dates may be `date` objects or 'YYYY-MM-DD' strings as they arrive in
+    the query string; anything unparseable is ignored.
+    """
+    rollups = WorkEntryDailyRollup.objects.all()
+    if user.role == 'admin':
+        rollups = rollups.filter(project__managed_by=user)
+    if project_id:
+        rollups = rollups.filter(project_id=project_id)
+    if user_id:
+        rollups = rollups.filter(user_id=user_id)
+    start_day = _parse_day(start_date)
+    end_day = _parse_day(end_date)
+    if start_day:
+        rollups = rollups.filter(day__gte=start_day)
+    if end_day:
+        rollups = rollups.filter(day__lte=end_day)
+    return rollups
+
+
+def _parse_day(value):
+    if not value:
+        return None
+    if isinstance(value, date):
+        return value
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:         search.py
+# Purpose:      Indexed substring search over work entry folders and categories.
+#
+# Author:       AnikRoy
+# GitHub:       https://github.com/aroyslipk
+#
+# Created:      2026-10-18
+# Copyright:    (c) AnikRoy 2025
+# Licence:      Proprietary
+# -----------------------------------------------------------------------------
+
+"""
+Search of WorkEntry by folder name or category name.
+
+On SQLite the text lives in the FTS5 table "Invoice_workentry_search", built
+with the trigram tokenizer and kept in step with WorkEntry and Category by
+triggers (migration 0016), so bulk writes and queryset updates stay indexed
+too. On PostgreSQL the same migration adds pg_trgm GIN indexes that serve
+icontains lookups directly. Other backends fall back to plain icontains.
+
+Trigram indexes need at least three characters; shorter terms use icontains.
+"""
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Category, WorkEntry
+
+
+MIN_INDEXED_LENGTH = 3
+
+_FTS_MATCH = 'SELECT rowid FROM "Invoice_workentry_search" WHERE "Invoice_workentry_search" MATCH %s'
+
+
+def _fts_phrase(query):
+    # A quoted phrase matches the text as a substring under the trigram tokenizer.
+    return '"' + query.replace('"', '""') + '"'
+
+
+def search_entries(queryset, query):
+    """Narrow a WorkEntry queryset to entries whose folder or category matches `query`."""
+    query = (query or '').strip()
+    if not query:
+        return queryset
+    if len(query) >= MIN_INDEXED_LENGTH:
+        if connection.vendor == 'sqlite':
+            return queryset.filter(pk__in=RawSQL(_FTS_MATCH, [_fts_phrase(query)]))
+        if connection.vendor == 'postgresql':
+            # Two index-backed lookups instead of one OR across the join.
+            return queryset.filter(
+                Q(pk__in=WorkEntry.objects.filter(folder_name__icontains=query).values('pk'))
+                | Q(category_id__in=Category.objects.filter(name__icontains=query).values('pk'))
+            )
+    return queryset.filter(Q(folder_name__icontains=query) | Q(category__name__icontains=query))
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:         signals.py
+# Purpose:      Keeps derived data and cache versions in step with model writes.
+#
+# Author:       AnikRoy
+# GitHub:       https://github.com/aroyslipk
+#
+# Created:      2026-10-18
+# Copyright:    (c) AnikRoy 2025
+# Licence:      Proprietary
+# -----------------------------------------------------------------------------
+
+from django.db.models import Q, QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import caching, rollups, stats
+from .models import Category, ClientProject, Invoice, User, WorkEntry
+
+
+def _stored_state(pk):
+    row = (
+        WorkEntry.objects.filter(pk=pk)
+        .values('project_id', 'user_id', 'category_id', 'date', 'quantity')
+        .first()
+    )
+    if row is None:
+        return None
+    return rollups.EntryState(
+        project_id=row['project_id'],
+        user_id=row['user_id'],
+        category_id=row['category_id'],
+        day=rollups.entry_day(row['date']),
+        quantity=row['quantity'] or 0,
+    )
+
+
+def work_entries_created(entries):
+    """Record entries inserted without signals, e.g. through bulk_create."""
+    entries = list(entries)
+    rollups.apply_entries_added(entries)
+    stats.apply_entries_added(entries)
+    caching.bump_for_projects(
+        {entry.project_id for entry in entries},
+        {entry.user_id for entry in entries},
+    )
+
+
+def work_entries_changed(changes):
+    """Record (old state, new state) pairs written without signals, e.g. through bulk_update."""
+    changes = list(changes)
+    rollups.apply_entry_changes(changes)
+    stats.apply_entry_changes(changes)
+    _bump_for_states(*(state for change in changes for state in change))
+
+
+def _bump_for_states(*states):
+    states = [state for state in states if state is not None]
+    caching.bump_for_projects(
+        {state.project_id for state in states},
+        {state.user_id for state in states},
+    )
+
+
+@receiver(pre_save, sender=WorkEntry)
+def remember_previous_work_entry(sender, instance, raw=False, **kwargs):
+    instance._previous_state = None
+    if not raw and instance.pk is not None:
+        instance._previous_state = _stored_state(instance.pk)
+
+
+@receiver(post_save, sender=WorkEntry)
+def work_entry_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_state', None)
+    current = rollups.entry_state(instance)
+    rollups.apply_entry_change(previous, current)
+    stats.apply_entry_change(previous, current)
+    _bump_for_states(previous, current)
+
+
+@receiver(post_delete, sender=WorkEntry)
+def work_entry_deleted(sender, instance, origin=None, **kwargs):
+    if _deleted_by_owner(origin):
+        # Cascade of a project or user delete; handled once, in bulk, by
+        # owner_deleted().
+        return
+    state = rollups.entry_state(instance)
+    rollups.apply_entry_change(state, None)
+    stats.apply_entry_change(state, None)
+    _bump_for_states(state)
+
+
+def categories_changed(project_ids):
+    """Record category (rate card) writes made without signals, e.g. through bulk_update."""
+    caching.bump_for_projects(project_ids, catalog=True)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        caching.bump_for_projects([instance.project_id], catalog=True)
+
+
+def invoices_changed(project_ids):
+    """Record invoice writes made without signals, e.g. through bulk_create."""
+    caching.bump_for_projects(project_ids)
+
+
+@receiver(post_save, sender=Invoice)
+@receiver(post_delete, sender=Invoice)
+def invoice_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        caching.bump_for_projects([instance.project_id])
+
+
+@receiver(pre_save, sender=ClientProject)
+def remember_previous_manager(sender, instance, raw=False, **kwargs):
+    instance._previous_manager_id = None
+    if not raw and instance.pk is not None:
+        instance._previous_manager_id = (
+            ClientProject.objects.filter(pk=instance.pk).values_list('managed_by_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=ClientProject)
+@receiver(post_delete, sender=ClientProject)
+def project_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    managers = {instance.managed_by_id, getattr(instance, '_previous_manager_id', None)}
+    caching.bump_versions(
+        {caching.ALL_SCOPE, caching.CATALOG_SCOPE, caching.project_scope(instance.pk)}
+        | {caching.admin_scope(pk) for pk in managers if pk}
+    )
+
+
+def _origin_model(origin):
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+def _deleted_by_owner(origin):
+    return _origin_model(origin) in (ClientProject, User)
+
+
+def _owned_entries(instance):
+    if isinstance(instance, ClientProject):
+        return WorkEntry.objects.filter(project=instance)
+    return WorkEntry.objects.filter(
+        Q(user=instance) | Q(project__created_by=instance) | Q(project__managed_by=instance)
+    )
+
+
+@receiver(pre_delete, sender=ClientProject)
+@receiver(pre_delete, sender=User)
+def remember_owned_entries(sender, instance, origin=None, **kwargs):
+    """Note whose work a project or user delete takes with it, in one query.
+
+    Only the model the delete started from does this; its cascade covers
+    the projects a deleted user owned.
+    """
+    if _origin_model(origin) is not sender:
+        return
+    pairs = set(_owned_entries(instance).order_by().values_list('user_id', 'project_id').distinct())
+    instance._owned_work = (
+        {user_id for user_id, _ in pairs if user_id},
+        {project_id for _, project_id in pairs},
+        set(ClientProject.objects.filter(pk__in={project_id for _, project_id in pairs}).values_list('managed_by_id', flat=True)),
+    )
+
+
+@receiver(post_delete, sender=ClientProject)
+@receiver(post_delete, sender=User)
+def owner_deleted(sender, instance, **kwargs):
+    """Bring derived data in step after the cascade of a project or user delete.
+
+    The cascade skips the per-entry receivers. Rollups of the deleted rows
+    went with them; the stats of the remaining users are rebuilt from the
+    rollups and the versions are bumped once.
+    """
+    owned = getattr(instance, '_owned_work', None)
+    if owned is None:
+        return
+    user_ids, project_ids, manager_ids = owned
+    for user_id in User.objects.filter(pk__in=user_ids).values_list('pk', flat=True):
+        stats.recompute_user_stats(user_id)
+    caching.bump_versions(
+        {caching.ALL_SCOPE}
+        | {caching.project_scope(pk) for pk in project_ids}
+        | {caching.user_scope(pk) for pk in user_ids}
+        | {caching.admin_scope(pk) for pk in manager_ids if pk}
+    )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Logins only touch last_login, which no cached payload shows.
+    if raw or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    scopes = {caching.ALL_SCOPE, caching.user_scope(instance.pk)}
+    if instance.created_by_id:
+        scopes.add(caching.admin_scope(instance.created_by_id))
+    caching.bump_versions(scopes)
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:         slots.py
+# Purpose:      Allocation of empty work slots for projects.
+#
+# Author:       AnikRoy
+# GitHub:       https://github.com/aroyslipk
+#
+# Created:      2026-10-18
+# Copyright:    (c) AnikRoy 2025
+# Licence:      Proprietary
+# -----------------------------------------------------------------------------
+
+"""
+Slots are WorkEntry rows with is_slot=True and no user yet, waiting for a
+team member to claim and fill them. Allocation inserts them with
+bulk_create in batches inside one transaction.
+
+Filling claims the needed number of free slots and writes all of them with
+one bulk_update. Claims never block on each other: PostgreSQL (and any
+backend supporting it) hands out rows with SELECT ... FOR UPDATE SKIP
+LOCKED, so concurrent fillers get disjoint slots; elsewhere, e.g. SQLite,
+each slot is taken with a conditional UPDATE that only matches while it is
+still free, and slots lost to another filler are replaced by fresh ones.
+"""
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Category, WorkEntry
+from .rollups import entry_state
+from .signals import work_entries_changed, work_entries_created
+from .submission import MAX_BATCH_ROWS, SubmissionResult, can_submit_to, clean_row, is_blank_row
+
+
+MAX_SLOTS_PER_ALLOCATION = 10000
+INSERT_BATCH_SIZE = 500
+
+SLOT_FOLDER_NAME = 'N/A'
+FILLED_FIELDS = ['user', 'category', 'folder_name', 'quantity', 'date', 'updated_at']
+UPDATE_BATCH_SIZE = 500
+
+
+def allocate_slots(project, count, batch_size=INSERT_BATCH_SIZE):
+    """Create `count` empty slots for `project` and return their ids."""
+    if count < 1:
+        return []
+    if count > MAX_SLOTS_PER_ALLOCATION:
+        raise ValueError(f"Allocate at most {MAX_SLOTS_PER_ALLOCATION} slots at a time.")
+
+    slots = [
+        WorkEntry(project=project, is_slot=True, user=None, folder_name=SLOT_FOLDER_NAME, quantity=0)
+        for _ in range(count)
+    ]
+    with transaction.atomic():
+        created = WorkEntry.objects.bulk_create(slots, batch_size=batch_size)
+        work_entries_created(created)
+    return [slot.pk for slot in created]
+
+
+def free_slots(project):
+    return WorkEntry.objects.filter(project=project, is_slot=True, user__isnull=True)
+
+
+def claim_slots(user, project, count):
+    """Reserve up to `count` free slots of `project` for `user`.
+
+    Must run inside a transaction; the claims only hold until it ends, so
+    the caller fills the returned slots before committing.
+    """
+    if not connection.in_atomic_block:
+        raise transaction.TransactionManagementError('claim_slots() must run inside transaction.atomic().')
+    if count < 1:
+        return []
+
+    if connection.features.has_select_for_update_skip_locked:
+        slots = list(free_slots(project).select_for_update(skip_locked=True).order_by('id')[:count])
+        for slot in slots:
+            slot.user = user
+        return slots
+
+    claimed = []
+    while len(claimed) < count:
+        candidates = list(free_slots(project).order_by('id').values_list('id', flat=True)[:count - len(claimed)])
+        if not candidates:
+            break
+        # quantity=0 tells our fresh claims apart from slots this user
+        # filled earlier, which are no longer free either.
+        won = WorkEntry.objects.filter(pk__in=candidates, user__isnull=True).update(user=user)
+        if won:
+            claimed.extend(WorkEntry.objects.filter(pk__in=candidates, user=user, quantity=0).order_by('id'))
+    return claimed
+
+
+def fill_slots(user, project, rows, batch_size=UPDATE_BATCH_SIZE):
+    """Fill free slots of `project` with `rows`, all of them or none.
+
+    Rows are validated exactly like a work submission (see
+    submission.clean_row); completely blank rows are skipped.
+    """
+    rows = list(rows)
+    if not can_submit_to(user, project):
+        return SubmissionResult(errors=[{'row': None, 'errors': {'project': 'You cannot fill slots of this project.'}}])
+    if len(rows) > MAX_BATCH_ROWS:
+        return SubmissionResult(errors=[{'row': None, 'errors': {'entries': f'Submit at most {MAX_BATCH_ROWS} rows at a time.'}}])
+
+    categories = {category.pk: category for category in Category.objects.filter(project=project)}
+    today = timezone.localdate()
+    filled, errors = [], []
+    for number, row in enumerate(rows, start=1):
+        if is_blank_row(row):
+            continue
+        fields, row_errors = clean_row(row, categories, today)
+        if row_errors:
+            errors.append({'row': number, 'errors': row_errors})
+        elif not errors:
+            filled.append(fields)
+
+    if errors:
+        return SubmissionResult(errors=errors)
+    if not filled:
+        return SubmissionResult(errors=[{'row': None, 'errors': {'entries': 'No work entries were submitted.'}}])
+
+    with transaction.atomic():
+        slots = claim_slots(user, project, len(filled))
+        if len(slots) < len(filled):
+            transaction.set_rollback(True)
+            return SubmissionResult(errors=[{'row': None, 'errors': {
+                'entries': f'Only {len(slots)} free slots are left in this project.'
+            }}])
+
+        changes = []
+        now = timezone.now()
+        for slot, fields in zip(slots, filled):
+            previous = entry_state(slot)._replace(user_id=None)
+            slot.user, slot.updated_at = user, now
+            for name, value in fields.items():
+                setattr(slot, name, value)
+            changes.append((previous, entry_state(slot)))
+        WorkEntry.objects.bulk_update(slots, FILLED_FIELDS, batch_size=batch_size)
+        work_entries_changed(changes)
+    return SubmissionResult(created=slots)
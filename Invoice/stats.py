@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:         stats.py
+# Purpose:      Write-through per-user work summary counters.
+#
+# Author:       AnikRoy
+# GitHub:       https://github.com/aroyslipk
+#
+# Created:      2026-10-18
+# Copyright:    (c) AnikRoy 2025
+# Licence:      Proprietary
+# -----------------------------------------------------------------------------
+
+"""
+UserWorkStats maintenance.
+
+Every WorkEntry change moves its contribution between the stats rows of
+its old and new owner inside one transaction, with the row locked for the
+update. Slots without a user are not counted. When the calendar month has
+moved on since a row was last written, or the row does not exist yet, it is
+recomputed from the daily rollups instead, so the month counters never
+carry over from a previous month. Removals alone never create a row.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .models import User, UserWorkStats, WorkEntryDailyRollup
+from .rollups import entry_state
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def _next_month(month):
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def apply_entry_change(old, new):
+    """Move one entry's contribution from the `old` state to the `new` one.
+
+    Either side may be None for a create or a delete. Call this after the
+    daily rollups have been updated for the same change.
+    """
+    apply_entry_changes([(old, new)])
+
+
+def apply_entry_changes(changes):
+    """Apply a batch of (old, new) state pairs, e.g. from bulk_update."""
+    by_user = defaultdict(list)
+    for old, new in changes:
+        for state, sign in ((old, -1), (new, 1)):
+            if state is not None and state.user_id:
+                by_user[state.user_id].append((state, sign))
+    for user_id, states in by_user.items():
+        _apply(user_id, states)
+
+
+def apply_entries_added(entries):
+    """Count a batch of freshly inserted entries (e.g. from bulk_create)."""
+    changes = defaultdict(list)
+    for entry in entries:
+        if entry.user_id:
+            changes[entry.user_id].append((entry_state(entry), 1))
+    for user_id, states in changes.items():
+        _apply(user_id, states)
+
+
+def _apply(user_id, states):
+    month = month_start(timezone.localdate())
+    with transaction.atomic():
+        stats = UserWorkStats.objects.select_for_update().filter(user_id=user_id).first()
+        if stats is None and all(sign < 0 for _, sign in states):
+            # Only removals and no row: user_work_stats() builds it when it
+            # is next read. Deleting a user cascades here after its row is
+            # gone, and must not create it again.
+            return
+        if stats is None or stats.month != month:
+            # The rollups already include this change.
+            recompute_user_stats(user_id)
+            return
+        for state, sign in states:
+            stats.total_entries += sign
+            stats.total_quantity += sign * state.quantity
+            if month_start(state.day) == month:
+                stats.month_entries += sign
+                stats.month_quantity += sign * state.quantity
+            key = str(state.project_id)
+            count = stats.project_counts.get(key, 0) + sign
+            if count > 0:
+                stats.project_counts[key] = count
+            else:
+                stats.project_counts.pop(key, None)
+        stats.top_project_id = _top_project(stats.project_counts)
+        stats.save()
+
+
+def _top_project(project_counts):
+    if not project_counts:
+        return None
+    return int(max(project_counts, key=lambda key: (project_counts[key], -int(key))))
+
+
+def recompute_user_stats(user_id):
+    """Rebuild one user's stats row from the daily rollups and return it."""
+    month = month_start(timezone.localdate())
+    this_month = Q(day__gte=month, day__lt=_next_month(month))
+    rows = (
+        WorkEntryDailyRollup.objects.filter(user_id=user_id)
+        .values('project_id')
+        .annotate(
+            entries=Sum('entry_count'),
+            quantity=Sum('total_quantity'),
+            month_entries=Sum('entry_count', filter=this_month),
+            month_quantity=Sum('total_quantity', filter=this_month),
+        )
+        .order_by()
+    )
+    values = dict(month=month, month_entries=0, month_quantity=0, total_entries=0, total_quantity=0)
+    project_counts = {}
+    for row in rows:
+        values['total_entries'] += row['entries'] or 0
+        values['total_quantity'] += row['quantity'] or 0
+        values['month_entries'] += row['month_entries'] or 0
+        values['month_quantity'] += row['month_quantity'] or 0
+        if row['entries']:
+            project_counts[str(row['project_id'])] = row['entries']
+    stats, _ = UserWorkStats.objects.update_or_create(
+        user_id=user_id,
+        defaults=dict(values, project_counts=project_counts, top_project_id=_top_project(project_counts)),
+    )
+    return stats
+
+
+def rebuild_user_stats():
+    """Recompute the stats row of every user from the daily rollups.
+
+    Rows of users without any work are rebuilt as zeroes. Returns the
+    number of rows written.
+    """
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    with transaction.atomic():
+        for user_id in user_ids:
+            recompute_user_stats(user_id)
+    return len(user_ids)
+
+
+def user_work_stats(user):
+    """The up-to-date stats row of `user`, with its top project loaded."""
+    stats = UserWorkStats.objects.select_related('top_project').filter(user=user).first()
+    if stats is None or stats.month != month_start(timezone.localdate()):
+        with transaction.atomic():
+            recompute_user_stats(user.pk)
+        stats = UserWorkStats.objects.select_related('top_project').get(user=user)
+    return stats
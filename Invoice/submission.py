@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Name:         submission.py
+# Purpose:      Validates and inserts batches of work entries in one go.
+#
+# Author:       AnikRoy
+# GitHub:       https://github.com/aroyslipk
+#
+# Created:      2026-10-18
+# Copyright:    (c) AnikRoy 2025
+# Licence:      Proprietary
+# -----------------------------------------------------------------------------
+
+"""
+Bulk work submission engine shared by submit_work_view and the JSON API.
+
+A batch is validated row by row against one pre-fetched map of the
+project's categories. If any row is invalid nothing is written and every
+problem is reported against its row number; otherwise all rows are
+inserted with bulk_create inside a single transaction, and the derived data
+(rollups, user stats, cache versions) is updated through
+signals.work_entries_created, since bulk_create skips model signals.
+"""
+
+from datetime import date, datetime, time
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Category, WorkEntry
+from .signals import work_entries_created
+
+
+MAX_BATCH_ROWS = 5000
+INSERT_BATCH_SIZE = 500
+
+FOLDER_NAME_MAX_LENGTH = WorkEntry._meta.get_field('folder_name').max_length
+
+
+class SubmissionResult:
+    """Outcome of a batch: the created entries or the per-row errors."""
+
+    def __init__(self, created=None, errors=None):
+        self.created = created or []
+        self.errors = errors or []
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def as_dict(self):
+        return {
+            'created': len(self.created),
+            'ids': [entry.pk for entry in self.created],
+            'errors': self.errors,
+        }
+
+
+def owning_admin(user):
+    """The admin whose projects and categories `user` submits work against."""
+    return user.created_by if user.role == 'user' else user
+
+
+def can_submit_to(user, project):
+    if user.role == 'super_admin':
+        return True
+    admin = owning_admin(user)
+    return admin is not None and project.managed_by_id == admin.pk
+
+
+def is_blank_row(row):
+    return not any(str(value).strip() for value in row.values() if value is not None)
+
+
+def parse_entry_date(value):
+    """An aware datetime at the start of the given day in the current timezone."""
+    if isinstance(value, datetime):
+        return value if timezone.is_aware(value) else timezone.make_aware(value)
+    if not isinstance(value, date):
+        parsed = parse_date(str(value).strip())
+        if parsed is None:
+            raise ValueError(f'Invalid date: {value!r}')
+        value = parsed
+    return timezone.make_aware(datetime.combine(value, time.min), timezone.get_current_timezone())
+
+
+def clean_row(row, categories, today=None):
+    """Validate one row against `categories` ({id: Category}).
+
+    Returns (fields, errors): the WorkEntry field values when the row is
+    valid, and a {field: message} dict otherwise.
+    """
+    today = today or timezone.localdate()
+    fields, errors = {}, {}
+
+    folder_name = str(row.get('folder_name') or '').strip()
+    if not folder_name:
+        errors['folder_name'] = 'This field is required.'
+    elif len(folder_name) > FOLDER_NAME_MAX_LENGTH:
+        errors['folder_name'] = f'Ensure this value has at most {FOLDER_NAME_MAX_LENGTH} characters.'
+    fields['folder_name'] = folder_name
+
+    category = row.get('category')
+    try:
+        fields['category'] = categories[int(category)]
+    except (KeyError, TypeError, ValueError):
+        errors['category'] = 'Select a category of this project.' if category not in (None, '') else 'This field is required.'
+
+    try:
+        quantity = int(str(row.get('quantity')).strip())
+        if quantity < 1:
+            raise ValueError
+        fields['quantity'] = quantity
+    except (TypeError, ValueError):
+        errors['quantity'] = 'Enter a whole number of at least 1.'
+
+    if row.get('date') in (None, ''):
+        errors['date'] = 'This field is required.'
+    else:
+        try:
+            fields['date'] = parse_entry_date(row['date'])
+        except ValueError:
+            errors['date'] = 'Enter a date as YYYY-MM-DD.'
+        else:
+            if timezone.localtime(fields['date']).date() > today:
+                errors['date'] = 'The date cannot be in the future.'
+
+    return fields, errors
+
+
+def insert_entries(entries, batch_size=INSERT_BATCH_SIZE):
+    """bulk_create unsaved WorkEntry objects and update the derived data."""
+    with transaction.atomic():
+        created = WorkEntry.objects.bulk_create(entries, batch_size=batch_size)
+        work_entries_created(created)
+    return created
+
+
+def submit_work_entries(user, project, rows):
+    """Validate every row of a submission, then insert all of them or none.
+
+    `rows` are dicts with `category` (id), `folder_name`, `quantity` and
+    `date`; completely blank rows are skipped. Row numbers in the error
+    report start at 1.
+    """
+    rows = list(rows)
+    if not can_submit_to(user, project):
+        return SubmissionResult(errors=[{'row': None, 'errors': {'project': 'You cannot submit work to this project.'}}])
+    if len(rows) > MAX_BATCH_ROWS:
+        return SubmissionResult(errors=[{'row': None, 'errors': {'entries': f'Submit at most {MAX_BATCH_ROWS} rows at a time.'}}])
+
+    categories = {category.pk: category for category in Category.objects.filter(project=project)}
+    today = timezone.localdate()
+    entries, errors = [], []
+    for number, row in enumerate(rows, start=1):
+        if is_blank_row(row):
+            continue
+        fields, row_errors = clean_row(row, categories, today)
+        if row_errors:
+            errors.append({'row': number, 'errors': row_errors})
+        elif not errors:
+            entries.append(WorkEntry(user=user, project=project, **fields))
+
+    if errors:
+        return SubmissionResult(errors=errors)
+    if not entries:
+        return SubmissionResult(errors=[{'row': None, 'errors': {'entries': 'No work entries were submitted.'}}])
+    return SubmissionResult(created=insert_entries(entries))
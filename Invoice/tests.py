@@ -11,5 +11,737 @@
 # Licence:      Proprietary
 # -----------------------------------------------------------------------------
 
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
 
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import Workbook, load_workbook
+
+from .caching import ALL_SCOPE, cache_stats, current_versions, user_scope
+from .importer import import_work_entries, iter_csv_rows
+from .invoice_renderer import TEMPLATE_PATH, invoice_template, template_workbook
+from .invoicing import bill_entries, build_invoice, double_billed_lines, invoice_entries, render_recorded_invoice
+from .jobs import run_worker
+from .monthly import billable_projects, record_monthly_invoices
+from .models import Category, ClientProject, Invoice, InvoiceJob, InvoiceLine, User, UserWorkStats, WorkEntry, WorkEntryDailyRollup
+from .rates import clear_rate_cards, rate_cards, update_rates
+from .search import search_entries
+from .slots import allocate_slots, claim_slots
+
+
+class DashboardQueryCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', password='pw', role='admin')
+        member = User.objects.create_user(username='member', email='member@example.com', password='pw', created_by=self.admin)
+        project = ClientProject.objects.create(
+            name='Catalogue', start_date=timezone.localdate(), created_by=self.admin, managed_by=self.admin
+        )
+        category = Category.objects.create(project=project, name='Clipping', rate='1.50', managed_by=self.admin)
+        for i in range(30):
+            WorkEntry.objects.create(
+                user=member, project=project, category=category, folder_name=f'folder-{i}', quantity=i + 1
+            )
+        self.client.force_login(self.admin)
+
+    def test_kpis_come_from_a_single_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_projects'], 1)
+        self.assertEqual(response.context['total_team_members'], 1)
+        self.assertEqual(response.context['current_month_entries'], 30)
+        self.assertEqual(response.context['most_productive_user'], 'member')
+        self.assertEqual(len(response.context['page_obj'].object_list), 18)
+        kpi_queries = [q for q in ctx.captured_queries if 'Invoice_clientproject' in q['sql'] and 'Invoice_invoice' in q['sql']]
+        self.assertEqual(len(kpi_queries), 1)
+
+    def test_dashboard_query_count(self):
+        # session, user, data versions, KPIs, entry page, project and team
+        # dropdowns; the charts load separately from dashboard_charts
+        with self.assertNumQueries(7):
+            self.client.get(reverse('dashboard'), {'page': 2})
+        # the KPIs are served from the cache until the data changes
+        with self.assertNumQueries(6):
+            self.client.get(reverse('dashboard'), {'page': 2})
+
+    def test_writes_retire_cached_kpis(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['current_month_entries'], 30)
+        WorkEntry.objects.first().delete()
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['current_month_entries'], 29)
+        self.assertEqual(cache_stats()['dashboard_kpis'], {'hits': 0, 'misses': 2})
+        self.client.get(reverse('dashboard'))
+        self.assertEqual(cache_stats()['dashboard_kpis'], {'hits': 1, 'misses': 2})
+
+    def test_cursor_pages_walk_every_entry_once(self):
+        seen = []
+        params = {'paging': 'cursor'}
+        while True:
+            response = self.client.get(reverse('dashboard'), params)
+            page = response.context['page_obj']
+            seen.extend(entry.pk for entry in page.object_list)
+            if not page.has_next():
+                break
+            params = {'paging': 'cursor', 'cursor': page.next_cursor}
+        self.assertEqual(len(seen), 30)
+        self.assertEqual(seen, list(WorkEntry.objects.order_by('-date', '-id').values_list('pk', flat=True)))
+
+        response = self.client.get(reverse('dashboard'), {'cursor': page.previous_cursor})
+        self.assertEqual([entry.pk for entry in response.context['page_obj'].object_list], seen[:18])
+
+    def test_charts_endpoint_revalidates_with_etag(self):
+        response = self.client.get(reverse('dashboard_charts'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['pie'], {'labels': ['Clipping'], 'data': [30]})
+        self.assertIn('Last-Modified', response.headers)
+        etag = response.headers['ETag']
+
+        response = self.client.get(reverse('dashboard_charts'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        WorkEntry.objects.first().delete()
+        response = self.client.get(reverse('dashboard_charts'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['pie']['data'], [29])
+
+
+class EntrySearchTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user(username='admin', email='admin@example.com', password='pw', role='admin')
+        self.project = ClientProject.objects.create(
+            name='Catalogue', start_date=timezone.localdate(), created_by=admin, managed_by=admin
+        )
+        self.category = Category.objects.create(project=self.project, name='Clipping', rate='1.50', managed_by=admin)
+        WorkEntry.objects.create(project=self.project, category=self.category, folder_name='Spring_Shoes', quantity=1)
+        WorkEntry.objects.create(project=self.project, folder_name='Winter_Coats', quantity=1)
+
+    def search(self, query):
+        return sorted(search_entries(WorkEntry.objects.all(), query).values_list('folder_name', flat=True))
+
+    def test_matches_substrings_of_folder_and_category(self):
+        self.assertEqual(self.search('shoe'), ['Spring_Shoes'])
+        self.assertEqual(self.search('clipp'), ['Spring_Shoes'])
+        self.assertEqual(self.search('in'), ['Spring_Shoes', 'Winter_Coats'])
+
+    def test_index_follows_writes(self):
+        self.category.name = 'Masking'
+        self.category.save()
+        self.assertEqual(self.search('clipp'), [])
+        self.assertEqual(self.search('mask'), ['Spring_Shoes'])
+
+        WorkEntry.objects.bulk_create([WorkEntry(project=self.project, folder_name='Summer_Hats', quantity=1)])
+        WorkEntry.objects.filter(folder_name='Winter_Coats').update(folder_name='Autumn_Coats')
+        self.assertEqual(self.search('hats'), ['Summer_Hats'])
+        self.assertEqual(self.search('coats'), ['Autumn_Coats'])
+
+        WorkEntry.objects.filter(folder_name='Summer_Hats').delete()
+        self.assertEqual(self.search('hats'), [])
+
+
+class UserWorkStatsTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user(username='admin', email='admin@example.com', password='pw', role='admin')
+        self.member = User.objects.create_user(username='member', email='member@example.com', password='pw', created_by=admin)
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='pw', created_by=admin)
+        self.catalogue = ClientProject.objects.create(
+            name='Catalogue', start_date=timezone.localdate(), created_by=admin, managed_by=admin
+        )
+        self.retouch = ClientProject.objects.create(
+            name='Retouch', start_date=timezone.localdate(), created_by=admin, managed_by=admin
+        )
+
+    def test_counters_follow_entry_writes(self):
+        for quantity in (3, 4):
+            WorkEntry.objects.create(user=self.member, project=self.catalogue, folder_name='a', quantity=quantity)
+        moved = WorkEntry.objects.create(user=self.member, project=self.retouch, folder_name='b', quantity=5)
+        old = WorkEntry.objects.create(
+            user=self.member, project=self.retouch, folder_name='c', quantity=6,
+        )
+        old.date = timezone.now() - timedelta(days=400)
+        old.save()
+
+        stats = UserWorkStats.objects.get(user=self.member)
+        self.assertEqual((stats.total_entries, stats.total_quantity), (4, 18))
+        self.assertEqual((stats.month_entries, stats.month_quantity), (3, 12))
+        self.assertEqual(stats.top_project, self.catalogue)
+
+        moved.user = self.other
+        moved.save()
+        WorkEntry.objects.filter(folder_name='a').first().delete()
+        stats.refresh_from_db()
+        self.assertEqual((stats.total_entries, stats.total_quantity, stats.month_entries), (2, 10, 1))
+        self.assertEqual(UserWorkStats.objects.get(user=self.other).total_quantity, 5)
+
+    def test_deleting_a_user_with_entries(self):
+        WorkEntry.objects.create(user=self.member, project=self.catalogue, folder_name='a', quantity=2)
+        WorkEntry.objects.create(user=self.member, project=self.retouch, folder_name='b', quantity=3)
+        self.client.force_login(User.objects.get(username='admin'))
+        self.client.post(reverse('delete_user', args=[self.member.pk]))
+        self.assertFalse(User.objects.filter(pk=self.member.pk).exists())
+        self.assertFalse(UserWorkStats.objects.filter(user_id=self.member.pk).exists())
+        self.assertFalse(WorkEntryDailyRollup.objects.filter(user_id=self.member.pk).exists())
+
+        # Deleting the admin takes the projects, and so the other user's work, with it.
+        WorkEntry.objects.create(user=self.other, project=self.retouch, folder_name='c', quantity=4)
+        User.objects.get(username='admin').delete()
+        self.assertEqual(UserWorkStats.objects.get(user=self.other).total_entries, 0)
+
+    def test_deleting_a_project_is_not_a_query_per_entry(self):
+        for i in range(40):
+            WorkEntry.objects.create(user=self.member, project=self.catalogue, folder_name=f'a{i}', quantity=1)
+        WorkEntry.objects.create(user=self.member, project=self.retouch, folder_name='b', quantity=5)
+        WorkEntry.objects.create(user=self.other, project=self.catalogue, folder_name='c', quantity=2)
+        with CaptureQueriesContext(connection) as ctx:
+            self.catalogue.delete()
+        # Entries are collected and deleted in one query each; the rest is
+        # per project, manager and affected user, not per entry.
+        self.assertLess(len(ctx.captured_queries), 30)
+        self.assertEqual(sum(q['sql'].startswith('DELETE FROM "Invoice_workentry" ') for q in ctx.captured_queries), 1)
+        stats = UserWorkStats.objects.get(user=self.member)
+        self.assertEqual((stats.total_entries, stats.total_quantity, stats.top_project_id), (1, 5, self.retouch.pk))
+        self.assertEqual(UserWorkStats.objects.get(user=self.other).total_entries, 0)
+        self.assertFalse(WorkEntryDailyRollup.objects.filter(project_id=self.catalogue.pk).exists())
+
+    def test_rebuild_command_refreshes_stats_and_caches(self):
+        WorkEntry.objects.create(user=self.member, project=self.retouch, folder_name='a', quantity=2)
+        self.client.force_login(self.member)
+        self.assertEqual(self.client.get(reverse('get_user_work_summary')).json()['total_quantity_month'], 2)
+        # A raw write skips the signals, leaving the rollups and stats stale.
+        WorkEntry.objects.update(quantity=7)
+        self.assertEqual(self.client.get(reverse('get_user_work_summary')).json()['total_quantity_month'], 2)
+
+        versions = current_versions([ALL_SCOPE, user_scope(self.member.pk), user_scope(self.other.pk)])
+        out = StringIO()
+        call_command('rebuild_rollups', stdout=out)
+        self.assertIn('stats for 3 users', out.getvalue())
+        bumped = current_versions(versions)
+        self.assertTrue(all(bumped[scope][0] > versions[scope][0] for scope in versions))
+        self.assertEqual(UserWorkStats.objects.get(user=self.member).total_quantity, 7)
+        self.assertEqual(UserWorkStats.objects.get(user=self.other).total_entries, 0)
+        self.assertEqual(self.client.get(reverse('get_user_work_summary')).json()['total_quantity_month'], 7)
+
+    def test_unfiltered_summary_is_one_lookup(self):
+        WorkEntry.objects.create(user=self.member, project=self.retouch, folder_name='a', quantity=2)
+        self.client.force_login(self.member)
+        # session, user, stats row
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('get_user_work_summary'))
+        self.assertEqual(response.json(), {
+            'total_entries_month': 1,
+            'total_quantity_month': 2,
+            'most_frequent_project': 'Retouch',
+        })
+
+
+class BulkSubmissionTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user(username='admin', email='admin@example.com', password='pw', role='admin')
+        self.member = User.objects.create_user(username='member', email='member@example.com', password='pw', created_by=admin)
+        self.project = ClientProject.objects.create(
+            name='Catalogue', start_date=timezone.localdate(), created_by=admin, managed_by=admin
+        )
+        self.category = Category.objects.create(project=self.project, name='Clipping', rate='1.50', managed_by=admin)
+        self.client.force_login(self.member)
+
+    def rows(self, count):
+        today = timezone.localdate().isoformat()
+        return [
+            {'category': self.category.pk, 'folder_name': f'folder-{i}', 'quantity': 2, 'date': today}
+            for i in range(count)
+        ]
+
+    def test_batch_is_inserted_with_a_constant_number_of_queries(self):
+        self.client.post(reverse('work_entry_bulk_api'), {'project': self.project.pk, 'entries': self.rows(1)}, content_type='application/json')
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(reverse('work_entry_bulk_api'), {'project': self.project.pk, 'entries': self.rows(2)}, content_type='application/json')
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post(reverse('work_entry_bulk_api'), {'project': self.project.pk, 'entries': self.rows(200)}, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 200)
+        # only the INSERT may split into backend-sized chunks
+        self.assertLessEqual(len(large), len(small) + 1)
+        self.assertEqual(UserWorkStats.objects.get(user=self.member).total_quantity, 406)
+
+    def test_invalid_rows_reject_the_whole_batch(self):
+        rows = self.rows(3)
+        rows[1]['quantity'] = 'many'
+        rows[2]['category'] = 999
+        response = self.client.post(reverse('work_entry_bulk_api'), {'project': self.project.pk, 'entries': rows}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.json()['errors']], [2, 3])
+        self.assertEqual(set(response.json()['errors'][1]['errors']), {'category'})
+        self.assertFalse(WorkEntry.objects.exists())
+
+
+class WorkEntryImportTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', password='pw', role='admin')
+        User.objects.create_user(username='member', email='member@example.com', password='pw', created_by=self.admin)
+        project = ClientProject.objects.create(
+            name='Catalogue', start_date=timezone.localdate(), created_by=self.admin, managed_by=self.admin
+        )
+        Category.objects.create(project=project, name='Clipping', rate='1.50', managed_by=self.admin)
+        self.today = timezone.localdate().isoformat()
+
+    def test_csv_rows_are_imported_in_chunks_with_rejects(self):
+        lines = ['Date,User,Project,Category,Folder Name,Quantity']
+        lines += [f'{self.today},member@example.com,catalogue,clipping,folder-{i},2' for i in range(5)]
+        lines += [f'{self.today},nobody,Catalogue,Clipping,folder-x,2', f'{self.today},member,Catalogue,Masking,folder-y,0']
+        chunks = []
+        report = import_work_entries(
+            self.admin,
+            iter_csv_rows(BytesIO('\n'.join(lines).encode())),
+            chunk_size=2,
+            on_chunk=lambda report: chunks.append(report.imported),
+        )
+        self.assertEqual((report.processed, report.imported, report.rejected), (7, 5, 2))
+        self.assertEqual(chunks, [2, 4, 5])
+        self.assertEqual(report.rejects[0], {'row': 7, 'errors': {'user': 'Unknown user.'}})
+        self.assertEqual(set(report.rejects[1]['errors']), {'category', 'quantity'})
+        self.assertEqual(WorkEntry.objects.count(), 5)
+
+    def test_xlsx_upload(self):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(['date', 'user', 'project', 'category', 'folder_name', 'quantity'])
+        sheet.append([timezone.localdate(), 'member', 'Catalogue', 'Clipping', 'folder-1', 3])
+        upload = BytesIO()
+        workbook.save(upload)
+        upload.seek(0)
+        upload.name = 'log.xlsx'
+
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('import_work_entries'), {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['report'].imported, 1)
+        self.assertEqual(WorkEntry.objects.get().quantity, 3)
+
+    def test_unreadable_uploads_are_reported(self):
+        self.client.force_login(self.admin)
+        upload = BytesIO(b'not a zip file')
+        upload.name = 'log.xlsx'
+        response = self.client.post(reverse('import_work_entries'), {'file': upload}, follow=True)
+        self.assertContains(response, 'not a readable .xlsx workbook')
+
+        upload = BytesIO(f'date,user,project,category,folder_name,quantity\n{self.today},member,Catalogue,Caf\xe9'.encode('latin-1'))
+        upload.name = 'log.csv'
+        response = self.client.post(reverse('import_work_entries'), {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('UTF-8', response.context['report'].error)
+        self.assertContains(response, 'save it as a UTF-8 CSV')
+
+
+class SlotTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', password='pw', role='admin')
+        self.member = User.objects.create_user(username='member', email='member@example.com', password='pw', created_by=self.admin)
+        self.project = ClientProject.objects.create(
+            name='Catalogue', start_date=timezone.localdate(), created_by=self.admin, managed_by=self.admin
+        )
+        self.category = Category.objects.create(project=self.project, name='Clipping', rate='1.50', managed_by=self.admin)
+
+    def test_allocation_is_batched(self):
+        with CaptureQueriesContext(connection) as ctx:
+            slot_ids = allocate_slots(self.project, 1000)
+        self.assertEqual(len(slot_ids), 1000)
+        self.assertEqual(WorkEntry.objects.filter(pk__in=slot_ids, is_slot=True, user__isnull=True).count(), 1000)
+        self.assertLess(len(ctx.captured_queries), 30)
+
+    def test_fill_claims_free_slots_in_one_batch(self):
+        allocate_slots(self.project, 5)
+        other = User.objects.create_user(username='other', email='other@example.com', password='pw', created_by=self.admin)
+        with transaction.atomic():
+            taken = claim_slots(other, self.project, 1)
+            WorkEntry.objects.filter(pk=taken[0].pk).update(quantity=1, category=self.category)
+        today = timezone.localdate().isoformat()
+        rows = [{'category': self.category.pk, 'folder_name': f'folder-{i}', 'quantity': 3, 'date': today} for i in range(3)]
+
+        self.client.force_login(self.member)
+        page = self.client.get(reverse('fill_slots'), {'project': self.project.pk})
+        self.assertEqual(len(page.context['rows']), 4)
+        response = self.client.post(reverse('slot_fill_api'), {'project': self.project.pk, 'entries': rows}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        filled = WorkEntry.objects.filter(pk__in=response.json()['ids'])
+        self.assertEqual(filled.filter(user=self.member, quantity=3, category=self.category).count(), 3)
+        self.assertNotIn(taken[0].pk, response.json()['ids'])
+        self.assertEqual(UserWorkStats.objects.get(user=self.member).total_quantity, 9)
+        self.assertEqual(WorkEntryDailyRollup.objects.filter(user=self.member).aggregate(n=Sum('entry_count'))['n'], 3)
+
+        response = self.client.post(reverse('slot_fill_api'), {'project': self.project.pk, 'entries': rows}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(WorkEntry.objects.filter(is_slot=True, user__isnull=True).count(), 1)
+
+
+def use_temporary_media(test):
+    """Store files written by `test` in a fresh MEDIA_ROOT, removed after it."""
+    media_root = tempfile.mkdtemp(prefix='invoice-test-media-')
+    test.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+    media = override_settings(MEDIA_ROOT=media_root)
+    media.enable()
+    test.addCleanup(media.disable)
+
+
+@override_settings(INVOICE_WORKER=True)
+class RateCardTests(TestCase):
+    def setUp(self):
+        use_temporary_media(self)
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', password='pw', role='admin')
+        self.project = ClientProject.objects.create(
+            name='Catalogue', start_date=timezone.localdate(), created_by=self.admin, managed_by=self.admin
+        )
+        self.categories = [
+            Category.objects.create(project=self.project, name=f'Category {i}', rate='1.00', managed_by=self.admin)
+            for i in range(3)
+        ]
+        self.client.force_login(self.admin)
+
+    def test_rate_edits_are_written_together_or_not_at_all(self):
+        url = reverse('manage_prices', args=[self.project.pk])
+        data = {'update_prices': '1', **{f'rate-{c.pk}': '2.5' for c in self.categories}}
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(url, data)
+        self.assertEqual(set(Category.objects.values_list('rate', flat=True)), {Decimal('2.50')})
+        self.assertEqual(sum('FROM "Invoice_category"' in q['sql'] for q in ctx.captured_queries), 1)
+
+        data[f'rate-{self.categories[0].pk}'] = '-1'
+        self.client.post(url, dict(data, **{f'rate-{self.categories[1].pk}': '4'}))
+        self.assertEqual(Category.objects.get(pk=self.categories[1].pk).rate, Decimal('2.50'))
+
+    def test_entry_price_edits_never_change_the_rate(self):
+        member = User.objects.create_user(username='member', email='member@example.com', password='pw', created_by=self.admin)
+        entry = WorkEntry.objects.create(user=member, project=self.project, category=self.categories[0], folder_name='f', quantity=2)
+        url = reverse('save_all_prices', args=[self.project.pk])
+        response = self.client.post(url, {f'price-{entry.pk}': '9.00'})
+        self.assertRedirects(response, reverse('manage_prices', args=[self.project.pk]), fetch_redirect_response=False)
+        self.assertEqual(Category.objects.get(pk=self.categories[0].pk).rate, Decimal('1.00'))
+        self.assertRedirects(self.client.post(url, {f'price-{entry.pk}': '1'}), reverse('manage_projects'), fetch_redirect_response=False)
+
+    def test_rate_card_upload_upserts(self):
+        upload = BytesIO(b'Name,Rate,Currency\ncategory 0,3.25,\nMasking,0.75,EUR\n')
+        upload.name = 'rates.csv'
+        self.client.post(reverse('manage_prices', args=[self.project.pk]), {'upload_rates': '1', 'file': upload})
+        rates = dict(Category.objects.values_list('name', 'rate'))
+        self.assertEqual(rates['Category 0'], Decimal('3.25'))
+        self.assertEqual(rates['Masking'], Decimal('0.75'))
+        self.assertEqual(Category.objects.count(), 4)
+
+    def test_rate_card_cache_follows_category_writes(self):
+        clear_rate_cards()
+        rate_cards([self.project.pk])
+        with self.assertNumQueries(1):
+            card = rate_cards([self.project.pk])
+        self.assertEqual(card[self.categories[0].pk], ('Category 0', Decimal('1.00'), 'USD'))
+
+        update_rates(self.project, {self.categories[0].pk: '4.40'})
+        self.assertEqual(rate_cards([self.project.pk])[self.categories[0].pk].rate, Decimal('4.40'))
+        self.categories[1].delete()
+        self.assertNotIn(self.categories[1].pk, rate_cards([self.project.pk]))
+
+    def test_invoice_is_priced_from_the_rate_card(self):
+        member = User.objects.create_user(username='member', email='member@example.com', password='pw', created_by=self.admin)
+        for category in self.categories:
+            WorkEntry.objects.create(user=member, project=self.project, category=category, folder_name='f', quantity=2)
+        response = self.client.get(reverse('generate_invoice'), {'project': self.project.pk})
+        job = InvoiceJob.objects.get()
+        self.assertRedirects(response, reverse('invoice_job', args=[job.pk]))
+        self.assertEqual(self.client.get(reverse('invoice_job_status', args=[job.pk])).json()['status'], 'queued')
+
+        self.assertEqual(run_worker('test', once=True), 1)
+        status = self.client.get(reverse('invoice_job_status', args=[job.pk])).json()
+        self.assertEqual((status['status'], status['progress'], status['total_lines']), ('done', 100, 3))
+        self.assertEqual(Invoice.objects.get().total_amount, Decimal('6.00'))
+
+        lines = InvoiceLine.objects.filter(invoice=Invoice.objects.get()).order_by('id')
+        self.assertEqual(
+            [(line.entry.category_id, line.quantity, line.unit_rate, line.currency, line.amount) for line in lines],
+            [(category.pk, 2, Decimal('1.00'), 'USD', Decimal('2.00')) for category in self.categories],
+        )
+
+        response = self.client.get(status['download_url'])
+        sheet = load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        self.assertEqual(sheet['F13'].value, 'Per Unit Price (USD)')
+        self.assertEqual([sheet.cell(row=row, column=3).value for row in (14, 15, 16)], ['Category 0', 'Category 1', 'Category 2'])
+        self.assertEqual(sheet['B14'].border.left.style, 'thin')
+        self.assertEqual((sheet['B14'].font.name, sheet['B14'].font.sz), ('Arial', 10))
+        self.assertEqual((sheet['B22'].value, sheet['B22'].font.name), ('Please see attached', 'Arial'))
+        self.assertEqual((sheet['B17'].value, sheet['E17'].value, sheet['G17'].value), ('Total', 6, 6))
+        self.assertTrue(sheet['B18'].value.startswith('In Words: Six'))
+        self.assertEqual(self.client.get(reverse('generate_bank_invoice'), {'project': self.project.pk}).status_code, 200)
+
+    def test_identical_invoice_requests_share_one_job(self):
+        member = User.objects.create_user(username='member', email='member@example.com', password='pw', created_by=self.admin)
+        WorkEntry.objects.create(user=member, project=self.project, category=self.categories[0], folder_name='f', quantity=2)
+        url = reverse('generate_invoice')
+        first = self.client.get(url, {'project': self.project.pk})
+        self.assertEqual(self.client.get(url, {'project': self.project.pk})['Location'], first['Location'])
+        self.assertNotEqual(self.client.get(url, {'project': self.project.pk, 'group_by': 'day'})['Location'], first['Location'])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            job = InvoiceJob.objects.first()
+            InvoiceJob.objects.create(requested_by=self.admin, project=self.project, request_key=job.request_key)
+
+        self.assertEqual(run_worker('test', once=True), 2)
+        self.assertEqual(Invoice.objects.count(), 2)
+
+    def test_invoice_is_built_in_the_request_without_a_worker(self):
+        member = User.objects.create_user(username='member', email='member@example.com', password='pw', created_by=self.admin)
+        WorkEntry.objects.create(user=member, project=self.project, category=self.categories[0], folder_name='f', quantity=2)
+        with self.settings(INVOICE_WORKER=False):
+            response = self.client.get(reverse('generate_invoice'), {'project': self.project.pk})
+        job = InvoiceJob.objects.get()
+        self.assertRedirects(response, reverse('invoice_job', args=[job.pk]))
+        self.assertEqual((job.status, job.invoice.total_amount), (InvoiceJob.STATUS_DONE, Decimal('2.00')))
+        self.assertTrue(job.worker.startswith('web:'))
+        self.assertEqual(run_worker('test', once=True), 0)
+
+    def test_lost_invoice_files_are_built_again(self):
+        member = User.objects.create_user(username='member', email='member@example.com', password='pw', created_by=self.admin)
+        WorkEntry.objects.create(user=member, project=self.project, category=self.categories[0], folder_name='f', quantity=2)
+        url = reverse('generate_invoice')
+        first = self.client.get(url, {'project': self.project.pk})
+        run_worker('test', once=True)
+        old_job = InvoiceJob.objects.get()
+        old_job.invoice.invoice_file.delete(save=False)
+
+        response = self.client.get(reverse('invoice_job_download', args=[old_job.pk]))
+        self.assertEqual(response.status_code, 200)
+        sheet = load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        self.assertEqual(sheet['G15'].value, 2)
+
+        old_job.invoice.refresh_from_db()
+        old_job.invoice.invoice_file.delete(save=False)
+        self.assertNotEqual(self.client.get(url, {'project': self.project.pk})['Location'], first['Location'])
+        self.assertEqual(InvoiceJob.objects.count(), 2)
+
+    def test_a_request_rebuilds_a_job_left_running_by_a_dead_request(self):
+        member = User.objects.create_user(username='member', email='member@example.com', password='pw', created_by=self.admin)
+        WorkEntry.objects.create(user=member, project=self.project, category=self.categories[0], folder_name='f', quantity=2)
+        url = reverse('generate_invoice')
+        self.client.get(url, {'project': self.project.pk})
+        InvoiceJob.objects.update(status=InvoiceJob.STATUS_RUNNING, worker='dead', started_at=timezone.now() - timedelta(hours=2))
+        with self.settings(INVOICE_WORKER=False):
+            self.client.get(url, {'project': self.project.pk})
+        job = InvoiceJob.objects.get()
+        self.assertEqual((job.status, job.worker[:4]), (InvoiceJob.STATUS_DONE, 'web:'))
+
+    def test_worker_survives_bad_jobs_and_picks_up_stale_ones(self):
+        member = User.objects.create_user(username='member', email='member@example.com', password='pw', created_by=self.admin)
+        WorkEntry.objects.create(user=member, project=self.project, category=self.categories[0], folder_name='f', quantity=2)
+        bad = InvoiceJob.objects.create(requested_by=self.admin, project=self.project, params={'start_date': 'not a date'})
+        stale = InvoiceJob.objects.create(
+            requested_by=self.admin, project=self.project, params={}, status=InvoiceJob.STATUS_RUNNING,
+            worker='gone', started_at=timezone.now() - timedelta(hours=2),
+        )
+        self.assertEqual(run_worker('test', once=True), 2)
+        bad.refresh_from_db()
+        stale.refresh_from_db()
+        self.assertEqual(bad.status, InvoiceJob.STATUS_FAILED)
+        self.assertIn('not a date', bad.error)
+        self.assertEqual((stale.status, stale.worker), (InvoiceJob.STATUS_DONE, 'test'))
+
+    def test_unchanged_invoice_is_served_from_storage(self):
+        member = User.objects.create_user(username='member', email='member@example.com', password='pw', created_by=self.admin)
+        entry = WorkEntry.objects.create(user=member, project=self.project, category=self.categories[0], folder_name='f', quantity=2)
+        url = reverse('generate_invoice')
+        self.client.get(url, {'project': self.project.pk})
+        run_worker('test', once=True)
+        invoice = Invoice.objects.get()
+        self.assertEqual(len(invoice.fingerprint), 64)
+
+        response = self.client.get(url, {'project': self.project.pk})
+        self.assertEqual(response.status_code, 200)
+        with invoice.invoice_file.open('rb') as stored:
+            self.assertEqual(b''.join(response.streaming_content), stored.read())
+        self.assertEqual(InvoiceJob.objects.count(), 1)
+
+        entry.quantity = 3
+        entry.save()
+        self.assertEqual(self.client.get(url, {'project': self.project.pk}).status_code, 302)
+        run_worker('test', once=True)
+        self.assertEqual(self.client.get(url, {'project': self.project.pk}).status_code, 200)
+        update_rates(self.project, {self.categories[0].pk: '9.00'})
+        self.assertEqual(self.client.get(url, {'project': self.project.pk}).status_code, 302)
+        self.assertEqual(InvoiceJob.objects.count(), 3)
+
+    def test_recorded_lines_keep_the_rates_they_were_billed_at(self):
+        member = User.objects.create_user(username='member', email='member@example.com', password='pw', created_by=self.admin)
+        for category in self.categories:
+            WorkEntry.objects.create(user=member, project=self.project, category=category, folder_name='f', quantity=2)
+        invoice = build_invoice(self.project, WorkEntry.objects.all())
+        update_rates(self.project, {self.categories[0].pk: '5.00'})
+
+        billed = InvoiceLine.objects.filter(category=self.categories[0]).aggregate(amount=Sum('amount'))
+        self.assertEqual(billed['amount'], Decimal('2.00'))
+        with CaptureQueriesContext(connection) as ctx:
+            render_recorded_invoice(invoice, BytesIO())
+        self.assertFalse([q for q in ctx.captured_queries if 'Invoice_workentry' in q['sql']])
+
+    def test_unbilled_mode_bills_only_new_work(self):
+        member = User.objects.create_user(username='member', email='member@example.com', password='pw', created_by=self.admin)
+        for category in self.categories:
+            WorkEntry.objects.create(user=member, project=self.project, category=category, folder_name='f', quantity=2)
+        first = build_invoice(self.project, invoice_entries(self.admin, self.project.pk))
+        self.assertEqual(WorkEntry.objects.filter(billed_invoice=first).count(), 3)
+
+        late = WorkEntry.objects.create(user=member, project=self.project, category=self.categories[0], folder_name='g', quantity=5)
+        unbilled = invoice_entries(self.admin, self.project.pk, unbilled=True)
+        self.assertIn('workentry_unbilled', unbilled.filter(project_id=self.project.pk).explain())
+        bounded = invoice_entries(self.admin, self.project.pk, end_date=timezone.localdate().isoformat(), unbilled=True)
+        self.assertIn('workentry_unbilled', bounded.explain())
+        self.assertNotIn('django_datetime', str(bounded.query))
+        second = build_invoice(self.project, unbilled)
+        self.assertEqual(list(second.lines.values_list('entry_id', flat=True)), [late.pk])
+        self.assertEqual(second.total_amount, Decimal('5.00'))
+        self.assertFalse(double_billed_lines().exists())
+
+        everything = build_invoice(self.project, invoice_entries(self.admin, self.project.pk))
+        self.assertEqual(double_billed_lines().filter(invoice=everything).count(), 4)
+        first.delete()
+        self.assertEqual(invoice_entries(self.admin, self.project.pk, unbilled=True).count(), 3)
+
+    def test_entries_written_while_billing_are_left_unbilled(self):
+        member = User.objects.create_user(username='member', email='member@example.com', password='pw', created_by=self.admin)
+        billed = WorkEntry.objects.create(user=member, project=self.project, category=self.categories[0], folder_name='f', quantity=2)
+        invoice = Invoice.objects.create(project=self.project, project_name_snapshot=self.project.name)
+        for unbilled in (True, False):
+            lines_source = bill_entries(invoice, invoice_entries(self.admin, self.project.pk, unbilled=unbilled))
+            late = WorkEntry.objects.create(user=member, project=self.project, category=self.categories[0], folder_name='g', quantity=1)
+            self.assertEqual(list(lines_source), [billed])
+            late.delete()
+
+    def test_invoice_preview_matches_the_invoice_without_building_it(self):
+        member = User.objects.create_user(username='member', email='member@example.com', password='pw', created_by=self.admin)
+        for category in self.categories:
+            WorkEntry.objects.create(user=member, project=self.project, category=category, folder_name='f', quantity=2)
+        WorkEntry.objects.create(user=member, project=self.project, category=self.categories[0], folder_name='g', quantity=1)
+        url = reverse('invoice_preview')
+        with CaptureQueriesContext(connection) as ctx:
+            preview = self.client.get(url, {'project': self.project.pk}).json()
+        self.assertEqual(
+            (preview['lines'], preview['total_quantity'], preview['totals'], preview['total_label']),
+            (4, 7, {'USD': '7.00'}, '7.00'),
+        )
+        self.assertTrue(preview['in_words'].startswith('In Words: Seven'))
+        self.assertFalse([q for q in ctx.captured_queries if 'Invoice_invoice' in q['sql']])
+        self.assertEqual(self.client.get(url, {'project': self.project.pk, 'group_by': 'folder'}).json()['lines'], 4)
+        self.assertEqual(self.client.get(url, {'project': self.project.pk, 'group_by': 'day'}).json()['lines'], 3)
+        self.assertEqual(self.client.get(url, {'group_by': 'week'}).status_code, 400)
+        self.assertFalse(InvoiceJob.objects.exists() or Invoice.objects.exists())
+
+        update_rates(self.project, {self.categories[1].pk: '3.00'})
+        Category.objects.filter(pk=self.categories[1].pk).update(currency='EUR')
+        clear_rate_cards()
+        preview = self.client.get(url, {'project': self.project.pk}).json()
+        self.assertEqual(preview['totals'], {'EUR': '6.00', 'USD': '5.00'})
+        self.assertEqual(preview['currency'], 'EUR')
+
+        build_invoice(self.project, invoice_entries(self.admin, self.project.pk))
+        preview = self.client.get(url, {'project': self.project.pk, 'unbilled': '1'}).json()
+        self.assertEqual((preview['lines'], preview['totals']), (0, {}))
+
+
+class MonthlyInvoiceTests(TestCase):
+    def setUp(self):
+        use_temporary_media(self)
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', password='pw', role='admin')
+        member = User.objects.create_user(username='member', email='member@example.com', password='pw', created_by=self.admin)
+        self.day = timezone.localtime().replace(year=2026, month=9, day=15)
+        for name, rate in (('Alpha', '1.00'), ('Beta', '2.00')):
+            project = ClientProject.objects.create(
+                name=name, start_date=self.day.date(), created_by=self.admin, managed_by=self.admin
+            )
+            category = Category.objects.create(project=project, name='Clipping', rate=rate, managed_by=self.admin)
+            for quantity in (1, 2):
+                entry = WorkEntry.objects.create(user=member, project=project, category=category, folder_name='f', quantity=quantity)
+                WorkEntry.objects.filter(pk=entry.pk).update(date=self.day)
+        ClientProject.objects.create(name='Idle', start_date=self.day.date(), created_by=self.admin, managed_by=self.admin)
+
+    def test_dry_run_creates_nothing(self):
+        out = StringIO()
+        call_command('generate_monthly_invoices', month='2026-09', dry_run=True, stdout=out)
+        self.assertIn('Alpha: 2 entries, 3 units, USD 3.00', out.getvalue())
+        self.assertIn('Beta: 2 entries, 3 units, USD 6.00', out.getvalue())
+        self.assertFalse(Invoice.objects.exists())
+
+    def test_every_billable_project_is_invoiced_once(self):
+        out = StringIO()
+        call_command('generate_monthly_invoices', month='2026-09', workers=1, stdout=out)
+        invoices = {invoice.project_name_snapshot: invoice for invoice in Invoice.objects.all()}
+        self.assertEqual(set(invoices), {'Alpha', 'Beta'})
+        self.assertEqual(invoices['Beta'].total_amount, Decimal('6.00'))
+        self.assertEqual((invoices['Beta'].year, invoices['Beta'].month, invoices['Beta'].end_date.day), (2026, 9, 30))
+        sheet = load_workbook(invoices['Beta'].invoice_file.path).active
+        self.assertEqual((sheet['B16'].value, sheet['G16'].value), ('Total', 6))
+        self.assertIn('Created 2 of 2 invoices', out.getvalue())
+
+        call_command('generate_monthly_invoices', month='2026-09', workers=1, stdout=StringIO())
+        self.assertEqual(Invoice.objects.count(), 2)
+
+    def test_invoices_left_without_a_file_are_redone(self):
+        projects = billable_projects(2026, 9)
+        record_monthly_invoices(projects, 2026, 9, unbilled=True)
+        self.assertEqual([project.name for project in billable_projects(2026, 9)], ['Alpha', 'Beta'])
+
+        out = StringIO()
+        call_command('generate_monthly_invoices', month='2026-09', workers=1, unbilled=True, stdout=out)
+        self.assertIn('Removed 2 invoices', out.getvalue())
+        self.assertEqual(Invoice.objects.exclude(invoice_file='').count(), 2)
+        self.assertEqual(Invoice.objects.count(), 2)
+        self.assertFalse(WorkEntry.objects.filter(billed_invoice__isnull=True).exists())
+
+    def test_summarised_invoices_have_one_line_per_group(self):
+        # Half past midnight local time is still the previous day in UTC.
+        beta = WorkEntry.objects.filter(project__name='Beta').first()
+        late = WorkEntry.objects.create(
+            user=beta.user, project=beta.project, category=beta.category, folder_name='g', quantity=4,
+        )
+        WorkEntry.objects.filter(pk=late.pk).update(date=self.day.replace(day=16, hour=0, minute=30))
+        call_command('generate_monthly_invoices', month='2026-09', workers=1, group_by='day', stdout=StringIO())
+        sheet = load_workbook(Invoice.objects.get(project_name_snapshot='Beta').invoice_file.path).active
+        lines = [[sheet.cell(row=row, column=column).value for column in range(2, 8)] for row in (14, 15)]
+        self.assertEqual(lines, [
+            ['2 entries', 'Clipping', 'Sep 15, 2026', 3, 2, 6],
+            ['1 entry', 'Clipping', 'Sep 16, 2026', 4, 2, 8],
+        ])
+        self.assertEqual((sheet['B16'].value, sheet['E16'].value, sheet['G16'].value), ('Total', 7, 14))
+        self.assertTrue(sheet['B17'].value.startswith('In Words: Fourteen'))
+
+        self.client.force_login(self.admin)
+        project = ClientProject.objects.get(name='Alpha')
+        self.client.get(reverse('generate_invoice'), {'project': project.pk, 'group_by': 'folder'})
+        run_worker('test', once=True)
+        job = InvoiceJob.objects.get()
+        self.assertEqual((job.status, job.total_lines), ('done', 1))
+        sheet = load_workbook(job.invoice.invoice_file.path).active
+        self.assertEqual([sheet.cell(row=14, column=column).value for column in (2, 5, 7)], ['f', 3, 3])
+
+
+class InvoiceTemplateCacheTests(SimpleTestCase):
+    def test_template_is_parsed_again_only_after_it_changes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'InvoiceTemplate.xlsx')
+            shutil.copy(TEMPLATE_PATH, path)
+            template = invoice_template(path)
+            self.assertIs(invoice_template(path), template)
+            self.assertEqual(template.footer[0].cells[0].value, 'Total')
+
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+            self.assertIsNot(invoice_template(path), template)
+
+            workbook = template_workbook(path)
+            workbook.active['B8'] = 'changed'
+            self.assertEqual(template_workbook(path).active['B8'].value, 'Ref No :')
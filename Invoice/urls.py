@@ -19,11 +19,15 @@ from .views import (
     work_entry_form_view,
     get_user_login_history,
     my_work_entries_view,
+    my_work_calendar_view,
     dashboard_template_view,
+    dashboard_charts_view,
+    cache_stats_view,
     admin_panel_view,
     my_team_view,
     delete_user_view,
     manage_projects_view,
+    project_entries_view,
     set_price_view,
     delete_project_view,
     manage_prices_view,
@@ -31,10 +35,16 @@ from .views import (
     delete_price_view,
     export_page_view,
     generate_invoice,
+    invoice_preview_view,
+    invoice_job_view,
+    invoice_job_status_view,
+    invoice_job_download_view,
     reports_view,
     invoice_reports_view,
     create_slots_view,
+    fill_slots_view,
     submit_work_view,
+    import_work_entries_view,
     save_all_prices_view,
     delete_work_entry_view,
     delete_invoice_view,
@@ -53,14 +63,18 @@ urlpatterns = [
     path('login/', CustomLoginView.as_view(), name='login'),
     path('logout/', CustomLogoutView.as_view(), name='logout'),  # Use your custom logout
     path('submit-work/', submit_work_view, name='submit_work'),
+    path('work-entries/import/', import_work_entries_view, name='import_work_entries'),
     path('my-work/', my_work_entries_view, name='my_work_entries'),
+    path('my-work/calendar/', my_work_calendar_view, name='my_work_calendar'),
     path('dashboard/', dashboard_template_view, name='dashboard'),
+    path('dashboard/charts/', dashboard_charts_view, name='dashboard_charts'),
     path('admin-panel/', admin_panel_view, name='admin_panel'),
     path('my-team/', my_team_view, name='my_team'),
     path('delete-user/<uuid:user_id>/', delete_user_view, name='delete_user'),
     path('edit-user-role/<uuid:user_id>/', edit_user_role_view, name='edit_user_role'),
     path('manage/projects/', manage_projects_view, name='manage_projects'),
     path('set-price/<int:entry_id>/', set_price_view, name='set_price'),
+    path('manage/projects/<int:project_id>/entries/', project_entries_view, name='project_entries'),
     path('manage/projects/delete/<int:project_id>/', delete_project_view, name='delete_project'),
     path('manage/projects/delete-entry/<int:entry_id>/', delete_work_entry_view, name='delete_work_entry'),
     path('save-all-prices/<int:project_id>/', save_all_prices_view, name='save_all_prices'),
@@ -70,13 +84,19 @@ urlpatterns = [
     path('get-login-history/<uuid:user_id>/', get_user_login_history, name='get_login_history'),
     path('export-page/', export_page_view, name='export_page'),
     path('invoice/generate/', generate_invoice, name='generate_invoice'),
+    path('invoice/preview/', invoice_preview_view, name='invoice_preview'),
+    path('invoice/jobs/<int:job_id>/', invoice_job_view, name='invoice_job'),
+    path('invoice/jobs/<int:job_id>/status/', invoice_job_status_view, name='invoice_job_status'),
+    path('invoice/jobs/<int:job_id>/download/', invoice_job_download_view, name='invoice_job_download'),
     path('reports/', reports_view, name='reports'),
     path('invoice-reports/', invoice_reports_view, name='invoice_reports'),
     path('invoice/delete/<int:invoice_id>/', delete_invoice_view, name='delete_invoice'),
     path('create-slots/', create_slots_view, name='create_slots'),
+    path('fill-slots/', fill_slots_view, name='fill_slots'),
     path('ajax/load-categories/', load_categories_view, name='ajax_load_categories'),
     path('invoice/generate-bank/', generate_bank_invoice, name='generate_bank_invoice'),
     path('api/user-work-summary/', get_user_work_summary, name='get_user_work_summary'),
+    path('api/cache-stats/', cache_stats_view, name='cache_stats'),
     path('bulk-download-invoices/', bulk_download_invoices_view, name='bulk_download_invoices'),
     path('bulk-delete-invoices/', bulk_delete_invoices_view, name='bulk_delete_invoices'),
     path('user-reports/', user_reports_view, name='user_reports'),
@@ -13,11 +13,12 @@
 
 
 
-from datetime import datetime
+from datetime import datetime, time, timedelta
 from pathlib import Path
 from copy import copy
 from io import BytesIO
 from collections import Counter
+import socket
 
 from django.conf import settings
 from collections import defaultdict
@@ -34,10 +35,13 @@ from django.core.mail import send_mail
 from django.core.files.base import ContentFile
 from django.core.paginator import Paginator
 from django.db.models import Q, Count, Sum
-from django.db.models.functions import ExtractWeekDay
-from django.http import HttpResponse
+from django.db.models.functions import ExtractWeekDay, TruncDate
+from django.http import FileResponse, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from django.utils import timezone
 from django.utils.dateparse import parse_date
 from django.http import JsonResponse
@@ -53,7 +57,28 @@ from rest_framework import generics, permissions
 from rest_framework.response import Response
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
-from .models import User, ClientProject, Category, WorkEntry, Invoice, UserLoginHistory
+from .models import User, ClientProject, Category, WorkEntry, WorkEntryDailyRollup, Invoice, InvoiceJob, UserLoginHistory
+from .pagination import CURSOR_PARAM, cursor_mode_requested, cursor_querystring, paginate_by_cursor
+from .search import search_entries
+from .stats import user_work_stats
+from .slots import allocate_slots, fill_slots
+from .rates import RATE_COLUMNS, check_entry_prices, import_rate_card, priced_totals, rate_cards, update_rates
+from .submission import submit_work_entries
+from .importer import COLUMNS as IMPORT_COLUMNS, import_work_entries, iter_rows
+from .invoicing import (
+    GROUP_BY_CHOICES, invoice_entries, invoice_file_exists, invoice_filename, invoice_fingerprint, invoice_params,
+    invoice_preview, restore_invoice_file, stored_invoice,
+)
+from .jobs import enqueue_invoice, run_job_now
+from .revenue import amount_in_words, format_totals, monthly_revenue_by_currency, primary_currency
+from .caching import (
+    CATALOG_SCOPE, cache_key, cache_stats, cached_payload, current_versions, last_modified,
+    project_scope, role_scope, user_scope,
+)
+from .dashboard import (
+    DashboardFilters, dashboard_charts, dashboard_kpis,
+    scoped_entries, scoped_projects, scoped_team,
+)
 
 from .forms import (
     AdminUserCreationForm,
@@ -61,6 +86,7 @@ from .forms import (
     CategoryForm,
     WorkEntryForm,
     AdminSlotForm,
+    CreateSlotsForm,
     UserRoleUpdateForm,
 )
 from .serializers import (
@@ -82,63 +108,19 @@ def dashboard_template_view(request):
     if user.role == 'user':
         return redirect('my_work_entries')
 
-    projects_qs = ClientProject.objects.all()
-    projects_qs = ClientProject.objects.all()
-    users_qs = User.objects.filter(role='user')
-    entries_qs = WorkEntry.objects.select_related('user', 'project', 'category')
+    projects_qs = scoped_projects(user)
+    users_qs = scoped_team(user)
 
-    if user.role == 'admin':
-        projects_qs = projects_qs.filter(managed_by=user)
-        users_qs = users_qs.filter(created_by=user)
-        entries_qs = entries_qs.filter(project__managed_by=user)
+    filters = DashboardFilters.from_query(request.GET)
+    selected_project_id = filters.project_id
+    selected_user_id = filters.user_id
+    start_date = filters.start_date
+    end_date = filters.end_date
 
-    selected_project_id = request.GET.get('project')
-    selected_user_id = request.GET.get('user')
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-
-    if selected_project_id:
-        entries_qs = entries_qs.filter(project_id=selected_project_id)
-    if selected_user_id:
-        entries_qs = entries_qs.filter(user_id=selected_user_id)
-    if start_date:
-        entries_qs = entries_qs.filter(date__gte=start_date)
-    if end_date:
-        entries_qs = entries_qs.filter(date__lte=end_date)
-
-    total_projects = projects_qs.count()
-    total_team_members = users_qs.count()
-    current_month_entries = entries_qs.filter(
-        date__year=timezone.now().year,
-        date__month=timezone.now().month
-    ).count()
-
-    busiest_day_query = entries_qs.annotate(
-        weekday=ExtractWeekDay('date')
-    ).values('weekday').annotate(count=Count('id')).order_by('-count').first()
-
-    weekday_map = {1: 'Sunday', 2: 'Monday', 3: 'Tuesday', 4: 'Wednesday', 5: 'Thursday', 6: 'Friday', 7: 'Saturday'}
-    busiest_day = weekday_map.get(busiest_day_query['weekday'], 'N/A') if busiest_day_query else 'N/A'
-
-    most_productive_user_query = entries_qs.values('user__username').annotate(
-        total_quantity=Sum('quantity')
-    ).order_by('-total_quantity').first()
-    most_productive_user = most_productive_user_query['user__username'] if most_productive_user_query else 'N/A'
-
-    category_data = entries_qs.values('category__name').annotate(count=Count('id')).order_by('-count')
-    pie_chart_labels = [item['category__name'] or 'Uncategorized' for item in category_data]
-    pie_chart_data = [item['count'] for item in category_data]
-
-    monthly_data = (
-        entries_qs.values('date__year', 'date__month')
-        .annotate(count=Count('id'))
-        .order_by('date__year', 'date__month')
-    )
-    bar_chart_labels = [f"{item['date__year']}-{item['date__month']:02d}" for item in monthly_data]
-    bar_chart_data = [item['count'] for item in monthly_data]
+    entries_qs = scoped_entries(user, filters).select_related('user', 'project', 'category')
 
-    total_invoiced_amount_query = Invoice.objects.filter(project__in=projects_qs).aggregate(total=Sum('total_amount'))
-    total_invoiced_amount = total_invoiced_amount_query['total'] or 0.00
+    cache_params = {'user': user.pk, 'filters': filters, 'today': timezone.localdate()}
+    kpis = cached_payload('dashboard_kpis', [role_scope(user)], cache_params, lambda: dashboard_kpis(user, filters))
 
     revenue_month_year = request.GET.get('revenue_month_year')
     selected_year, selected_month = None, None
@@ -155,41 +137,49 @@ def dashboard_template_view(request):
         "9": "September", "10": "October", "11": "November", "12": "December"
     }
 
-    available_revenue_dates = WorkEntry.objects.dates('date', 'month', order='DESC')
+    available_revenue_dates = WorkEntryDailyRollup.objects.dates('day', 'month', order='DESC')
 
-    monthly_revenue = Decimal('0.00')
-    if selected_year and selected_month:
+    monthly_revenue = {}
+    if selected_year and selected_month and selected_year.isdigit() and selected_month.isdigit():
         revenue_entries = entries_qs.filter(
             date__year=selected_year,
             date__month=selected_month
         )
-        for entry in revenue_entries:
-            rate = entry.category.rate if entry.category else Decimal('0.00')
-            quantity = entry.quantity or 0
-            monthly_revenue += (Decimal(quantity) * rate)
+        monthly_revenue = cached_payload(
+            'dashboard_monthly_revenue',
+            [role_scope(user)],
+            dict(cache_params, month=(selected_year, selected_month)),
+            lambda: monthly_revenue_by_currency(revenue_entries).get((int(selected_year), int(selected_month)), {}),
+        )
 
     page_obj = None
-    if entries_qs.exists():
-        paginator = Paginator(entries_qs, 18)
+    cursor_mode = cursor_mode_requested(request.GET)
+    next_page_query = previous_page_query = None
+    if kpis['total_entries'] and cursor_mode:
+        page_obj = paginate_by_cursor(entries_qs, request.GET.get(CURSOR_PARAM), 18)
+        if page_obj.has_next():
+            next_page_query = cursor_querystring(request.GET, page_obj.next_cursor)
+        if page_obj.has_previous():
+            previous_page_query = cursor_querystring(request.GET, page_obj.previous_cursor)
+    elif kpis['total_entries']:
+        paginator = Paginator(entries_qs.order_by('-date', '-id'), 18)
+        # The rollups already know how many entries match; spare the COUNT(*).
+        paginator.count = kpis['total_entries']
         page_number = request.GET.get('page')
         page_obj = paginator.get_page(page_number)
 
     current_month = datetime.today().strftime('%Y-%m')
     context = {
-        "total_projects": total_projects,
-        "total_team_members": total_team_members,
-        "current_month_entries": current_month_entries,
+        "total_projects": kpis['total_projects'],
+        "total_team_members": kpis['total_team_members'],
+        "current_month_entries": kpis['current_month_entries'],
         'current_month': current_month,
-        "busiest_day": busiest_day,
-        "most_productive_user": most_productive_user,
-        'entries': entries_qs.order_by('-date'),
-        "pie_chart_labels": pie_chart_labels,
-        "pie_chart_data": pie_chart_data,
-        "bar_chart_labels": bar_chart_labels,
-        "bar_chart_data": bar_chart_data,
+        "busiest_day": kpis['busiest_day'],
+        "most_productive_user": kpis['most_productive_user'],
+        "has_entries": bool(kpis['total_entries']),
         'all_projects': projects_qs.order_by('name'),
         'all_users': users_qs.order_by('username'),
-        "total_invoiced_amount": total_invoiced_amount,
+        "total_invoiced_amount": kpis['total_invoiced_amount'],
         "monthly_revenue": monthly_revenue,
         "month_names": month_names,
         "available_revenue_dates": available_revenue_dates,
@@ -200,12 +190,53 @@ def dashboard_template_view(request):
         "revenue_month_year": revenue_month_year,
         'projects': projects_qs,
         "users": users_qs,
-        "entries": entries_qs,
         "page_obj": page_obj,
+        "cursor_mode": cursor_mode,
+        "next_page_query": next_page_query,
+        "previous_page_query": previous_page_query,
     }
     return render(request, "dashboard.html", context)
 
 
+@login_required
+def dashboard_charts_view(request):
+    """Pie and bar chart data for the dashboard, fetched after the page renders.
+
+    Answers conditional requests with 304 so browsers can revalidate cheaply.
+    """
+    user = request.user
+    if user.role == 'user':
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    filters = DashboardFilters.from_query(request.GET)
+    # A project filter only depends on that project's writes
+    scopes = [project_scope(filters.project_id)] if filters.project_id else [role_scope(user)]
+    versions = current_versions(scopes)
+    cache_params = {'user': user.pk, 'filters': filters}
+    etag = cache_key('dashboard_charts', versions, cache_params)
+    modified = last_modified(versions)
+    last_modified_ts = int(modified.timestamp()) if modified else None
+
+    response = get_conditional_response(request, etag=quote_etag(etag), last_modified=last_modified_ts)
+    if response is None:
+        response = JsonResponse(cached_payload(
+            'dashboard_charts', scopes, cache_params, lambda: dashboard_charts(user, filters), versions=versions
+        ))
+    response.headers['ETag'] = quote_etag(etag)
+    if last_modified_ts is not None:
+        response.headers['Last-Modified'] = http_date(last_modified_ts)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@login_required
+def cache_stats_view(request):
+    """Hit/miss counters of the dashboard payload cache (super admins only)."""
+    if request.user.role != 'super_admin':
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    return JsonResponse({'stats': cache_stats()})
+
+
 @login_required
 def admin_panel_view(request):
     if request.user.role != 'super_admin':
@@ -257,23 +288,12 @@ def my_work_entries_view(request):
     start_date = request.GET.get('start_date', '').strip()
     end_date = request.GET.get('end_date', '').strip()
     
-    # DEBUG: Print initial state
-    print(f"DEBUG: Initial entries count: {entries_queryset.count()}")
-    print(f"DEBUG: Project filter: '{project_filter}'")
-    
     # Apply filters sequentially
     if project_filter:
-        before_count = entries_queryset.count()
         entries_queryset = entries_queryset.filter(project__name__iexact=project_filter)
-        after_count = entries_queryset.count()
-        print(f"DEBUG: After project filter - Before: {before_count}, After: {after_count}")
-        print(f"DEBUG: Available project names: {list(WorkEntry.objects.filter(user=user).values_list('project__name', flat=True).distinct())}")
     
     if query:
-        entries_queryset = entries_queryset.filter(
-            Q(folder_name__icontains=query) |
-            Q(category__name__icontains=query)
-        )
+        entries_queryset = search_entries(entries_queryset, query)
     
     if start_date:
         try:
@@ -290,43 +310,62 @@ def my_work_entries_view(request):
             pass
     
     # Apply final ordering
-    entries_queryset = entries_queryset.order_by('-date')
-    
-    # DEBUG: Print final state
-    print(f"DEBUG: Final entries count: {entries_queryset.count()}")
-    print(f"DEBUG: Final entries projects: {[e.project.name for e in entries_queryset[:5]]}")
-    
+    entries_queryset = entries_queryset.order_by('-date', '-id')
+
+    # Opt-in keyset pagination (?paging=cursor): one bounded query per page
+    cursor_mode = cursor_mode_requested(request.GET)
+    page_entries = entries_queryset
+    next_page_query = None
+    if cursor_mode:
+        page = paginate_by_cursor(entries_queryset, request.GET.get(CURSOR_PARAM), 50)
+        page_entries = page.object_list
+        if page.has_next():
+            next_page_query = cursor_querystring(request.GET, page.next_cursor)
+
+    is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    list_context = {
+        'entries': page_entries,
+        'next_page_query': next_page_query,
+        'query': query,
+        'start_date': start_date,
+        'end_date': end_date,
+    }
+
+    # "Load more" requests only need the next slice of the list
+    if is_ajax and request.GET.get(CURSOR_PARAM):
+        entries_html = render_to_string('partials/_work_entries_list.html', list_context, request=request)
+        return JsonResponse({'entries_html': entries_html, 'next_page_query': next_page_query})
+
     # Summary stats based on current month and filtered entries
-    now = timezone.now()
-    current_month_filtered = entries_queryset.filter(date__year=now.year, date__month=now.month)
-    total_entries_month = current_month_filtered.count()
-    total_quantity_month = entries_queryset.aggregate(total=Sum('quantity'))['total'] or 0
+    if not (project_filter or query or start_date or end_date):
+        stats = user_work_stats(user)
+        total_entries_month = stats.month_entries
+        total_quantity_month = stats.total_quantity
+        most_frequent_project = stats.top_project.name if stats.top_project else 'N/A'
+    else:
+        now = timezone.now()
+        current_month_filtered = entries_queryset.filter(date__year=now.year, date__month=now.month)
+        total_entries_month = current_month_filtered.count()
+        total_quantity_month = entries_queryset.aggregate(total=Sum('quantity'))['total'] or 0
 
-    # Most frequent project from filtered entries
-    project_counts = entries_queryset.values('project__name').annotate(
-        count=Count('id')
-    ).order_by('-count').first()
-    most_frequent_project = project_counts['project__name'] if project_counts else 'N/A'
+        # Most frequent project from filtered entries
+        project_counts = entries_queryset.values('project__name').annotate(
+            count=Count('id')
+        ).order_by('-count').first()
+        most_frequent_project = project_counts['project__name'] if project_counts else 'N/A'
 
     # Unique projects for dropdown (all user's projects)
     unique_projects = WorkEntry.objects.filter(user=user).values_list('project__name', flat=True).distinct().order_by('project__name')
-    
-    # Calendar events from filtered entries only
-    calendar_events = []
-    for entry_date in entries_queryset.values_list('date', flat=True).distinct():
-        if entry_date:  # Make sure date is not None
-            calendar_events.append({
-                'title': 'Work Submitted',
-                'start': entry_date.strftime('%Y-%m-%d'),
-                'allDay': True
-            })
+
+    # The calendar loads the visible range itself from my_work_calendar_view
 
     context = {
-        'entries': entries_queryset,
+        'entries': page_entries,
+        'next_page_query': next_page_query,
+        'cursor_mode': cursor_mode,
         'total_entries_month': total_entries_month,
         'total_quantity_month': total_quantity_month,
         'most_frequent_project': most_frequent_project,
-        'calendar_events_json': json.dumps(calendar_events),
         'start_date': start_date,
         'end_date': end_date,
         'query': query,
@@ -335,10 +374,11 @@ def my_work_entries_view(request):
     }
 
     # Handle AJAX requests
-    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        entries_html = render_to_string('partials/_work_entries_list.html', {'entries': entries_queryset}, request=request)
+    if is_ajax:
+        entries_html = render_to_string('partials/_work_entries_list.html', list_context, request=request)
         return JsonResponse({
             'entries_html': entries_html,
+            'next_page_query': next_page_query,
             'summary': {
                 'total_entries_month': total_entries_month,
                 'total_quantity_month': total_quantity_month,
@@ -349,113 +389,191 @@ def my_work_entries_view(request):
     return render(request, 'my_work_entries.html', context)
 
 
+@login_required
+def my_work_calendar_view(request):
+    """Per-day entry counts and quantities for the calendar's visible range.
+
+    FullCalendar passes `start` and `end` (end exclusive); the My Work
+    filters narrow the totals the same way they narrow the entries list.
+    """
+    if request.user.role != 'user':
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    try:
+        range_start = parse_date(request.GET.get('start', '')[:10])
+        range_end = parse_date(request.GET.get('end', '')[:10])
+        start_day = parse_date(request.GET.get('start_date', '').strip())
+        end_day = parse_date(request.GET.get('end_date', '').strip())
+    except ValueError:
+        return JsonResponse({'error': 'Invalid date'}, status=400)
+    if not range_start or not range_end:
+        return JsonResponse({'error': 'start and end are required'}, status=400)
+
+    project_filter = request.GET.get('project', '').strip()
+    query = request.GET.get('query', '').strip()
+    if start_day:
+        range_start = max(range_start, start_day)
+    if end_day:
+        range_end = min(range_end, end_day + timedelta(days=1))
+
+    if query:
+        # Folder names are not in the rollups; group the matching entries by day.
+        tz = timezone.get_default_timezone()
+        days = (
+            WorkEntry.objects.filter(
+                user=request.user,
+                date__gte=timezone.make_aware(datetime.combine(range_start, time.min), tz),
+                date__lt=timezone.make_aware(datetime.combine(range_end, time.min), tz),
+            )
+            .annotate(day=TruncDate('date', tzinfo=tz))
+        )
+        days = search_entries(days, query)
+        count_field, quantity_field = Count('id'), Sum('quantity')
+    else:
+        days = WorkEntryDailyRollup.objects.filter(user=request.user, day__gte=range_start, day__lt=range_end)
+        count_field, quantity_field = Sum('entry_count'), Sum('total_quantity')
+    if project_filter:
+        days = days.filter(project__name__iexact=project_filter)
+
+    rows = days.order_by().values('day').annotate(count=count_field, quantity=quantity_field).order_by('day')
+    events = [
+        {
+            'title': f"{row['count']} {'entry' if row['count'] == 1 else 'entries'} · {row['quantity'] or 0}",
+            'start': row['day'].isoformat(),
+            'allDay': True,
+            'extendedProps': {'count': row['count'], 'quantity': row['quantity'] or 0},
+        }
+        for row in rows if row['count']
+    ]
+    return JsonResponse(events, safe=False)
+
+
+@login_required
+def import_work_entries_view(request):
+    """Import work entries from an uploaded XLSX or CSV work log."""
+    if request.user.role not in ['admin', 'super_admin']:
+        return render(request, 'unauthorized.html')
+
+    report = None
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if not upload:
+            messages.error(request, "Please choose a file to import.")
+            return redirect('import_work_entries')
+        try:
+            rows = iter_rows(upload.file, upload.name)
+        except ValueError as e:
+            messages.error(request, str(e))
+            return redirect('import_work_entries')
+
+        report = import_work_entries(request.user, rows)
+        if report.error:
+            messages.error(request, report.error)
+        if report.imported:
+            messages.success(request, f"{report.imported} work entries imported.")
+        if report.rejected:
+            messages.warning(request, f"{report.rejected} rows were rejected.")
+
+    return render(request, 'import_entries.html', {'report': report, 'columns': IMPORT_COLUMNS})
+
+
 @login_required
 def create_slots_view(request):
     if request.user.role not in ['admin', 'super_admin']:
         return render(request, 'unauthorized.html')
 
     if request.method == 'POST':
-        form = AdminSlotForm(request.POST)
+        form = CreateSlotsForm(request.POST, user=request.user)
         if form.is_valid():
             project = form.cleaned_data['project']
-            slot_count = form.cleaned_data['slot_count']
-            for _ in range(slot_count):
-                WorkEntry.objects.create(project=project, is_slot=True)
-            messages.success(request, f"{slot_count} empty slots created for project '{project.name}'")
+            slot_ids = allocate_slots(project, form.cleaned_data['slot_count'])
+            messages.success(request, f"{len(slot_ids)} empty slots created for project '{project.name}'")
             return redirect('manage_projects')
     else:
-        form = AdminSlotForm()
+        form = CreateSlotsForm(user=request.user)
 
     return render(request, 'create_slots.html', {'form': form})
 
 
+FILL_SLOTS_ROWS = 10
+
+
 @login_required
 def fill_slots_view(request):
+    """Fill free slots of one of the admin's projects, several rows at a time."""
     if request.user.role != 'user':
         return render(request, 'unauthorized.html')
 
-    user = request.user
-    empty_slots = WorkEntry.objects.filter(user__isnull=True, is_slot=True, project__in=user.created_by.managed_projects.all())
+    projects = (
+        ClientProject.objects.filter(managed_by=request.user.created_by)
+        .annotate(free_slots=Count('work_entries', filter=Q(work_entries__is_slot=True, work_entries__user__isnull=True)))
+        .filter(free_slots__gt=0)
+        .order_by('name')
+    ) if request.user.created_by_id else ClientProject.objects.none()
 
     if request.method == 'POST':
-        for slot in empty_slots:
-            category = request.POST.get(f'category_{slot.id}')
-            quantity = request.POST.get(f'quantity_{slot.id}')
-            if category and quantity:
-                slot.user = user
-                slot.category = category
-                slot.quantity = quantity
-                slot.date = timezone.now()
-                slot.save()
-        messages.success(request, "Slots filled successfully.")
-        return redirect('my_work_entries')
+        project = get_object_or_404(ClientProject, id=request.POST.get('project'))
+        result = fill_slots(request.user, project, _posted_entry_rows(request))
+        if result.ok:
+            messages.success(request, f"{len(result.created)} slots filled successfully.")
+            return redirect('my_work_entries')
+        _report_submission_errors(request, result)
+        return redirect(f"{request.path}?project={project.id}")
+
+    project = projects.filter(id=request.GET.get('project')).first() if request.GET.get('project', '').isdigit() else None
+    context = {
+        'projects': projects,
+        'project': project,
+        'categories': project.categories.order_by('name') if project else Category.objects.none(),
+        'rows': range(min(project.free_slots, FILL_SLOTS_ROWS)) if project else range(0),
+        'today': timezone.localdate(),
+    }
+    return render(request, 'fill_slots.html', context)
+
+
+def _posted_entry_rows(request):
+    """The work entry rows of a submit/fill form, as dicts for clean_row()."""
+    return [
+        {'category': cat_id, 'folder_name': folder, 'quantity': qty, 'date': date_str}
+        for cat_id, folder, qty, date_str in zip(
+            request.POST.getlist('category[]'),
+            request.POST.getlist('folder_name[]'),
+            request.POST.getlist('quantity[]'),
+            request.POST.getlist('date[]'),
+        )
+    ]
+
 
-    return render(request, 'fill_slots.html', {'slots': empty_slots})
+def _report_submission_errors(request, result):
+    for error in result.errors:
+        details = "; ".join(f"{field.replace('_', ' ')}: {message}" for field, message in error['errors'].items())
+        prefix = f"Entry #{error['row']}: " if error['row'] else ""
+        messages.error(request, f"{prefix}{details}")
+    messages.warning(request, "No work entries were saved. Please fix the errors above and submit again.")
 
 @login_required
 def submit_work_view(request):
-    print("=== Starting submit_work_view ===")
-    print(f"User: {request.user.username}")
-
     admin_of_user = request.user.created_by
     if not admin_of_user:
         projects = ClientProject.objects.none()
-        print("No admin found for user")
     else:
         projects = ClientProject.objects.filter(managed_by=admin_of_user)
-        print(f"Found projects: {[p.name for p in projects]}")
 
     if request.method == 'POST':
-        print("Processing POST request")
         project_id = request.POST.get('project')
-        category_ids = request.POST.getlist('category[]')
-        folder_names = request.POST.getlist('folder_name[]')
-        quantities = request.POST.getlist('quantity[]')
-        dates = request.POST.getlist('date[]')
-
-        print(f"Received data - Project ID: {project_id}")
-        print(f"Categories: {category_ids}")
-        print(f"Folders: {folder_names}")
-        print(f"Quantities: {quantities}")
-        print(f"Dates: {dates}")
-
         if not project_id:
             messages.error(request, "Please select a project.")
             return redirect('submit_work')
 
         project = get_object_or_404(ClientProject, id=project_id)
-        entries_created = []
-
-        for cat_id, folder, qty, date_str in zip(category_ids, folder_names, quantities, dates):
-            if folder.strip() and qty and date_str and cat_id:
-                try:
-                    category_instance = Category.objects.get(id=cat_id)
-                    # Convert date string to timezone-aware datetime
-                    date_obj = timezone.datetime.strptime(date_str, '%Y-%m-%d')
-                    local_tz = timezone.get_current_timezone()
-                    aware_date = timezone.make_aware(date_obj, local_tz)
-                    
-                    entry = WorkEntry.objects.create(
-                        user=request.user,
-                        project=project,
-                        folder_name=folder.strip(),
-                        category=category_instance,
-                        quantity=int(qty),
-                        date=aware_date
-                    )
-                    if entry.id:
-                        entries_created.append(entry)
-                except (Category.DoesNotExist, ValueError) as e:
-                    print(f"Error creating entry: {str(e)}")
-                    messages.error(request, f"Error creating entry: {str(e)}")
-                    continue
-
-        if entries_created:
-            messages.success(request, f"{len(entries_created)} work entries submitted successfully!")
-        else:
-            messages.warning(request, "No work entries were created. Please check your input.")
+        result = submit_work_entries(request.user, project, _posted_entry_rows(request))
 
-        return redirect('my_work_entries')
+        if result.ok:
+            messages.success(request, f"{len(result.created)} work entries submitted successfully!")
+            return redirect('my_work_entries')
+
+        _report_submission_errors(request, result)
+        return redirect('submit_work')
 
     context = {
         'projects': projects,
@@ -483,16 +601,25 @@ def manage_prices_view(request, project_id):
                 messages.success(request, f"Category '{category.name}' added to project '{project.name}'.")
 
         elif 'update_prices' in request.POST:
-            for key, value in request.POST.items():
-                if key.startswith('rate-'):
-                    try:
-                        category_id = int(key.split('-')[1])
-                        category = Category.objects.get(id=category_id, project=project, managed_by=user)
-                        category.rate = value
-                        category.save()
-                    except (ValueError, Category.DoesNotExist):
-                        continue
-            messages.success(request, f"Prices for project '{project.name}' updated successfully.")
+            result = update_rates(project, _posted_prices(request, 'rate-'))
+            if result.ok:
+                messages.success(request, f"Prices for project '{project.name}' updated successfully.")
+            else:
+                _report_rate_card_errors(request, result, 'Category')
+
+        elif 'upload_rates' in request.POST:
+            upload = request.FILES.get('file')
+            try:
+                if not upload:
+                    raise ValueError("Please choose a rate-card file to upload.")
+                result = import_rate_card(project, iter_rows(upload.file, upload.name), managed_by=project.managed_by or user)
+            except ValueError as e:
+                messages.error(request, str(e))
+            else:
+                if result.ok:
+                    messages.success(request, f"Rate card uploaded: {result.created} categories added, {result.updated} updated.")
+                else:
+                    _report_rate_card_errors(request, result, 'Row')
 
         return redirect('manage_prices', project_id=project.id)
 
@@ -503,6 +630,7 @@ def manage_prices_view(request, project_id):
         'form': form,
         'project': project,
         'categories': categories,
+        'rate_columns': RATE_COLUMNS,
     }
     return render(request, 'manage_prices.html', context)
 
@@ -567,23 +695,35 @@ def save_all_prices_view(request, project_id):
         return render(request, 'unauthorized.html')
 
     if request.method == 'POST':
-        entries_to_update = []
-        for key, value in request.POST.items():
-            if key.startswith('price-'):
-                try:
-                    entry_id = int(key.split('-')[1])
-                    entry = WorkEntry.objects.get(id=entry_id, project_id=project_id)
-                    entry.unit_price = float(value) if value else None
-                    entries_to_update.append(entry)
-                except (ValueError, WorkEntry.DoesNotExist):
-                    continue
-
-        if entries_to_update:
-            WorkEntry.objects.bulk_update(entries_to_update, ['unit_price'])
-            messages.success(request, "All prices have been updated successfully.")
+        project = get_object_or_404(ClientProject, id=project_id)
+        if request.user.role != 'super_admin' and project.managed_by != request.user:
+            return render(request, 'unauthorized.html')
+        # Entries bill at their category's rate; rates are only changed on
+        # the rate card, never as a side effect of editing one entry.
+        result = check_entry_prices(project, _posted_prices(request, 'price-'))
+        if result.ok:
+            messages.info(request, "Entry prices match their category rates; nothing was changed.")
+        else:
+            _report_rate_card_errors(request, result, 'Entry')
+            return redirect('manage_prices', project_id=project.id)
 
     return redirect('manage_projects')
 
+def _posted_prices(request, prefix):
+    """{id: value} for the non-blank `<prefix><id>` fields of a price form."""
+    prices = {}
+    for key, value in request.POST.items():
+        if key.startswith(prefix) and key[len(prefix):].isdigit() and value.strip():
+            prices[int(key[len(prefix):])] = value
+    return prices
+
+
+def _report_rate_card_errors(request, result, label):
+    for error in result.errors:
+        details = "; ".join(f"{field}: {message}" for field, message in error['errors'].items())
+        messages.error(request, f"{label} #{error['row']}: {details}")
+    messages.warning(request, "No prices were changed. Please fix the errors above and try again.")
+
 @login_required
 def export_page_view(request):
     if request.user.role not in ['admin', 'super_admin']:
@@ -667,10 +807,10 @@ def manage_projects_view(request):
 
         if slot_form.is_valid() and project_id:
             project = get_object_or_404(ClientProject, id=project_id)
-            slot_count = slot_form.cleaned_data['slot_count']
-            for _ in range(slot_count):
-                WorkEntry.objects.create(project=project, is_slot=True, user=None, folder_name="N/A", quantity=0)
-            messages.success(request, f"{slot_count} new slot(s) added under project '{project.name}'.")
+            if user.role != 'super_admin' and project.managed_by != user:
+                return render(request, 'unauthorized.html')
+            slot_ids = allocate_slots(project, slot_form.cleaned_data['slot_count'])
+            messages.success(request, f"{len(slot_ids)} new slot(s) added under project '{project.name}'.")
             return redirect('manage_projects')
     else:
         form = ClientProjectForm()
@@ -690,6 +830,34 @@ def manage_projects_view(request):
     return render(request, 'manage_projects.html', context)
 
 
+@login_required
+def project_entries_view(request, project_id):
+    """Search the work entries of one project by folder or category name."""
+    user = request.user
+    if user.role not in ['admin', 'super_admin']:
+        return render(request, 'unauthorized.html')
+
+    project = get_object_or_404(ClientProject, id=project_id)
+    if user.role != 'super_admin' and project.managed_by != user:
+        return render(request, 'unauthorized.html')
+
+    query = request.GET.get('q', '').strip()
+    entries = search_entries(
+        WorkEntry.objects.filter(project=project).select_related('user', 'category'),
+        query,
+    )
+    page = paginate_by_cursor(entries, request.GET.get(CURSOR_PARAM), 50)
+
+    context = {
+        'project': project,
+        'query': query,
+        'page': page,
+        'next_page_query': cursor_querystring(request.GET, page.next_cursor) if page.has_next() else None,
+        'previous_page_query': cursor_querystring(request.GET, page.previous_cursor) if page.has_previous() else None,
+    }
+    return render(request, 'project_entries.html', context)
+
+
 @login_required
 def delete_project_view(request, project_id):
     user = request.user
@@ -762,134 +930,140 @@ def generate_invoice(request, project_id=None):
     if user.role not in ['admin', 'super_admin']:
         return render(request, 'unauthorized.html')
 
-    entries_qs = WorkEntry.objects.select_related('user', 'project', 'category')
-    if user.role == 'admin':
-        entries_qs = entries_qs.filter(project__managed_by=user)
-
     selected_project_id = project_id or request.GET.get('project')
-    selected_user_id = request.GET.get('user')
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
-
-    if selected_project_id:
-        entries_qs = entries_qs.filter(project_id=selected_project_id)
-    if selected_user_id:
-        entries_qs = entries_qs.filter(user_id=selected_user_id)
-    if start_date:
-        entries_qs = entries_qs.filter(date__date__gte=start_date)
-    if end_date:
-        entries_qs = entries_qs.filter(date__date__lte=end_date)
-
-    work_entries = entries_qs.order_by('date')
-    if not work_entries.exists():
-        messages.warning(request, "No entries found to generate invoice.")
+    group_by = request.GET.get('group_by') or None
+    if group_by is not None and group_by not in dict(GROUP_BY_CHOICES):
+        messages.error(request, "Unknown invoice summary.")
+        return redirect('dashboard')
+    unbilled = request.GET.get('unbilled') in ('1', 'true', 'on')
+    work_entries = invoice_entries(
+        user,
+        project_id=selected_project_id,
+        user_id=request.GET.get('user'),
+        start_date=start_date,
+        end_date=end_date,
+        unbilled=unbilled,
+    )
+    first_entry = work_entries.select_related('project').order_by('date', 'id').first()
+    if first_entry is None:
+        messages.warning(request, "No unbilled entries found to invoice." if unbilled else "No entries found to generate invoice.")
         return redirect('dashboard')
 
-    template_path = os.path.join(settings.BASE_DIR, 'static', 'template', 'InvoiceTemplate.xlsx')
-    try:
-        wb = load_workbook(template_path)
-        ws = wb.active
-    except FileNotFoundError:
-        return HttpResponse(f"Template not found at {template_path}", status=500)
-
-    start_row = 14
-    thin = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
-
-    footer_rows_data = []
-    footer_start_row = -1
-    for r_idx, row in enumerate(ws.iter_rows(min_row=start_row, max_row=ws.max_row), start=start_row):
-        if isinstance(row[1].value, str) and "Total" in row[1].value:
-            footer_start_row = r_idx
-            break
-    if footer_start_row != -1:
-        for row in ws.iter_rows(min_row=footer_start_row, max_row=ws.max_row):
-            footer_rows_data.append([copy(cell) for cell in row])
-        ws.delete_rows(footer_start_row, ws.max_row - footer_start_row + 1)
-
-    current_row = start_row
-    total_quantity = 0
-    total_amount = 0
-
-    if len(work_entries) > 1:
-        ws.insert_rows(start_row + 1, amount=len(work_entries) - 1)
-
-    for entry in work_entries:
-        unit_price = entry.category.rate if entry.category else 0
-        quantity = entry.quantity or 0
-        amount = quantity * unit_price
-
-        ws.cell(row=current_row, column=2).value = entry.folder_name
-        ws.cell(row=current_row, column=3).value = entry.category.name if entry.category else "N/A"
-        local_date = timezone.localtime(entry.date)
-        ws.cell(row=current_row, column=4).value = local_date.strftime("%b %d, %Y")
-        ws.cell(row=current_row, column=5).value = quantity
-        ws.cell(row=current_row, column=6).value = unit_price
-        ws.cell(row=current_row, column=7).value = amount
-
-        for col in range(2, 8):
-            ws.cell(row=current_row, column=col).border = thin
-
-        total_quantity += quantity
-        total_amount += amount
-        current_row += 1
-
-    if footer_rows_data:
-        for row_cells in footer_rows_data:
-            ws.append([cell.value for cell in row_cells])
-            new_row = ws.max_row
-            for c_idx, cell in enumerate(row_cells, 1):
-                if cell.has_style:
-                    ws.cell(row=new_row, column=c_idx).style = copy(cell.style)
-
-    for r_idx, row in enumerate(ws.iter_rows(min_row=current_row, values_only=True), start=current_row):
-        if row[1] and "Total" in str(row[1]):
-            ws.cell(row=r_idx, column=5).value = total_quantity
-            ws.cell(row=r_idx, column=7).value = total_amount
-        if row[1] and "In Words" in str(row[1]):
-            first_entry = work_entries.first()
-            currency = first_entry.category.currency if first_entry.category and hasattr(first_entry.category, 'currency') else 'USD'
-            currency_map = {
-                'USD': 'US Dollars',
-                'EUR': 'Euros',
-                'AUD': 'Australian Dollars',
-                'INR': 'Rupees',
-                'GBP': 'Pounds',
-                'JPY': 'Yen',
-            }
-            currency_word = currency_map.get(currency.upper(), 'US Dollars')
-            words = f"In Words: {num2words(total_amount, lang='en').title()} {currency_word} Only"
-            ws.cell(row=r_idx, column=2).value = words
-
-    excel_file_stream = BytesIO()
-    wb.save(excel_file_stream)
-    excel_file_stream.seek(0)
-
-    project_for_invoice = None
     if selected_project_id:
         project_for_invoice = ClientProject.objects.get(id=selected_project_id)
-    elif work_entries:
-        project_for_invoice = work_entries.first().project
-
-    if project_for_invoice:
-        current_time = timezone.now()
-        invoice = Invoice(
-            project=project_for_invoice,
-            project_name_snapshot=project_for_invoice.name,
-            total_amount=total_amount,
-            start_date=start_date if start_date else None,
-            end_date=end_date if end_date else None
+    else:
+        project_for_invoice = first_entry.project
+
+    params = invoice_params(request.GET.get('user'), start_date, end_date, group_by, unbilled)
+    fingerprint = invoice_fingerprint(user, project_for_invoice, work_entries, params)
+    invoice = stored_invoice(fingerprint)
+    if invoice is not None:
+        # Nothing changed since this invoice was built; send the stored file.
+        return FileResponse(
+            invoice.invoice_file.open('rb'),
+            as_attachment=True,
+            filename=invoice_filename(project_for_invoice, invoice.generated_at),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
         )
-        filename = f"Invoice_{project_for_invoice.name}_{current_time.year}_{current_time.month}.xlsx"
-        invoice.invoice_file.save(filename, ContentFile(excel_file_stream.read()), save=True)
-        excel_file_stream.seek(0)
 
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    job = enqueue_invoice(
+        user,
+        project_for_invoice,
+        user_id=request.GET.get('user'),
+        start_date=start_date,
+        end_date=end_date,
+        group_by=group_by,
+        unbilled=unbilled,
+        fingerprint=fingerprint,
     )
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    response.write(excel_file_stream.read())
+    if not settings.INVOICE_WORKER:
+        # No worker watches the queue; build it now, in this request.
+        run_job_now(job, f'web:{socket.gethostname()}:{os.getpid()}')
+    return redirect('invoice_job', job_id=job.pk)
+
+
+@login_required
+def invoice_preview_view(request):
+    """What generate_invoice would bill for the same filters, as JSON.
+
+    Computed from SQL aggregates, so the dashboard can refresh it on every
+    filter change; no workbook, job or invoice is created. The preview is
+    shown on the dashboard, next to the filters and Generate Invoice
+    buttons; the separate export page only offers the raw XLSX dump.
+    """
+    user = request.user
+    if user.role not in ['admin', 'super_admin']:
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    group_by = request.GET.get('group_by') or None
+    if group_by is not None and group_by not in dict(GROUP_BY_CHOICES):
+        return JsonResponse({'error': 'Unknown invoice summary'}, status=400)
+    work_entries = invoice_entries(
+        user,
+        project_id=request.GET.get('project'),
+        user_id=request.GET.get('user'),
+        start_date=request.GET.get('start_date') or None,
+        end_date=request.GET.get('end_date') or None,
+        unbilled=request.GET.get('unbilled') in ('1', 'true', 'on'),
+    )
+    return JsonResponse(invoice_preview(work_entries, group_by))
+
+
+def _visible_invoice_job(request, job_id):
+    job = get_object_or_404(InvoiceJob.objects.select_related('project', 'invoice'), pk=job_id)
+    if request.user.role != 'super_admin' and job.requested_by_id != request.user.pk:
+        return None
+    return job
+
+
+def _invoice_job_payload(job):
+    return {
+        'id': job.pk,
+        'status': job.status,
+        'progress': job.progress,
+        'lines_written': job.lines_written,
+        'total_lines': job.total_lines,
+        'download_url': reverse('invoice_job_download', args=[job.pk]) if job.invoice_id else None,
+        'error': 'The invoice could not be generated.' if job.status == InvoiceJob.STATUS_FAILED else None,
+    }
+
+
+@login_required
+def invoice_job_view(request, job_id):
+    """Progress page of a queued invoice; polls invoice_job_status until done."""
+    job = _visible_invoice_job(request, job_id)
+    if job is None:
+        return render(request, 'unauthorized.html')
+    return render(request, 'invoice_job.html', {'job': job, 'payload': _invoice_job_payload(job)})
+
+
+@login_required
+def invoice_job_status_view(request, job_id):
+    job = _visible_invoice_job(request, job_id)
+    if job is None:
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    return JsonResponse(_invoice_job_payload(job))
 
-    return response
+
+@login_required
+def invoice_job_download_view(request, job_id):
+    job = _visible_invoice_job(request, job_id)
+    if job is None:
+        return render(request, 'unauthorized.html')
+    if job.invoice is None or not job.invoice.invoice_file:
+        messages.warning(request, "This invoice is not ready yet.")
+        return redirect('invoice_job', job_id=job.pk)
+    if not invoice_file_exists(job.invoice):
+        # The stored file is gone; its recorded lines still say what it bills.
+        restore_invoice_file(job.invoice)
+    return FileResponse(
+        job.invoice.invoice_file.open('rb'),
+        as_attachment=True,
+        filename=invoice_filename(job.project, job.invoice.generated_at),
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
 
 @login_required
 def reports_view(request):
@@ -1027,6 +1201,44 @@ class WorkEntryListCreateView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+class WorkEntryBulkCreateView(generics.GenericAPIView):
+    """Create many work entries in one all-or-nothing request.
+
+    Body: {"project": <id>, "entries": [{"category", "folder_name", "quantity", "date"}, ...]}
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        entries = request.data.get('entries')
+        if not isinstance(entries, list) or not all(isinstance(row, dict) for row in entries):
+            return Response({"detail": "'entries' must be a list of objects."}, status=400)
+        project_id = request.data.get('project')
+        project = ClientProject.objects.filter(pk=project_id).first() if str(project_id).isdigit() else None
+        if project is None:
+            return Response({"detail": "Unknown project."}, status=400)
+
+        result = submit_work_entries(request.user, project, entries)
+        return Response(result.as_dict(), status=201 if result.ok else 400)
+
+class SlotFillView(generics.GenericAPIView):
+    """Claim free slots of a project and fill them in one all-or-nothing request.
+
+    Body: {"project": <id>, "entries": [{"category", "folder_name", "quantity", "date"}, ...]}
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        entries = request.data.get('entries')
+        if not isinstance(entries, list) or not all(isinstance(row, dict) for row in entries):
+            return Response({"detail": "'entries' must be a list of objects."}, status=400)
+        project_id = request.data.get('project')
+        project = ClientProject.objects.filter(pk=project_id).first() if str(project_id).isdigit() else None
+        if project is None:
+            return Response({"detail": "Unknown project."}, status=400)
+
+        result = fill_slots(request.user, project, entries)
+        return Response(result.as_dict(), status=200 if result.ok else 400)
+
 class ExportWorkEntriesXLSXView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -1169,11 +1381,18 @@ def get_user_work_summary(request):
     project_filter = request.GET.get('project')
     start_date_str = request.GET.get('start_date')
     end_date_str = request.GET.get('end_date')
-    
+
+    # Unfiltered: the write-through counters answer in one lookup
+    if not (query or project_filter or start_date_str or end_date_str):
+        stats = user_work_stats(request.user)
+        return JsonResponse({
+            'total_entries_month': stats.total_entries,
+            'total_quantity_month': stats.total_quantity,
+            'most_frequent_project': stats.top_project.name if stats.top_project else 'No Projects',
+        })
+
     # Build conditions
     search_conditions = Q()
-    if query:
-        search_conditions &= (Q(folder_name__icontains=query) | Q(category__name__icontains=query))
     if project_filter:
         search_conditions &= Q(project__name__icontains=project_filter)
     
@@ -1193,29 +1412,33 @@ def get_user_work_summary(request):
             pass
     
     # Apply filters
-    filtered_entries = work_entries.filter(search_conditions)
-    
-    # Entries count
-    total_entries = filtered_entries.count()
-    
-    # Total quantity (from filtered entries only)
-    total_quantity = filtered_entries.aggregate(total=Sum('quantity'))['total'] or 0
-    
-    # Top project from filtered entries
-    most_frequent_project = (
-        filtered_entries.values('project__name')
-        .annotate(count=Count('id'))
-        .order_by('-count')
-        .first()
+    filtered_entries = search_entries(work_entries.filter(search_conditions), query)
+
+    def build_summary():
+        # Entries count and total quantity (from filtered entries only)
+        totals = filtered_entries.aggregate(count=Count('id'), total=Sum('quantity'))
+
+        # Top project from filtered entries
+        most_frequent_project = (
+            filtered_entries.values('project__name')
+            .annotate(count=Count('id'))
+            .order_by('-count')
+            .first()
+        )
+        return {
+            'total_entries_month': totals['count'],         # filtered entries count
+            'total_quantity_month': totals['total'] or 0,   # filtered total
+            'most_frequent_project': most_frequent_project['project__name'] if most_frequent_project else 'No Projects',
+        }
+
+    # Project and category names take part in the filters, hence the catalog scope
+    summary = cached_payload(
+        'user_work_summary',
+        [user_scope(request.user.pk), CATALOG_SCOPE],
+        {'query': query, 'project': project_filter, 'start_date': start_date_str, 'end_date': end_date_str},
+        build_summary,
     )
-    top_project = most_frequent_project['project__name'] if most_frequent_project else 'No Projects'
-    
-    # Return JSON
-    return JsonResponse({
-        'total_entries_month': total_entries,        # filtered entries count
-        'total_quantity_month': total_quantity,      # filtered total
-        'most_frequent_project': top_project
-    })
+    return JsonResponse(summary)
 
 @login_required
 def edit_user_role_view(request, user_id):
@@ -1309,9 +1532,9 @@ def get_user_report_view(request, user_id):
         print(f"[DEBUG] Found {categories_created.count()} categories/prices created")
 
         # Get work entries with related data
-        work_entries = WorkEntry.objects.filter(user=user).select_related(
-            'project', 'category'
-        ).order_by('-date')
+        work_entries = WorkEntry.objects.filter(user=user).select_related('project').order_by('-date')
+        recent_entries = list(work_entries[:200])
+        rate_card = rate_cards({we.project_id for we in recent_entries})
         print(f"[DEBUG] Found {work_entries.count()} work entries")
 
         # Get work entries statistics
@@ -1454,12 +1677,12 @@ def get_user_report_view(request, user_id):
                 {
                     'date': timezone.localtime(we.date).strftime('%Y-%m-%d %H:%M'),
                     'project': we.project.name,
-                    'category': we.category.name if we.category else 'N/A',
+                    'category': rate.name if rate else 'N/A',
                     'folder_name': we.folder_name,
                     'quantity': we.quantity,
-                    'rate': float(we.category.rate) if we.category else 0,
-                    'currency': we.category.currency if we.category else 'USD'
-                } for we in work_entries[:200]  # Last 200 entries
+                    'rate': float(rate.rate) if rate else 0,
+                    'currency': rate.currency if rate else 'USD'
+                } for we, rate in ((we, rate_card.get(we.category_id)) for we in recent_entries)  # Last 200 entries
             ],
 
             # Project-wise statistics
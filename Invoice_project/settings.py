@@ -59,6 +59,17 @@ DATABASES = {
     }
 }
 
+# Dashboard and summary payloads are cached under versioned keys (see
+# Invoice/caching.py), so locmem or a shared file cache both stay correct.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'invoice-dashboard',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+DASHBOARD_CACHE_TIMEOUT = 24 * 60 * 60
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -89,6 +100,10 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Set when `manage.py run_invoice_worker` runs next to the web server and
+# shares its MEDIA_ROOT; otherwise invoices are built in the request.
+INVOICE_WORKER = os.environ.get('INVOICE_WORKER', '').lower() in ('1', 'true', 'yes')
+
 AUTH_USER_MODEL = 'Invoice.User'
 AUTHENTICATION_BACKENDS = [
     'Invoice.backends.EmailBackend',